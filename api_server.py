@@ -1,85 +1,282 @@
-from flask import Flask, jsonify, request
+from flask import Flask, Response, g, jsonify, request
 from flask_cors import CORS
+import base64
 import json
 import os
+import threading
+import time
+from itertools import chain, islice
 from datetime import datetime, timedelta
 import pytz
-from fix_all_feeds import scrape_all_sources, CHEMICAL_KEYWORDS
+from fix_all_feeds import scrape_all_sources, current_articles, taxonomy, CHEMICAL_KEYWORDS
+from snapshot_refresher import SnapshotRefresher
+from snapshot_file import SnapshotReader, load_snapshot, write_snapshot
+import scrape_lock
+from snapshot import build_snapshot, encode_articles, filter_positions, select_by_time, select_positions, time_key
+from search_index import SearchIndex
+import article_store
+import article_archive
+import metrics
+from dedup import dedupe_articles, touched_by
+from response_cache import cached
+from event_broker import broker, format_event, matches, parse_event_id, KEEPALIVE
+from stream_server import KEEPALIVE_INTERVAL, RETRY_MS, STREAM_PORT
 
 app = Flask(__name__)
 CORS(app)  # Allow cross-origin requests
 
-# Global variable to store latest data
+# Latest snapshot; replaced as a whole by _scrape_latest_data so readers never see a partial update
 latest_data = {
     'articles': [],
     'summary': {},
     'last_updated': None
 }
 
-def get_latest_data():
-    """Get the latest RSS data"""
+DATA_TTL = 3600  # Seconds before the snapshot is refreshed (1 hour)
+LATEST_FILE = 'latest.json'  # Saved by daily_scheduler; warm start falls back to it
+SCRAPE_WAIT = 300  # Seconds to wait for a scrape running in another process before giving up
+
+# 'memory': this process scrapes and keeps latest_data itself.
+# 'mapped': serve the snapshot file published by the ingest process (one per
+# machine), so any number of worker processes share it without scraping.
+SNAPSHOT_MODE = os.environ.get('SNAPSHOT_MODE', 'memory')
+snapshot_reader = SnapshotReader()
+_indexed_version = None
+_confirmed_at = 0  # Unix time a scrape last found latest_data current (polls that change nothing don't republish)
+NDJSON_CHUNK_LINES = 100  # Articles per chunk written to an ?format=ndjson response
+STREAM_THREAD_LIMIT = 50  # /api/stream clients served here (one thread each); more go to the stream server
+SEARCH_RETENTION_DAYS = article_store.RETENTION_DAYS  # Same window as the article store
+
+# Full-text index over the archive plus every snapshot scraped since startup.
+# Built by the first /api/search, so processes that never search (health
+# checks, most mapped workers) don't load the article store into memory.
+search_index = SearchIndex()
+_archive_indexed = False
+_archive_lock = threading.Lock()
+
+def get_search_index():
+    """Return the search index, loading the article store on first use"""
+    global _archive_indexed
+    if not _archive_indexed:
+        with _archive_lock:
+            if not _archive_indexed:
+                try:
+                    for article, last_seen in article_store.iter_articles():
+                        search_index.add(article, last_seen)
+                except Exception as e:
+                    print(f"⚠️ Could not load article store into search index: {e}")
+                data = snapshot_reader.get() if SNAPSHOT_MODE == 'mapped' else latest_data
+                if data:
+                    search_index.add_many(data['articles'])  # Snapshot being served
+                _archive_indexed = True
+    return search_index
+
+def _index_snapshot(articles, prune=False):
+    """Add a new snapshot's articles to the search index, once /api/search has built it"""
+    with _archive_lock:
+        if not _archive_indexed:
+            return  # Built from the snapshot being served when first searched
+        search_index.add_many(articles)
+        if prune:
+            search_index.prune(SEARCH_RETENTION_DAYS)
+
+def _adopt_published_snapshot():
+    """Switch to the snapshot file if another process published or confirmed it within DATA_TTL.
+    
+    Only a snapshot newer than latest_data is adopted. The ingest process
+    only republishes when articles change, so another process's scrape
+    finishing after this one's last (scrape_lock.last_scrape) also counts
+    as confirming the snapshot being served. Returns True if this process
+    need not scrape.
+    """
+    global latest_data, _confirmed_at
+    try:
+        published = load_snapshot()
+    except (OSError, ValueError):
+        return False
+    finished = scrape_lock.last_scrape().get('finished', 0)
+    current = latest_data['last_updated']
+    if not current or published['last_updated'] > current:
+        confirmed = max(published['last_updated'].timestamp(), finished)
+        if time.time() - confirmed >= DATA_TTL:
+            return False
+        latest_data = published
+        _index_snapshot(published['articles'])
+    elif published['last_updated'] == current and finished > _confirmed_at:
+        # Same snapshot, confirmed by a scrape this process did not run
+        confirmed = finished
+        if time.time() - confirmed >= DATA_TTL:
+            return False
+    else:
+        return False  # Published by this process, or older than what it scraped itself
+    _confirmed_at = confirmed
+    return True
+
+def _load_persisted_snapshot():
+    """Last snapshot saved to disk: the snapshot file, else latest.json (None if neither loads)"""
+    try:
+        return load_snapshot()
+    except (OSError, ValueError):
+        pass
+    try:
+        with open(LATEST_FILE, 'r', encoding='utf-8') as f:
+            saved = json.load(f)
+        updated = datetime.fromisoformat(saved['timestamp'])
+    except (OSError, ValueError, KeyError):
+        return None
+    if updated.tzinfo:
+        updated = updated.astimezone().replace(tzinfo=None)  # Local time, like snapshot timestamps
+    return build_snapshot(saved.get('articles', []), updated)
+
+def warm_start():
+    """Serve the last persisted snapshot until a scrape replaces it.
+    
+    Runs at import so the first request (e.g. the /api/summary health
+    check) is answered from disk instead of waiting for a live scrape. A
+    snapshot older than DATA_TTL is refreshed in the background by
+    get_latest_data. Returns True if a snapshot was loaded.
+    """
+    global latest_data
+    if SNAPSHOT_MODE == 'mapped' or latest_data['last_updated']:
+        return False  # Mapped workers read the snapshot file anyway
+    persisted = _load_persisted_snapshot()
+    if persisted is None:
+        return False
+    latest_data = persisted
+    print(f"♨️ Warm start: {len(persisted['articles'])} articles from {persisted['last_updated'].strftime('%Y-%m-%d %H:%M')}")
+    return True
+
+def _scrape_latest_data(force=False):
+    """Scrape all sources and swap in a snapshot with the new and changed entries merged in.
+    
+    Only the holder of the scrape lease scrapes; other processes wait for it
+    and adopt the snapshot it publishes. force always scrapes.
+    """
+    global _confirmed_at
+    with scrape_lock.lease(wait=SCRAPE_WAIT) as held:
+        if not force and _adopt_published_snapshot():
+            return
+        if not held:
+            raise RuntimeError(f"Scrape lease held by {scrape_lock.holder() or 'another process'}")
+        _scrape_and_publish()
+        scrape_lock.record_scrape()
+        _confirmed_at = scrape_lock.last_scrape().get('finished', 0)  # Our own scrape, not a confirmation to adopt
+
+def _scrape_and_publish():
     global latest_data
     
-    # Check if data is fresh (less than 1 hour old)
-    if latest_data['last_updated']:
-        time_diff = datetime.now() - latest_data['last_updated']
-        if time_diff.total_seconds() < 3600:  # 1 hour
-            return latest_data
+    # Only entries not seen by an earlier scrape are classified
+    delta = scrape_all_sources(incremental=True)
+    
+    # Dedup rewrites links and alternates, so work on copies of the stored records
+    with metrics.span('dedup'):
+        articles = dedupe_articles([dict(article) for article in current_articles()])
+    
+    with metrics.span('snapshot', articles=len(articles)):
+        latest_data = build_snapshot(articles)
+    
+        # Publish for worker processes serving the mapped snapshot
+        try:
+            write_snapshot(latest_data)
+            if SNAPSHOT_MODE == 'mapped':
+                snapshot_reader.get(force=True)
+        except OSError as e:
+            print(f"⚠️ Could not write the snapshot file: {e}")
+    
+    touched = touched_by(articles, delta) if delta else []
+    with metrics.span('store', articles=len(touched)):
+        try:
+            if touched:
+                article_store.upsert_articles(touched, taxonomy=taxonomy())
+            article_store.touch_articles(article['link'] for article in articles)  # Unchanged ones are still in the feeds
+        except Exception as e:
+            print(f"⚠️ Could not save articles to the store: {e}")
+    
+    # Push the new and changed articles to /api/stream clients
+    broker.publish(touched)
+    
+    # Only new or changed articles are indexed
+    with metrics.span('index'):
+        _index_snapshot(articles, prune=True)
     
-    # Run fresh scrape
     try:
-        scrape_all_sources()
-        
-        # Read the scraped data
-        with open('all_sources_data.txt', 'r', encoding='utf-8') as f:
-            content = f.read()
-        
-        # Parse the data (simplified version)
-        articles = []
-        lines = content.split('\n')
-        current_article = {}
-        
-        for line in lines:
-            if line.startswith('ARTICLE '):
-                if current_article:
-                    articles.append(current_article)
-                current_article = {'source': 'Unknown'}
-            elif line.startswith('Title: '):
-                current_article['title'] = line.replace('Title: ', '')
-            elif line.startswith('Link: '):
-                current_article['link'] = line.replace('Link: ', '')
-            elif line.startswith('Published: '):
-                current_article['published'] = line.replace('Published: ', '')
-            elif line.startswith('🏷️ Categories: '):
-                current_article['categories'] = line.replace('🏷️ Categories: ', '').split(', ')
-            elif line.startswith('Summary: '):
-                current_article['summary'] = line.replace('Summary: ', '')
-        
-        if current_article:
-            articles.append(current_article)
-        
-        # Filter out articles without titles
-        articles = [a for a in articles if 'title' in a and a['title'] != 'No title']
-        
-        latest_data = {
-            'articles': articles,
-            'summary': {
-                'total_articles': len(articles),
-                'sources': ['Economic Times', 'Business Standard', 'Money Control', 'Livemint', 'Indian Chemical News', 'Chemindigest'],
-                'last_updated': datetime.now().isoformat()
-            },
-            'last_updated': datetime.now()
-        }
-        
-        return latest_data
-        
-    except Exception as e:
+        metrics.save_ingest()
+    except OSError as e:
+        print(f"⚠️ Could not save ingest metrics: {e}")
+
+refresher = SnapshotRefresher(_scrape_latest_data)
+warm_start()
+
+def snapshot_version():
+    """Version of the snapshot being served, None if there is none (responses aren't cached)"""
+    return get_latest_data().get('version')
+
+STATIC_VERSION = 'static'  # Responses that never change while the process runs
+
+def _snapshot_age():
+    """Seconds since the snapshot being served was scraped or confirmed current (None before the first one)"""
+    data = snapshot_reader.get() if SNAPSHOT_MODE == 'mapped' else latest_data
+    if not data or not data.get('last_updated'):
+        return None
+    confirmed = _confirmed_at
+    if SNAPSHOT_MODE == 'mapped':
+        confirmed = scrape_lock.last_scrape().get('finished', 0)
+    return time.time() - max(data['last_updated'].timestamp(), confirmed)
+
+metrics.Gauge('rss_snapshot_age_seconds', 'Age of the snapshot being served', function=_snapshot_age)
+
+@app.before_request
+def _start_timer():
+    g.request_started = time.perf_counter()
+
+@app.after_request
+def _record_latency(response):
+    started = g.pop('request_started', None)
+    if started is not None:
+        route = request.url_rule.rule if request.url_rule else 'unmatched'
+        metrics.request_seconds.observe(time.perf_counter() - started, route=route, method=request.method, status=response.status_code)
+    return response
+
+def _get_mapped_data():
+    """The published snapshot file (SNAPSHOT_MODE=mapped)"""
+    global _indexed_version
+    data = snapshot_reader.get()
+    if data is None:
         return {
-            'error': str(e),
+            'error': 'No snapshot published yet',
             'articles': [],
             'summary': {},
             'last_updated': datetime.now().isoformat()
         }
+    if data['version'] != _indexed_version:
+        # New snapshot from the ingest process: index what changed
+        _indexed_version = data['version']
+        _index_snapshot(data['articles'])
+    return data
+
+def get_latest_data():
+    """Get the latest RSS data"""
+    if SNAPSHOT_MODE == 'mapped':
+        return _get_mapped_data()
+    
+    data = latest_data
+    
+    if not data['last_updated']:
+        # Nothing to serve yet, wait for the first scrape
+        error = refresher.refresh(wait=True)
+        data = latest_data
+        if not data['last_updated']:
+            return {
+                'error': str(error or 'No data available yet'),
+                'articles': [],
+                'summary': {},
+                'last_updated': datetime.now().isoformat()
+            }
+    elif time.time() - max(data['last_updated'].timestamp(), _confirmed_at) >= DATA_TTL:
+        # Serve the current snapshot while a single background scrape refreshes it
+        refresher.trigger()
+    
+    return data
 
 @app.route('/')
 def home():
@@ -91,14 +288,71 @@ def home():
             '/api/news': 'Get all news articles',
             '/api/news?category=pricing': 'Filter by category',
             '/api/news?source=Economic Times': 'Filter by source',
+            '/api/news?cursor=NEXT_CURSOR': 'Only articles published after a previous response (also since, until)',
+            '/api/news?format=ndjson': 'Stream every matching article, one JSON object per line (no default limit)',
+            '/api/search?q=methanol price': 'Full-text search (use "quotes" for phrases)',
+            '/api/history?start=2025-07-01&end=2025-07-31': 'Query archived articles (also category, source, q, limit, offset)',
+            '/api/history?start=2025-01-01&format=ndjson': 'Export archived articles as a stream of JSON lines (no default limit)',
+            '/api/trends?category=Chemical Pricing&group_by=source': 'Daily/weekly/monthly article counts per category or source (start, end, interval)',
+            '/api/stream?category=pricing': 'Server-Sent Events of newly ingested articles (resumes from Last-Event-ID)',
             '/api/summary': 'Get summary statistics',
             '/api/categories': 'Get available categories',
-            '/api/sources': 'Get available sources'
+            '/api/sources': 'Get available sources',
+            '/api/metrics': 'Prometheus metrics (feed fetches, scrapes, request latency)'
         },
         'usage': 'Add ?category=CATEGORY or ?source=SOURCE to filter results'
     })
 
+def articles_response(articles_json, **fields):
+    """JSON response of fields plus an already encoded articles array, as jsonify would write it.
+    
+    The array is spliced in as the first key, where jsonify's sorted keys
+    put 'articles' for every response using this.
+    """
+    rest = json.dumps(fields, sort_keys=True, separators=(',', ':')).encode('utf-8')
+    body = b'{"articles":' + articles_json + (b',' + rest[1:] if fields else b'}') + b'\n'
+    return Response(body, mimetype='application/json')
+
+_encode = json.JSONEncoder(separators=(',', ':'), sort_keys=True).encode   # As jsonify encodes
+
+def ndjson_response(lines, headers=None):
+    """Stream encoded JSON lines, NDJSON_CHUNK_LINES per chunk, as they are produced"""
+    def generate():
+        lines_iter = iter(lines)
+        while True:
+            chunk = list(islice(lines_iter, NDJSON_CHUNK_LINES))
+            if not chunk:
+                return
+            yield b'\n'.join(chunk) + b'\n'
+    
+    headers = dict(headers or {})
+    headers['Cache-Control'] = 'no-cache'
+    headers['X-Accel-Buffering'] = 'no'  # Let proxies pass chunks on as they come
+    return Response(generate(), mimetype='application/x-ndjson', headers=headers)
+
+def _format_arg():
+    """'json' or 'ndjson' from ?format=; raises ValueError for anything else"""
+    response_format = request.args.get('format', '') or 'json'
+    if response_format not in ('json', 'ndjson'):
+        raise ValueError('format must be json or ndjson')
+    return response_format
+
+def encode_cursor(key):
+    """Opaque cursor for a (published_ts, link) time index key"""
+    if key is None:
+        return None
+    return base64.urlsafe_b64encode(json.dumps(list(key)).encode('utf-8')).decode('ascii')
+
+def decode_cursor(cursor):
+    """(published_ts, link) key from a cursor; raises ValueError if it is malformed"""
+    try:
+        published_ts, link = json.loads(base64.urlsafe_b64decode(cursor.encode('ascii')))
+        return float(published_ts), str(link)
+    except (TypeError, ValueError, UnicodeError) as e:
+        raise ValueError('Invalid cursor') from e
+
 @app.route('/api/news')
+@cached(snapshot_version, uncached_args=('cursor',))
 def get_news():
     """Get news articles with optional filtering"""
     data = get_latest_data()
@@ -106,34 +360,314 @@ def get_news():
     if 'error' in data:
         return jsonify(data), 500
     
-    articles = data['articles']
+    # Time range and cursor for delta polling
+    try:
+        since = _parse_date_arg('since')
+        until = _parse_date_arg('until', end_of_day=True)
+        cursor = request.args.get('cursor', '')
+        after = decode_cursor(cursor) if cursor else None
+    except ValueError:
+        return jsonify({'error': 'since and until must be YYYY-MM-DD, ISO 8601 or epoch seconds, cursor a next_cursor value'}), 400
+    try:
+        response_format = _format_arg()
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
     
-    # Filter by category
+    # Filter by category and source using the snapshot indexes
     category = request.args.get('category', '').lower()
-    if category:
-        articles = [a for a in articles if 'categories' in a and any(cat.lower() == category for cat in a['categories'])]
-    
-    # Filter by source
     source = request.args.get('source', '')
-    if source:
-        articles = [a for a in articles if 'source' in a and source.lower() in a['source'].lower()]
+    positions = filter_positions(data, category, source)
+    
+    # Limit results (an NDJSON stream has every match unless limited)
+    limit = request.args.get('limit', 50 if response_format == 'json' else None, type=int)
+    if after is not None or since is not None or until is not None:
+        # Oldest first from the sorted time index, so next_cursor resumes where this page ends
+        selected, last_key = select_by_time(data, positions, after, since, until, limit)
+        next_cursor = encode_cursor(last_key) if last_key else (cursor or None)
+    else:
+        selected = select_positions(positions, len(data['articles']), limit)
+        next_cursor = encode_cursor(time_key(data, -1)) if data['time_ts'] else None
     
-    # Limit results
+    if response_format == 'ndjson':
+        # One article per line, written from the snapshot as the client reads
+        articles = data['articles']
+        headers = {'X-Last-Updated': data['summary']['last_updated']}
+        if next_cursor:
+            headers['X-Next-Cursor'] = next_cursor
+        return ndjson_response((articles.encoded(position) for position in selected), headers)
+    
+    # Encoded straight from the snapshot's article store, no per-request dicts
+    return articles_response(
+        encode_articles(data, selected),
+        count=len(selected),
+        filters_applied={
+            'category': category if category else None,
+            'source': source if source else None,
+            'since': request.args.get('since') or None,
+            'until': request.args.get('until') or None,
+            'limit': limit
+        },
+        next_cursor=next_cursor,
+        last_updated=data['summary']['last_updated']
+    )
+
+@app.route('/api/search')
+def search_news():
+    """Full-text search over article titles and summaries"""
+    query = request.args.get('q', '').strip()
+    if not query:
+        return jsonify({'error': 'Missing search query, use ?q=TERMS or ?q="exact phrase"'}), 400
+    
+    data = get_latest_data()
+    
+    # Same filters as /api/news
+    category = request.args.get('category', '').lower()
+    source = request.args.get('source', '').lower()
     limit = request.args.get('limit', 50, type=int)
-    articles = articles[:limit]
     
+    def accept(article):
+        if category and not any(cat.lower() == category for cat in article.get('categories', ())):
+            return False
+        if source and source not in article.get('source', '').lower():
+            return False
+        return True
+    
+    started = time.perf_counter()
+    total, results = get_search_index().search(query, limit, accept if category or source else None)
+    took_ms = (time.perf_counter() - started) * 1000
+    
+    articles = [dict(article, score=round(score, 4)) for score, article in results]
     return jsonify({
+        'query': query,
         'articles': articles,
         'count': len(articles),
+        'total_matches': total,
         'filters_applied': {
             'category': category if category else None,
             'source': source if source else None,
             'limit': limit
         },
-        'last_updated': data['summary']['last_updated']
+        'took_ms': round(took_ms, 3),
+        'last_updated': data['summary'].get('last_updated')
+    })
+
+def _parse_date_arg(name, end_of_day=False):
+    """Epoch seconds for a YYYY-MM-DD, ISO datetime (IST if no offset) or epoch query argument"""
+    value = request.args.get(name)
+    if not value:
+        return None
+    if value.replace('.', '', 1).isdigit():
+        return float(value)
+    parsed = datetime.fromisoformat(value)
+    if parsed.tzinfo is None:
+        parsed = pytz.timezone('Asia/Kolkata').localize(parsed)
+    if end_of_day and len(value) == 10:
+        parsed += timedelta(days=1)  # Date-only end covers the whole day
+    return parsed.timestamp()
+
+def _newest_first(article):
+    return (article.get('published_ts') is None, -(article.get('published_ts') or 0), article['link'])
+
+@app.route('/api/history')
+def get_history():
+    """Query archived articles by published date range, source, category and text.
+    
+    The article store holds the last RETENTION_DAYS; older articles come
+    from the compressed archive when a start is given and the range
+    reaches it, at most article_archive.MAX_QUERY_DAYS partitions at a time.
+    """
+    try:
+        start = _parse_date_arg('start')
+        end = _parse_date_arg('end', end_of_day=True)
+    except ValueError:
+        return jsonify({'error': 'start and end must be YYYY-MM-DD or ISO 8601 datetimes'}), 400
+    
+    category = request.args.get('category', '')
+    source = request.args.get('source', '')
+    query = request.args.get('q', '')
+    try:
+        response_format = _format_arg()
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    limit = request.args.get('limit', 50 if response_format == 'json' else None, type=int)
+    offset = request.args.get('offset', 0, type=int)
+    if offset < 0 or (limit is not None and limit < 0):
+        return jsonify({'error': 'limit and offset must not be negative'}), 400
+    
+    # Every archived day in range is decompressed per request, so the range must be bounded
+    archived_days = article_archive.query_days(start, end) if start is not None else 0
+    if archived_days > article_archive.MAX_QUERY_DAYS:
+        return jsonify({'error': f"The range reaches {archived_days} archived days, query at most {article_archive.MAX_QUERY_DAYS} at a time (narrow start and end)"}), 400
+    
+    if response_format == 'ndjson':
+        return _history_ndjson(start, end, source, category, query, limit, offset, archived_days > 0)
+    
+    try:
+        if archived_days:
+            # Merge the top offset + limit of both, newest first
+            total, articles = article_store.query_articles(start, end, source, category, query, offset + limit, 0)
+            archived_total, archived = article_archive.query_articles(start, end, source, category, query, offset + limit)
+            stored_links = {article['link'] for article in articles}
+            archived = [article for article in archived if article['link'] not in stored_links]
+            total += archived_total
+            articles = sorted(articles + archived, key=_newest_first)[offset:offset + limit]
+        else:
+            total, articles = article_store.query_articles(start, end, source, category, query, limit, offset)
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+    
+    return jsonify({
+        'articles': articles,
+        'count': len(articles),
+        'total_matches': total,
+        'filters_applied': {
+            'start': request.args.get('start'),
+            'end': request.args.get('end'),
+            'category': category if category else None,
+            'source': source if source else None,
+            'q': query if query else None,
+            'limit': limit,
+            'offset': offset
+        }
+    })
+
+def _history_articles(start, end, source, category, query, archived):
+    """Matching store articles newest first, then (if archived) archived ones not in the store"""
+    stored_links = set()
+    for article in article_store.iter_query(start, end, source, category, query):
+        stored_links.add(article['link'])
+        yield article
+    if archived:
+        for article in article_archive.iter_query(start, end, source, category, query):
+            if article['link'] not in stored_links:
+                yield article
+
+def _history_ndjson(start, end, source, category, query, limit, offset, archived):
+    """/api/history as NDJSON: the store is read in batches and the archive a day at a time"""
+    articles = islice(_history_articles(start, end, source, category, query, archived), offset, None if limit is None else offset + limit)
+    try:
+        first = next(articles, None)  # Query errors become a 500 before anything is sent
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+    if first is None:
+        return ndjson_response(())
+    return ndjson_response(_encode(article).encode('utf-8') for article in chain([first], articles))
+
+TREND_INTERVALS = ('day', 'week', 'month')
+TREND_GROUPS = ('category', 'source', 'none')
+TREND_DEFAULT_DAYS = 30
+
+def _trend_bucket(day, interval):
+    """Bucket label of a YYYY-MM-DD day: the day, its week's Monday or its month"""
+    if interval == 'month':
+        return day[:7]
+    if interval == 'week':
+        date = datetime.strptime(day, '%Y-%m-%d')
+        return (date - timedelta(days=date.weekday())).strftime('%Y-%m-%d')
+    return day
+
+@app.route('/api/trends')
+def get_trends():
+    """Article counts over time per category or source, from the daily rollups"""
+    try:
+        start = _parse_date_arg('start')
+        end = _parse_date_arg('end')
+    except ValueError:
+        return jsonify({'error': 'start and end must be YYYY-MM-DD or ISO 8601 datetimes'}), 400
+    
+    interval = request.args.get('interval', 'day')
+    group_by = request.args.get('group_by', 'category')
+    if interval not in TREND_INTERVALS or group_by not in TREND_GROUPS:
+        return jsonify({'error': f"interval must be one of {', '.join(TREND_INTERVALS)} and group_by one of {', '.join(TREND_GROUPS)}"}), 400
+    category = request.args.get('category', '')
+    source = request.args.get('source', '')
+    
+    end_day = article_store.day_of(end if end is not None else time.time())
+    if start is not None:
+        start_day = article_store.day_of(start)
+    else:
+        start_day = (datetime.strptime(end_day, '%Y-%m-%d') - timedelta(days=TREND_DEFAULT_DAYS - 1)).strftime('%Y-%m-%d')
+    
+    try:
+        counts = article_store.rollup_counts(start_day, end_day, source, category, None if group_by == 'none' else group_by)
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+    
+    # Every bucket in range, including empty ones
+    buckets = []
+    day = datetime.strptime(start_day, '%Y-%m-%d')
+    while day.strftime('%Y-%m-%d') <= end_day:
+        bucket = _trend_bucket(day.strftime('%Y-%m-%d'), interval)
+        if not buckets or buckets[-1] != bucket:
+            buckets.append(bucket)
+        day += timedelta(days=1)
+    positions = {bucket: i for i, bucket in enumerate(buckets)}
+    
+    series = {}
+    for (day, group), count in counts.items():
+        values = series.setdefault(group or 'all', [0] * len(buckets))
+        values[positions[_trend_bucket(day, interval)]] += count
+    
+    return jsonify({
+        'interval': interval,
+        'group_by': group_by,
+        'buckets': buckets,
+        'series': dict(sorted(series.items())),
+        'totals': {group: sum(values) for group, values in sorted(series.items())},
+        'filters_applied': {
+            'start': start_day,
+            'end': end_day,
+            'category': category if category else None,
+            'source': source if source else None
+        }
     })
 
+_stream_slots = threading.BoundedSemaphore(STREAM_THREAD_LIMIT)
+
+@app.route('/api/stream')
+def stream_news():
+    """Server-Sent Events of newly ingested articles, filtered like /api/news.
+    
+    Each client holds a server thread here, so only STREAM_THREAD_LIMIT are
+    accepted; the asyncio stream server (STREAM_PORT) handles many more.
+    """
+    if SNAPSHOT_MODE == 'mapped':
+        # Articles are published in the ingest process, which runs the stream server
+        return jsonify({'error': f'Connect to /api/stream on port {STREAM_PORT}'}), 503
+    if not _stream_slots.acquire(blocking=False):
+        return jsonify({'error': f'Too many stream clients, connect to /api/stream on port {STREAM_PORT}'}), 503
+    
+    try:
+        category = request.args.get('category', '')
+        source = request.args.get('source', '')
+        last_id = parse_event_id(request.headers.get('Last-Event-ID') or request.args.get('last_event_id'))
+        
+        def generate(last_id):
+            yield f"retry: {RETRY_MS}\n\n".encode('ascii')
+            if last_id is None:
+                last_id = broker.last_id or 0  # New client: only what is published from now on
+            pending = broker.replay(last_id)
+            while True:
+                for event_id, article in pending:
+                    last_id = event_id
+                    if matches(article, category, source):
+                        yield format_event(event_id, article)
+                pending = broker.wait(last_id, KEEPALIVE_INTERVAL)
+                if not pending:
+                    yield KEEPALIVE
+        
+        response = Response(generate(last_id), mimetype='text/event-stream', headers={
+            'Cache-Control': 'no-cache',
+            'X-Accel-Buffering': 'no'
+        })
+        response.call_on_close(_stream_slots.release)  # Runs when the client disconnects
+    except BaseException:
+        _stream_slots.release()  # No response will release it
+        raise
+    return response
+
 @app.route('/api/summary')
+@cached(snapshot_version)
 def get_summary():
     """Get summary statistics"""
     data = get_latest_data()
@@ -141,26 +675,16 @@ def get_summary():
     if 'error' in data:
         return jsonify(data), 500
     
-    # Count articles by category
-    category_counts = {}
-    source_counts = {}
-    
-    for article in data['articles']:
-        if 'categories' in article:
-            for cat in article['categories']:
-                category_counts[cat] = category_counts.get(cat, 0) + 1
-        
-        if 'source' in article:
-            source_counts[article['source']] = source_counts.get(article['source'], 0) + 1
-    
+    # Breakdowns are precomputed when the snapshot is built
     return jsonify({
         'total_articles': len(data['articles']),
-        'category_breakdown': category_counts,
-        'source_breakdown': source_counts,
+        'category_breakdown': data['category_counts'],
+        'source_breakdown': data['source_counts'],
         'last_updated': data['summary']['last_updated']
     })
 
 @app.route('/api/categories')
+@cached(lambda: STATIC_VERSION)
 def get_categories():
     """Get available categories"""
     return jsonify({
@@ -169,6 +693,7 @@ def get_categories():
     })
 
 @app.route('/api/sources')
+@cached(lambda: STATIC_VERSION)
 def get_sources():
     """Get available sources"""
     return jsonify({
@@ -183,12 +708,35 @@ def get_sources():
         'description': 'Available news sources'
     })
 
+@app.route('/api/metrics')
+def get_metrics():
+    """Prometheus text exposition of this process's metrics"""
+    return Response(metrics.exposition(), mimetype='text/plain; version=0.0.4')
+
 @app.route('/api/refresh')
 def refresh_data():
     """Manually trigger a data refresh"""
-    global latest_data
-    latest_data['last_updated'] = None  # Force refresh
+    if SNAPSHOT_MODE == 'mapped':
+        # Workers never scrape: reload whatever the ingest process published last
+        data = snapshot_reader.get(force=True)
+        if data is None:
+            return jsonify({'error': 'No snapshot published yet, the ingest process scrapes on its own schedule'}), 503
+        get_latest_data()  # Indexes it for /api/search, if built
+        return jsonify({
+            'message': 'Reloaded the latest published snapshot',
+            'articles_count': len(data['articles']),
+            'last_updated': data['summary']['last_updated']
+        })
+    
+    # Joins the scrape already in progress, if any, instead of starting another
+    error = refresher.refresh(wait=True, force=True)
     data = get_latest_data()
+    if error:
+        return jsonify({
+            'error': str(error),
+            'articles_count': len(data['articles']),
+            'last_updated': data['summary'].get('last_updated')
+        }), 500
     return jsonify({
         'message': 'Data refreshed successfully',
         'articles_count': len(data['articles']),
@@ -0,0 +1,206 @@
+import glob
+import gzip
+import json
+import os
+import re
+import threading
+import time
+from article_store import day_of
+from atomic_file import write_atomic
+
+# Long-term history of articles dropped from the article store: one gzip
+# compressed JSON-lines file per published day, archive/YYYY-MM/YYYY-MM-DD.jsonl.gz
+ARCHIVE_DIR = os.environ.get('ARTICLE_ARCHIVE_DIR', 'archive')
+ARCHIVE_RETENTION_DAYS = 365
+ARCHIVE_MAX_BYTES = int(os.environ.get('ARTICLE_ARCHIVE_MAX_BYTES', 200 * 1024 * 1024))   # Disk budget
+MAX_QUERY_DAYS = 93   # Partitions one API query may decompress (about three months)
+
+PARTITION_RE = re.compile(r'(\d{4}-\d{2}-\d{2})\.jsonl\.gz$')
+MANIFEST = 'taxonomy.json'   # day -> taxonomy version every article of the partition was classified under
+
+# Kept with the articles but not returned by queries
+INTERNAL_FIELDS = ('taxonomy', 'first_seen', 'last_seen')
+
+_lock = threading.Lock()
+
+def partition_path(day, root=None):
+    return os.path.join(root or ARCHIVE_DIR, day[:7], f"{day}.jsonl.gz")
+
+def _day(article):
+    """Partition day: the published day, else the day first seen (the store's rollup day too)"""
+    timestamp = article.get('published_ts')
+    if timestamp is None:
+        timestamp = article.get('first_seen') or article.get('last_seen') or time.time()
+    return day_of(timestamp)
+
+def _read_manifest(root=None):
+    try:
+        with open(os.path.join(root or ARCHIVE_DIR, MANIFEST), 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+def _write_manifest(manifest, root=None):
+    write_atomic(os.path.join(root or ARCHIVE_DIR, MANIFEST), json.dumps(manifest, sort_keys=True))
+
+def _lines(articles):
+    return ''.join(json.dumps(article, ensure_ascii=False) + '\n' for article in articles).encode('utf-8')
+
+def append(articles, root=None):
+    """Add articles to their day's partition (an extra gzip member per call)"""
+    by_day = {}
+    for article in articles:
+        by_day.setdefault(_day(article), []).append(article)
+
+    with _lock:
+        manifest = _read_manifest(root)
+        for day, day_articles in by_day.items():
+            path = partition_path(day, root)
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            versions = {article.get('taxonomy') for article in day_articles}
+            version = versions.pop() if len(versions) == 1 else None
+            if os.path.exists(path) and manifest.get(day) != version:
+                version = None  # Mixed versions: reclassify.py redoes the partition
+            with gzip.open(path, 'ab') as f:
+                f.write(_lines(day_articles))
+            if version is None:
+                manifest.pop(day, None)
+            else:
+                manifest[day] = version
+        if by_day:
+            _write_manifest(manifest, root)
+    return len(articles)
+
+def stale_partitions(taxonomy, root=None):
+    """(day, path) of the partitions holding articles classified under another taxonomy"""
+    manifest = _read_manifest(root)
+    return [(day, path) for day, path in partitions(root=root) if manifest.get(day) != taxonomy]
+
+def rewrite_partition(day, articles, taxonomy, root=None):
+    """Atomically replace a day's partition with articles all classified under taxonomy"""
+    with _lock:
+        write_atomic(partition_path(day, root), gzip.compress(_lines(articles)))
+        manifest = _read_manifest(root)
+        manifest[day] = taxonomy
+        _write_manifest(manifest, root)
+
+def partitions(start_day=None, end_day=None, root=None):
+    """(day, path) of the partitions within the inclusive day range, oldest first"""
+    found = []
+    for path in glob.glob(os.path.join(root or ARCHIVE_DIR, '*', '*.jsonl.gz')):
+        match = PARTITION_RE.search(path)
+        if not match:
+            continue
+        day = match.group(1)
+        if (start_day and day < start_day) or (end_day and day > end_day):
+            continue
+        found.append((day, path))
+    return sorted(found)
+
+def read_partition(path):
+    """Articles of a partition; a link archived twice keeps its last version"""
+    articles = {}
+    try:
+        with gzip.open(path, 'rt', encoding='utf-8') as f:
+            for line in f:
+                article = json.loads(line)
+                articles[article['link']] = article
+    except (OSError, EOFError, ValueError) as e:
+        print(f"⚠️ Archive partition {path} is damaged, using what could be read: {e}")
+    return list(articles.values())
+
+def _matches(article, start, end, source, category, terms):
+    published = article.get('published_ts')
+    if start is not None and (published is None or published < start):
+        return False
+    if end is not None and (published is None or published >= end):
+        return False
+    if source and source.lower() not in (article.get('source') or '').lower():
+        return False
+    if category and category.lower() not in (c.lower() for c in article.get('categories', [])):
+        return False
+    if terms:
+        words = set(re.findall(r'\w+', f"{article.get('title', '')} {article.get('summary', '')}".lower()))
+        return all(term in words for term in terms)
+    return True
+
+def _newest_first(article):
+    return (article.get('published_ts') is None, -(article.get('published_ts') or 0), article['link'])
+
+def _public(article):
+    return {key: value for key, value in article.items() if key not in INTERNAL_FIELDS}
+
+def _found(start, end, source, category, text, root, newest_day_first=False):
+    """(partition path, matching articles) of every partition in range"""
+    start_day = day_of(start) if start is not None else None
+    end_day = day_of(end) if end is not None else None
+    terms = re.findall(r'\w+', (text or '').lower())
+    found = partitions(start_day, end_day, root)
+    if newest_day_first:
+        found.reverse()
+    for _, path in found:
+        yield path, [article for article in read_partition(path) if _matches(article, start, end, source, category, terms)]
+
+def query_articles(start=None, end=None, source=None, category=None, text=None, limit=50, offset=0, root=None):
+    """Historical query over the archive with article_store.query_articles semantics.
+
+    Only the partitions of the days in range are read; every word of text
+    must appear in the title or summary.
+    """
+    found = []
+    for _, articles in _found(start, end, source, category, text, root):
+        found.extend(articles)
+    found.sort(key=_newest_first)
+    return len(found), [_public(article) for article in found[offset:offset + limit]]
+
+def iter_query(start=None, end=None, source=None, category=None, text=None, root=None):
+    """Every article matching a query_articles query, one partition in memory at a time.
+
+    Days come newest first and each day's articles newest first (undated
+    ones last within their day).
+    """
+    for _, articles in _found(start, end, source, category, text, root, newest_day_first=True):
+        articles.sort(key=_newest_first)
+        for article in articles:
+            yield _public(article)
+
+def query_days(start=None, end=None, root=None):
+    """Number of partitions a query over the range reads"""
+    return len(partitions(day_of(start) if start is not None else None, day_of(end) if end is not None else None, root))
+
+def covers(start=None, end=None, root=None):
+    """True if any partition falls within the range"""
+    return query_days(start, end, root) > 0
+
+def enforce_budget(max_bytes=ARCHIVE_MAX_BYTES, retention_days=ARCHIVE_RETENTION_DAYS, root=None):
+    """Delete partitions past retention, then the oldest until the archive fits max_bytes"""
+    oldest_kept = day_of(time.time() - retention_days * 86400)
+    sized = []
+    for day, path in partitions(root=root):
+        try:
+            sized.append((day, path, os.path.getsize(path)))
+        except OSError:
+            pass
+
+    total = sum(size for _, _, size in sized)
+    removed = []
+    with _lock:
+        for day, path, size in sized:
+            if day >= oldest_kept and total <= max_bytes:
+                break
+            try:
+                os.remove(path)
+            except OSError:
+                continue
+            total -= size
+            removed.append(day)
+            try:
+                os.rmdir(os.path.dirname(path))  # Month directory, once empty
+            except OSError:
+                pass
+        if removed:
+            manifest = _read_manifest(root)
+            for day in removed:
+                manifest.pop(day, None)
+            _write_manifest(manifest, root)
+    return len(removed)
@@ -0,0 +1,539 @@
+import glob
+import json
+import os
+import re
+import sqlite3
+import threading
+import time
+from email.utils import parsedate_to_datetime
+
+# Embedded article store replacing the daily_data_*.json files
+DB_FILE = os.environ.get('ARTICLE_DB_FILE', 'articles.db')
+RETENTION_DAYS = 30
+ROLLUP_RETENTION_DAYS = 2 * 365   # Daily counts are a few KB per day, kept far longer than articles
+DAY_OFFSET = 5.5 * 3600           # Rollup and archive days are IST calendar days
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS articles (
+    link         TEXT PRIMARY KEY,
+    title        TEXT NOT NULL,
+    summary      TEXT,
+    source       TEXT,
+    published    TEXT,
+    published_ts REAL,
+    categories   TEXT NOT NULL DEFAULT '[]',
+    alternates   TEXT,
+    taxonomy     TEXT,
+    first_seen   REAL NOT NULL,
+    last_seen    REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_articles_source ON articles(source);
+CREATE INDEX IF NOT EXISTS idx_articles_published ON articles(published_ts);
+CREATE INDEX IF NOT EXISTS idx_articles_last_seen ON articles(last_seen);
+CREATE TABLE IF NOT EXISTS article_categories (
+    link     TEXT NOT NULL REFERENCES articles(link) ON DELETE CASCADE,
+    category TEXT NOT NULL COLLATE NOCASE,
+    PRIMARY KEY (category, link)
+);
+CREATE INDEX IF NOT EXISTS idx_article_categories_link ON article_categories(link);
+CREATE TABLE IF NOT EXISTS daily_rollups (
+    day      TEXT NOT NULL,
+    source   TEXT NOT NULL,
+    category TEXT NOT NULL,
+    articles INTEGER NOT NULL,
+    PRIMARY KEY (day, source, category)
+);
+CREATE TABLE IF NOT EXISTS archived_articles (
+    link         TEXT PRIMARY KEY,
+    source       TEXT,
+    published_ts REAL,
+    first_seen   REAL NOT NULL,
+    categories   TEXT NOT NULL DEFAULT '[]'
+);
+CREATE TABLE IF NOT EXISTS imported_files (
+    name     TEXT PRIMARY KEY,
+    imported REAL NOT NULL
+);
+"""
+
+FTS_SCHEMA = """
+CREATE VIRTUAL TABLE IF NOT EXISTS articles_fts USING fts5(
+    title, summary, content='articles', content_rowid='rowid'
+);
+CREATE TRIGGER IF NOT EXISTS articles_fts_insert AFTER INSERT ON articles BEGIN
+    INSERT INTO articles_fts(rowid, title, summary) VALUES (new.rowid, new.title, new.summary);
+END;
+CREATE TRIGGER IF NOT EXISTS articles_fts_delete AFTER DELETE ON articles BEGIN
+    INSERT INTO articles_fts(articles_fts, rowid, title, summary) VALUES ('delete', old.rowid, old.title, old.summary);
+END;
+CREATE TRIGGER IF NOT EXISTS articles_fts_update AFTER UPDATE OF title, summary ON articles BEGIN
+    INSERT INTO articles_fts(articles_fts, rowid, title, summary) VALUES ('delete', old.rowid, old.title, old.summary);
+    INSERT INTO articles_fts(rowid, title, summary) VALUES (new.rowid, new.title, new.summary);
+END;
+"""
+
+UPSERT = """
+INSERT INTO articles (link, title, summary, source, published, published_ts, categories, alternates, taxonomy, first_seen, last_seen)
+VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+ON CONFLICT(link) DO UPDATE SET
+    title = excluded.title,
+    summary = excluded.summary,
+    source = excluded.source,
+    published = excluded.published,
+    published_ts = excluded.published_ts,
+    categories = excluded.categories,
+    alternates = excluded.alternates,
+    taxonomy = excluded.taxonomy,
+    first_seen = MIN(articles.first_seen, excluded.first_seen),
+    last_seen = MAX(articles.last_seen, excluded.last_seen)
+"""
+
+ROLLUP_ADD = """
+INSERT INTO daily_rollups (day, source, category, articles) VALUES (?, ?, ?, ?)
+ON CONFLICT(day, source, category) DO UPDATE SET articles = daily_rollups.articles + excluded.articles
+"""
+
+TOTAL = ''  # Rollup category holding all articles of a source and day
+
+_init_lock = threading.Lock()
+_initialized = set()
+_fts_available = {}
+
+def fts_query(text):
+    """Turn free user text into a safe FTS5 query: quoted phrases and words, all required"""
+    phrases = re.findall(r'"([^"]+)"', text)
+    words = re.findall(r'\w+', re.sub(r'"[^"]*"', ' ', text))
+    parts = [' '.join(re.findall(r'\w+', phrase)) for phrase in phrases] + words
+    return ' '.join('"' + part + '"' for part in parts if part)
+
+def parse_published(published):
+    """Epoch seconds for an RFC-822 feed date, or None if it can't be parsed"""
+    if not published or published == 'No date':
+        return None
+    try:
+        return parsedate_to_datetime(published).timestamp()
+    except (TypeError, ValueError, IndexError, OverflowError):
+        return None
+
+def connect(path=None):
+    """Open a connection to the store, creating the schema on first use"""
+    path = path or DB_FILE
+    conn = sqlite3.connect(path, timeout=30)
+    conn.row_factory = sqlite3.Row
+    conn.execute('PRAGMA foreign_keys = ON')
+
+    with _init_lock:
+        if path not in _initialized:
+            conn.execute('PRAGMA journal_mode = WAL')  # Readers don't block the writer
+            conn.executescript(SCHEMA)
+            columns = [row[1] for row in conn.execute('PRAGMA table_info(articles)')]
+            if 'alternates' not in columns:
+                conn.execute('ALTER TABLE articles ADD COLUMN alternates TEXT')  # Stores created before dedup
+            if 'taxonomy' not in columns:
+                conn.execute('ALTER TABLE articles ADD COLUMN taxonomy TEXT')  # Stores created before reclassification
+            try:
+                conn.executescript(FTS_SCHEMA)
+                _fts_available[path] = True
+            except sqlite3.OperationalError:
+                _fts_available[path] = False  # SQLite built without FTS5, fall back to LIKE
+            if conn.execute('SELECT 1 FROM daily_rollups LIMIT 1').fetchone() is None:
+                _rebuild_rollups(conn)  # Store created before rollups
+            conn.commit()
+            _initialized.add(path)
+    return conn
+
+def fts_available(path=None):
+    return _fts_available.get(path or DB_FILE, False)
+
+def day_of(timestamp):
+    """IST calendar day (YYYY-MM-DD) of an epoch timestamp"""
+    return time.strftime('%Y-%m-%d', time.gmtime(timestamp + DAY_OFFSET))
+
+def _contributions(day, source, categories):
+    """Rollup keys an article counts towards: its source total and each category"""
+    source = source or 'Unknown'
+    return [(day, source, TOTAL)] + [(day, source, category) for category in set(categories)]
+
+def _apply_rollups(conn, deltas):
+    conn.executemany(ROLLUP_ADD, [key + (count,) for key, count in deltas.items() if count])
+    if any(count < 0 for count in deltas.values()):
+        conn.execute('DELETE FROM daily_rollups WHERE articles <= 0')
+
+def _rebuild_rollups(conn):
+    """Recount the daily rollups from the stored articles"""
+    deltas = {}
+    for row in conn.execute('SELECT source, published_ts, first_seen, categories FROM articles'):
+        day = day_of(row['published_ts'] if row['published_ts'] is not None else row['first_seen'])
+        for key in _contributions(day, row['source'], json.loads(row['categories'])):
+            deltas[key] = deltas.get(key, 0) + 1
+    conn.execute('DELETE FROM daily_rollups')
+    _apply_rollups(conn, deltas)
+
+def _existing(conn, links, table='articles'):
+    """link -> stored row for the links already in the store (or in archived_articles)"""
+    links = list(links)
+    existing = {}
+    for i in range(0, len(links), 500):
+        batch = links[i:i + 500]
+        rows = conn.execute(
+            f"SELECT link, source, published_ts, first_seen, categories FROM {table} WHERE link IN ({','.join('?' * len(batch))})",
+            batch
+        )
+        existing.update((row['link'], row) for row in rows)
+    return existing
+
+def upsert_articles(articles, seen=None, path=None, taxonomy=None):
+    """Insert new articles and update existing ones (keyed by link).
+    
+    taxonomy is the version of the keywords their categories came from
+    (None if unknown: reclassify.py will redo them). The daily category x source rollups are adjusted in the same
+    transaction: new articles are counted, and updated ones move between
+    days, sources or categories as their fields change. Archived articles
+    coming back are still counted, so they move like updated ones.
+    """
+    seen = seen or time.time()
+    rows = []
+    category_rows = []
+    for article in articles:
+        link = article.get('link')
+        if not link or link == 'No link':
+            continue
+        categories = article.get('categories', [])
+        rows.append((
+            link,
+            article.get('title', ''),
+            article.get('summary'),
+            article.get('source'),
+            article.get('published'),
+            article['published_ts'] if 'published_ts' in article else parse_published(article.get('published')),
+            json.dumps(categories, ensure_ascii=False),
+            json.dumps(article['alternate_sources'], ensure_ascii=False) if article.get('alternate_sources') else None,
+            taxonomy,
+            seen,
+            seen
+        ))
+        category_rows.extend((link, category) for category in categories)
+
+    conn = connect(path)
+    try:
+        with conn:
+            existing = _existing(conn, (row[0] for row in rows))
+            returning = _existing(conn, (row[0] for row in rows if row[0] not in existing), 'archived_articles')
+            if returning:
+                # Keep their first_seen, and their archived rollup counts move instead of adding up
+                rows = [row[:9] + (returning[row[0]]['first_seen'],) + row[10:] if row[0] in returning else row for row in rows]
+                existing.update(returning)
+                conn.executemany('DELETE FROM archived_articles WHERE link = ?', [(link,) for link in returning])
+            deltas = {}
+            for row in rows:
+                link, source, published_ts, categories = row[0], row[3], row[5], row[6]
+                old = existing.get(link)
+                if old is not None:
+                    old_day = day_of(old['published_ts'] if old['published_ts'] is not None else old['first_seen'])
+                    for key in _contributions(old_day, old['source'], json.loads(old['categories'])):
+                        deltas[key] = deltas.get(key, 0) - 1
+                first_seen = min(old['first_seen'], seen) if old is not None else seen
+                day = day_of(published_ts if published_ts is not None else first_seen)
+                for key in _contributions(day, source, json.loads(categories)):
+                    deltas[key] = deltas.get(key, 0) + 1
+                existing[link] = {'source': source, 'published_ts': published_ts, 'first_seen': first_seen, 'categories': categories}
+            
+            conn.executemany(UPSERT, rows)
+            conn.executemany('DELETE FROM article_categories WHERE link = ?', [(row[0],) for row in rows])
+            conn.executemany('INSERT OR IGNORE INTO article_categories (link, category) VALUES (?, ?)', category_rows)
+            _apply_rollups(conn, deltas)
+    finally:
+        conn.close()
+    return len(rows)
+
+def touch_articles(links, seen=None, path=None):
+    """Mark stored articles as seen in the feeds, unchanged ones included (retention counts from last_seen)"""
+    seen = seen or time.time()
+    conn = connect(path)
+    try:
+        with conn:
+            cursor = conn.executemany(
+                'UPDATE articles SET last_seen = MAX(last_seen, ?) WHERE link = ?',
+                [(seen, link) for link in links if link and link != 'No link']
+            )
+        return cursor.rowcount
+    finally:
+        conn.close()
+
+def delete_older_than(days=RETENTION_DAYS, path=None, archive=None):
+    """Retention: drop articles not seen for the given number of days.
+    
+    archive(articles) is called with them first (see article_archive); if it
+    raises nothing is deleted. Rollups keep counting deleted articles, and
+    archived_articles remembers what they count towards in case they return.
+    """
+    cutoff = time.time() - days * 86400
+    conn = connect(path)
+    try:
+        with conn:
+            if archive is not None:
+                rows = conn.execute('SELECT * FROM articles WHERE last_seen < ?', (cutoff,)).fetchall()
+                if rows:
+                    archive([
+                        dict(_article(row), taxonomy=row['taxonomy'], first_seen=row['first_seen'], last_seen=row['last_seen'])
+                        for row in rows
+                    ])
+            conn.execute(
+                'INSERT OR REPLACE INTO archived_articles (link, source, published_ts, first_seen, categories) '
+                'SELECT link, source, published_ts, first_seen, categories FROM articles WHERE last_seen < ?',
+                (cutoff,)
+            )
+            cursor = conn.execute('DELETE FROM articles WHERE last_seen < ?', (cutoff,))
+        return cursor.rowcount
+    finally:
+        conn.close()
+
+def count_stale(taxonomy, path=None):
+    """Number of articles not classified under taxonomy"""
+    conn = connect(path)
+    try:
+        return conn.execute('SELECT COUNT(*) FROM articles WHERE taxonomy IS NULL OR taxonomy != ?', (taxonomy,)).fetchone()[0]
+    finally:
+        conn.close()
+
+def stale_articles(taxonomy, batch_size=1000, path=None):
+    """Yield batches of (link, title, summary) for articles not classified under taxonomy"""
+    last = 0
+    while True:
+        conn = connect(path)
+        try:
+            rows = conn.execute(
+                'SELECT rowid, link, title, summary FROM articles '
+                'WHERE rowid > ? AND (taxonomy IS NULL OR taxonomy != ?) ORDER BY rowid LIMIT ?',
+                (last, taxonomy, batch_size)
+            ).fetchall()
+        finally:
+            conn.close()
+        if not rows:
+            return
+        last = rows[-1]['rowid']
+        yield [(row['link'], row['title'], row['summary'] or '') for row in rows]
+
+def replace_categories(labels, taxonomy, path=None):
+    """Atomically set the categories of articles ({link: [categories]}) and stamp them with taxonomy"""
+    conn = connect(path)
+    try:
+        with conn:
+            existing = _existing(conn, labels)
+            deltas = {}
+            rows = []
+            category_rows = []
+            for link, categories in labels.items():
+                old = existing.get(link)
+                if old is None:
+                    continue  # Deleted meanwhile
+                old_categories = json.loads(old['categories'])
+                if set(old_categories) != set(categories):
+                    day = day_of(old['published_ts'] if old['published_ts'] is not None else old['first_seen'])
+                    for category in set(old_categories) - set(categories):
+                        key = (day, old['source'] or 'Unknown', category)
+                        deltas[key] = deltas.get(key, 0) - 1
+                    for category in set(categories) - set(old_categories):
+                        key = (day, old['source'] or 'Unknown', category)
+                        deltas[key] = deltas.get(key, 0) + 1
+                rows.append((json.dumps(categories, ensure_ascii=False), taxonomy, link))
+                category_rows.extend((link, category) for category in categories)
+
+            conn.executemany('UPDATE articles SET categories = ?, taxonomy = ? WHERE link = ?', rows)
+            conn.executemany('DELETE FROM article_categories WHERE link = ?', [(row[2],) for row in rows])
+            conn.executemany('INSERT OR IGNORE INTO article_categories (link, category) VALUES (?, ?)', category_rows)
+            _apply_rollups(conn, deltas)
+        return len(rows)
+    finally:
+        conn.close()
+
+def adjust_rollups(deltas, path=None, labels=None):
+    """Add {(day, source, category): change} to the daily rollups (archived articles relabelled).
+
+    labels ({link: [categories]}) are the archived articles' new categories,
+    recorded so the rollups stay right if they return to the store.
+    """
+    conn = connect(path)
+    try:
+        with conn:
+            _apply_rollups(conn, deltas)
+            if labels:
+                conn.executemany(
+                    'UPDATE archived_articles SET categories = ? WHERE link = ?',
+                    [(json.dumps(categories, ensure_ascii=False), link) for link, categories in labels.items()]
+                )
+    finally:
+        conn.close()
+
+def delete_rollups_older_than(days=ROLLUP_RETENTION_DAYS, path=None):
+    cutoff = time.time() - days * 86400
+    conn = connect(path)
+    try:
+        with conn:
+            cursor = conn.execute('DELETE FROM daily_rollups WHERE day < ?', (day_of(cutoff),))
+            # Their counts are gone, so articles of those days returning are simply counted again
+            conn.execute('DELETE FROM archived_articles WHERE COALESCE(published_ts, first_seen) < ?', (cutoff - 86400,))
+        return cursor.rowcount
+    finally:
+        conn.close()
+
+def rollup_counts(start_day=None, end_day=None, source=None, category=None, group_by='category', path=None):
+    """Daily article counts from the rollups as {(day, group): count}.
+    
+    Days are inclusive YYYY-MM-DD bounds. source and category match exactly
+    (case-insensitive). group_by is 'category', 'source' or None (one
+    series, keyed by ''). Articles count once per category they carry.
+    """
+    clauses = []
+    params = []
+    if start_day:
+        clauses.append('day >= ?')
+        params.append(start_day)
+    if end_day:
+        clauses.append('day <= ?')
+        params.append(end_day)
+    if source:
+        clauses.append('source = ? COLLATE NOCASE')
+        params.append(source)
+    if category:
+        clauses.append('category = ? COLLATE NOCASE')
+        params.append(category)
+    elif group_by == 'category':
+        clauses.append('category != ?')
+        params.append(TOTAL)
+    else:
+        clauses.append('category = ?')  # Each article once
+        params.append(TOTAL)
+
+    group = {'category': 'category', 'source': 'source'}.get(group_by, "''")
+    where = ('WHERE ' + ' AND '.join(clauses)) if clauses else ''
+    conn = connect(path)
+    try:
+        rows = conn.execute(f'SELECT day, {group} AS grp, SUM(articles) FROM daily_rollups {where} GROUP BY day, grp', params)
+        return {(day, grp): count for day, grp, count in rows}
+    finally:
+        conn.close()
+
+def _article(row):
+    article = {
+        'title': row['title'],
+        'link': row['link'],
+        'published': row['published'],
+        'published_ts': row['published_ts']
+    }
+    categories = json.loads(row['categories'])
+    if categories:
+        article['categories'] = categories
+    if row['summary']:
+        article['summary'] = row['summary']
+    article['source'] = row['source']
+    if row['alternates']:
+        article['alternate_sources'] = json.loads(row['alternates'])
+    return article
+
+NEWEST_FIRST = 'ORDER BY a.published_ts IS NULL, a.published_ts DESC, a.link'
+
+def _where(start, end, source, category, text, path):
+    """WHERE clause and parameters of a query_articles query (after connect, which detects FTS5)"""
+    clauses = []
+    params = []
+    if start is not None:
+        clauses.append('a.published_ts >= ?')
+        params.append(start)
+    if end is not None:
+        clauses.append('a.published_ts < ?')
+        params.append(end)
+    if source:
+        clauses.append("a.source LIKE ? ESCAPE '\\'")
+        params.append('%' + source.replace('\\', '\\\\').replace('%', '\\%').replace('_', '\\_') + '%')
+    if category:
+        clauses.append('a.link IN (SELECT link FROM article_categories WHERE category = ?)')
+        params.append(category)
+    if text and fts_available(path):
+        clauses.append('a.rowid IN (SELECT rowid FROM articles_fts WHERE articles_fts MATCH ?)')
+        params.append(fts_query(text) or '""')
+    elif text:
+        clauses.append('(a.title LIKE ? OR a.summary LIKE ?)')
+        params.extend(['%' + text + '%'] * 2)
+    return ('WHERE ' + ' AND '.join(clauses)) if clauses else '', params
+
+def query_articles(start=None, end=None, source=None, category=None, text=None, limit=50, offset=0, path=None):
+    """Historical query over the store, newest first.
+
+    start/end are epoch seconds bounding the published time, source matches
+    as a case-insensitive substring, category exactly (case-insensitive) and
+    text is an FTS5 query over title and summary.
+    """
+    conn = connect(path)
+    try:
+        where, params = _where(start, end, source, category, text, path)
+        total = conn.execute(f'SELECT COUNT(*) FROM articles a {where}', params).fetchone()[0]
+        rows = conn.execute(
+            f'SELECT a.* FROM articles a {where} {NEWEST_FIRST} LIMIT ? OFFSET ?',
+            params + [limit, offset]
+        ).fetchall()
+        return total, [_article(row) for row in rows]
+    finally:
+        conn.close()
+
+def iter_query(start=None, end=None, source=None, category=None, text=None, batch_size=500, path=None):
+    """Every article matching a query_articles query, newest first, read batch_size rows at a time"""
+    conn = connect(path)
+    try:
+        where, params = _where(start, end, source, category, text, path)
+        cursor = conn.execute(f'SELECT a.* FROM articles a {where} {NEWEST_FIRST}', params)
+        while True:
+            rows = cursor.fetchmany(batch_size)
+            if not rows:
+                return
+            for row in rows:
+                yield _article(row)
+    finally:
+        conn.close()
+
+def iter_articles(path=None):
+    """Yield (article, last_seen) for every stored article"""
+    conn = connect(path)
+    try:
+        for row in conn.execute('SELECT * FROM articles ORDER BY last_seen'):
+            yield _article(row), row['last_seen']
+    finally:
+        conn.close()
+
+def _imported_files(path=None):
+    conn = connect(path)
+    try:
+        return {row[0] for row in conn.execute('SELECT name FROM imported_files')}
+    finally:
+        conn.close()
+
+def _record_import(name, path=None):
+    conn = connect(path)
+    try:
+        with conn:
+            conn.execute('INSERT OR REPLACE INTO imported_files (name, imported) VALUES (?, ?)', (name, time.time()))
+    finally:
+        conn.close()
+
+def import_daily_files(pattern='daily_data_*.json', path=None):
+    """Load legacy daily_data_*.json files into the store; returns the article count.
+    
+    Each file is imported once (recorded in imported_files), so a restart
+    doesn't overwrite reclassified categories or merged alternates with
+    the file's copies.
+    """
+    imported = 0
+    done = _imported_files(path)
+    for filename in sorted(glob.glob(pattern)):
+        name = os.path.basename(filename)
+        if name in done:
+            continue
+        try:
+            with open(filename, 'r', encoding='utf-8') as f:
+                daily_data = json.load(f)
+            seen = time.mktime(time.strptime(daily_data['date'], '%Y-%m-%d'))
+            imported += upsert_articles(daily_data.get('articles', []), seen, path)
+            _record_import(name, path)
+        except (OSError, ValueError, KeyError) as e:
+            print(f"⚠️ Could not import {filename}: {e}")
+    return imported
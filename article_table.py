@@ -0,0 +1,225 @@
+import copy
+import json
+import threading
+import zlib
+from array import array
+from collections import OrderedDict
+
+# Compact, read-only storage of a snapshot's articles. A list of article dicts
+# costs a hash table, a category list and half a dozen string objects per
+# article; here every field is a column: sources and categories are small
+# integers and the text of every BLOCK_SIZE articles is compressed together,
+# to be decompressed only when one of them is read.
+BLOCK_SIZE = 64      # Articles whose text is compressed together (larger blocks compress better, cost more per read)
+BLOCK_CACHE = 16     # Decompressed blocks kept per table (least recently used are dropped)
+
+# Fields held in columns, in the order article_record builds them. A field
+# with a value of another type, and any other field, is kept in extras.
+FIELDS = ('title', 'link', 'published', 'published_ts', 'categories', 'summary', 'source')
+TITLE, LINK, PUBLISHED, PUBLISHED_TS, CATEGORIES, SUMMARY, SOURCE = (1 << bit for bit in range(len(FIELDS)))
+TEXT_FIELDS = ('title', 'link', 'published', 'summary')   # Stored in the compressed blocks, in this order
+FIELD_FLAGS = {field: 1 << bit for bit, field in enumerate(FIELDS)}
+TEXT_FLAGS = [(field, FIELD_FLAGS[field]) for field in TEXT_FIELDS]
+
+_encode = json.JSONEncoder(separators=(',', ':'), sort_keys=True).encode   # As jsonify encodes
+
+class ArticleTable:
+    """Read-only article list stored column by column.
+
+    Sources and categories are interned: each article holds a source id and
+    a bitmask over the category names (bit i = categories[i]). Indexing
+    returns a new dict per article, like MappedArticles; encoded() writes an
+    article's JSON straight from the columns instead.
+    """
+
+    def __init__(self, articles):
+        self.sources = []        # source id -> name
+        self.categories = []     # bit -> category name
+        source_ids = {}
+        category_bits = {}
+
+        self._flags = array('B')          # Fields present, per article
+        self._published_ts = array('d')   # NaN for None
+        self._source_ids = array('I')
+        self._text_ends = array('I')      # End of each TEXT_FIELDS value within its block
+        self._blocks = []
+        masks = []
+        self._category_lists = {}         # position -> categories, where they aren't in bit order
+        self._extras = {}                 # position -> {field: value} not held in columns
+
+        block = []
+        end = 0
+        for position, article in enumerate(articles):
+            if position and position % BLOCK_SIZE == 0:
+                self._blocks.append(zlib.compress(b''.join(block)))
+                block = []
+                end = 0
+
+            flags = 0
+            extras = {}
+            for field, value in article.items():
+                flag = FIELD_FLAGS.get(field, 0)
+                if flag == PUBLISHED_TS:
+                    valid = value is None or isinstance(value, float)
+                elif flag == CATEGORIES:
+                    valid = isinstance(value, list) and all(isinstance(name, str) for name in value)
+                else:
+                    valid = flag and isinstance(value, str)
+                if valid:
+                    flags |= flag
+                else:
+                    extras[field] = value
+
+            for field, flag in TEXT_FLAGS:
+                value = article[field].encode('utf-8') if flags & flag else b''
+                block.append(value)
+                end += len(value)
+                self._text_ends.append(end)
+
+            timestamp = article['published_ts'] if flags & PUBLISHED_TS else None
+            self._published_ts.append(float('nan') if timestamp is None else timestamp)
+
+            source_id = 0
+            if flags & SOURCE:
+                source_id = source_ids.get(article['source'])
+                if source_id is None:
+                    source_id = source_ids[article['source']] = len(self.sources)
+                    self.sources.append(article['source'])
+            self._source_ids.append(source_id)
+
+            mask = 0
+            if flags & CATEGORIES:
+                for name in article['categories']:
+                    bit = category_bits.get(name)
+                    if bit is None:
+                        bit = category_bits[name] = len(self.categories)
+                        self.categories.append(name)
+                    mask |= 1 << bit
+                if self._labels(mask) != article['categories']:
+                    self._category_lists[position] = list(article['categories'])
+            masks.append(mask)
+
+            self._flags.append(flags)
+            if extras:
+                self._extras[position] = extras
+
+        if block:
+            self._blocks.append(zlib.compress(b''.join(block)))
+        self._masks = array('Q', masks) if len(self.categories) <= 64 else masks
+
+        # Encoded once: the JSON of every category set and source name
+        self._category_json = {}
+        self._source_json = [_encode(name) for name in self.sources]
+
+        self._cache = OrderedDict()   # block number -> decompressed block
+        self._cache_lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._flags)
+
+    def _labels(self, mask):
+        return [name for bit, name in enumerate(self.categories) if mask & (1 << bit)]
+
+    def _block(self, number):
+        with self._cache_lock:
+            data = self._cache.get(number)
+            if data is not None:
+                self._cache.move_to_end(number)
+                return data
+        data = zlib.decompress(self._blocks[number])   # Outside the lock
+        with self._cache_lock:
+            self._cache[number] = data
+            while len(self._cache) > BLOCK_CACHE:
+                self._cache.popitem(last=False)
+        return data
+
+    def _text(self, index):
+        """[title, link, published, summary] of an article, '' where absent"""
+        data = self._block(index // BLOCK_SIZE)
+        first = index * len(TEXT_FIELDS)
+        start = self._text_ends[first - 1] if index % BLOCK_SIZE else 0
+        values = []
+        for end in self._text_ends[first:first + len(TEXT_FIELDS)]:
+            values.append(data[start:end].decode('utf-8'))
+            start = end
+        return values
+
+    def link(self, index):
+        """Link of an article (None if it has none) without building the article"""
+        return self._text(index)[1] if self._flags[index] & LINK else None
+
+    def _fields(self, index):
+        """(field, value) pairs of an article's columns, in article_record order"""
+        flags = self._flags[index]
+        title, link, published, summary = self._text(index)
+        if flags & TITLE:
+            yield 'title', title
+        if flags & LINK:
+            yield 'link', link
+        if flags & PUBLISHED:
+            yield 'published', published
+        if flags & PUBLISHED_TS:
+            timestamp = self._published_ts[index]
+            yield 'published_ts', None if timestamp != timestamp else timestamp   # NaN marks None
+        if flags & CATEGORIES:
+            if index in self._category_lists:
+                yield 'categories', list(self._category_lists[index])
+            else:
+                yield 'categories', self._labels(self._masks[index])
+        if flags & SUMMARY:
+            yield 'summary', summary
+        if flags & SOURCE:
+            yield 'source', self.sources[self._source_ids[index]]
+
+    def _load(self, index):
+        article = dict(self._fields(index))
+        if index in self._extras:
+            article.update(copy.deepcopy(self._extras[index]))   # Callers may modify their copy
+        return article
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return [self._load(i) for i in range(*index.indices(len(self)))]
+        if index < 0:
+            index += len(self)
+        if not 0 <= index < len(self):
+            raise IndexError('article index out of range')
+        return self._load(index)
+
+    def __iter__(self):
+        for index in range(len(self)):
+            yield self._load(index)
+
+    def _categories_json(self, index):
+        if index in self._category_lists:
+            return _encode(self._category_lists[index])
+        mask = self._masks[index]
+        encoded = self._category_json.get(mask)
+        if encoded is None:
+            encoded = self._category_json[mask] = _encode(self._labels(mask))
+        return encoded
+
+    def encoded(self, index):
+        """UTF-8 JSON of an article, keys sorted and compact like jsonify"""
+        flags = self._flags[index]
+        title, link, published, summary = self._text(index)
+        fields = []   # (field, JSON value) in key order
+        if flags & CATEGORIES:
+            fields.append(('categories', self._categories_json(index)))
+        if flags & LINK:
+            fields.append(('link', _encode(link)))
+        if flags & PUBLISHED:
+            fields.append(('published', _encode(published)))
+        if flags & PUBLISHED_TS:
+            timestamp = self._published_ts[index]
+            fields.append(('published_ts', 'null' if timestamp != timestamp else repr(timestamp)))
+        if flags & SOURCE:
+            fields.append(('source', self._source_json[self._source_ids[index]]))
+        if flags & SUMMARY:
+            fields.append(('summary', _encode(summary)))
+        if flags & TITLE:
+            fields.append(('title', _encode(title)))
+        if index in self._extras:
+            fields.extend((field, _encode(value)) for field, value in self._extras[index].items())
+            fields.sort()
+        return ('{' + ','.join(f'"{field}":{value}' if field in FIELD_FLAGS else f'{_encode(field)}:{value}' for field, value in fields) + '}').encode('utf-8')
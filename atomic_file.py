@@ -0,0 +1,25 @@
+import os
+import threading
+
+def write_atomic(path, data):
+    """Write text or bytes to path via a temporary file and rename.
+
+    Readers see the old file or the new one, never a partial write. The
+    temporary name is unique per process and thread, so concurrent writers
+    can't clobber each other's half-written file.
+    """
+    if isinstance(data, str):
+        data = data.encode('utf-8')
+    tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+    try:
+        with open(tmp_path, 'wb') as f:
+            f.write(data)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, path)
+    except BaseException:
+        try:
+            os.remove(tmp_path)
+        except OSError:
+            pass
+        raise
@@ -0,0 +1,55 @@
+"""Micro-benchmark: compiled keyword matcher vs. the original substring classifier.
+
+Usage: python benchmarks/bench_classifier.py [article_count]
+"""
+import json
+import os
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from fix_all_feeds import CHEMICAL_KEYWORDS, classify_chemical_news, classify_batch
+
+def classify_substring(title, summary):
+    """The original classifier: one substring scan per keyword"""
+    txt = (title + ' ' + summary).lower()
+    classifications = []
+
+    for category, keywords in CHEMICAL_KEYWORDS.items():
+        for keyword in keywords:
+            if keyword.lower() in txt:
+                classifications.append(category)
+                break
+
+    return classifications
+
+def load_articles(count):
+    """(title, summary) pairs from latest.json, repeated up to count"""
+    with open(os.path.join(ROOT, 'latest.json'), 'r', encoding='utf-8') as f:
+        articles = json.load(f)['articles']
+    pairs = [(a.get('title', ''), a.get('summary', '')) for a in articles]
+    return (pairs * (count // len(pairs) + 1))[:count]
+
+def timed(label, func, count):
+    start = time.perf_counter()
+    result = func()
+    elapsed = time.perf_counter() - start
+    print(f"{label:<22} {elapsed * 1000:8.1f} ms  {elapsed / count * 1e6:7.2f} µs/article")
+    return result
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 20000
+    pairs = load_articles(count)
+    print(f"Classifying {count} articles")
+
+    old = timed('substring (original)', lambda: [classify_substring(t, s) for t, s in pairs], count)
+    new = timed('compiled matcher', lambda: [classify_chemical_news(t, s) for t, s in pairs], count)
+    timed('compiled batch', lambda: classify_batch(pairs), count)
+
+    changed = sum(1 for a, b in zip(old, new) if a != b)
+    print(f"Label sets differing (word-boundary matching): {changed}")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,249 @@
+"""Synthetic RSS/Atom server standing in for the real publishers.
+
+Serves any number of feeds (13 to 10,000+) with hundreds of entries each at
+http://127.0.0.N:PORT/feeds/<n>.xml, injecting latency, failures, 304s and
+oversized bodies. Feed content and behaviour are seeded, so runs repeat.
+
+Usage: python benchmarks/feed_server.py [--feeds 13] [--entries 200] [--feeds-file feeds.json]
+Then:  RSS_FEEDS_FILE=feeds.json python fix_all_feeds.py
+"""
+import argparse
+import json
+import os
+import random
+import re
+import threading
+import time
+from email.utils import formatdate
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+FEED_PATH = re.compile(r'^/feeds/(\d+)\.xml(\?mirror=1)?$')
+
+# Titles and summaries are drawn from these so the classifier has real work to do
+KEYWORDS = [
+    'methanol', 'benzene', 'aniline', 'toluene', 'caustic soda', 'ethylene', 'propylene',
+    'polymer', 'fertilizer', 'pharmaceutical', 'specialty chemicals', 'petrochemical',
+    'price', 'prices', 'capacity', 'plant', 'expansion', 'acquisition', 'Reliance',
+    'Tata Chemicals', 'UPL', 'BASF', 'Dow', 'tariff', 'anti-dumping', 'export', 'import',
+]
+FILLER = [
+    'market', 'quarter', 'shares', 'growth', 'demand', 'supply', 'report', 'india',
+    'company', 'sector', 'investors', 'profit', 'revenue', 'output', 'policy', 'global',
+    'monsoon', 'rupee', 'bank', 'election', 'cricket', 'startup', 'funding', 'weather',
+]
+
+class SyntheticFeeds:
+    """Deterministic feed contents and per-feed behaviour.
+
+    Each feed is independently (by seed) Atom or RSS, failing (503 unless
+    fetched as a mirror), oversized, or changing (a new entry on every
+    200 response). Unchanged feeds answer conditional requests with 304.
+    """
+
+    def __init__(self, feeds=13, entries=200, latency=0.05, jitter=0.05, failure_rate=0.1,
+                 oversized_rate=0.0, change_rate=0.2, atom_share=0.3,
+                 oversized_bytes=6 * 1024 * 1024, seed=0):
+        self.feeds = feeds
+        self.entries = entries
+        self.latency = latency
+        self.jitter = jitter
+        self.failure_rate = failure_rate
+        self.oversized_rate = oversized_rate
+        self.change_rate = change_rate
+        self.atom_share = atom_share
+        self.oversized_bytes = oversized_bytes
+        self.seed = seed
+        self.base_time = int(time.time()) // 86400 * 86400  # Entries lead up to today
+        self._versions = {}
+        self._lock = threading.Lock()
+        self.responses = {}
+
+    def config(self):
+        return {name: value for name, value in vars(self).items() if not name.startswith('_') and name != 'responses'}
+
+    def traits(self, n):
+        r = random.Random(f"{self.seed}-{n}")
+        return {
+            'atom': r.random() < self.atom_share,
+            'failing': r.random() < self.failure_rate,
+            'oversized': r.random() < self.oversized_rate,
+            'changing': r.random() < self.change_rate,
+            'interval': r.randint(60, 3600),   # Seconds between entries
+        }
+
+    def delay(self):
+        return self.latency + random.uniform(0, self.jitter)
+
+    def next_version(self, n, changing):
+        """Version to serve: changing feeds gain an entry on every full response"""
+        if not changing:
+            return 0
+        with self._lock:
+            version = self._versions.get(n, 0) + 1
+            self._versions[n] = version
+            return version
+
+    def current_version(self, n):
+        with self._lock:
+            return self._versions.get(n, 0)
+
+    def count(self, status):
+        with self._lock:
+            self.responses[status] = self.responses.get(status, 0) + 1
+
+    def _words(self, r, count):
+        return ' '.join(r.choice(KEYWORDS) if r.random() < 0.2 else r.choice(FILLER) for _ in range(count))
+
+    def _entries(self, n, version, traits):
+        newest = self.entries - 1 + version
+        for i in range(newest, newest - self.entries, -1):
+            r = random.Random(f"{self.seed}-{n}-{i}")
+            published = self.base_time + (i - self.entries) * traits['interval']  # Stable per entry
+            yield {
+                'id': f"urn:synthetic:{n}:{i}",
+                'title': self._words(r, 10).capitalize(),
+                'link': f"https://publisher{n}.example.com/news/{i}?utm_source=rss",
+                'summary': self._words(r, 40).capitalize() + '.',
+                'published': published,
+            }
+
+    def render(self, n, version):
+        traits = self.traits(n)
+        if traits['atom']:
+            items = ''.join(
+                f"<entry><title>{e['title']}</title><link href=\"{_xml(e['link'])}\"/><id>{e['id']}</id>"
+                f"<updated>{time.strftime('%Y-%m-%dT%H:%M:%SZ', time.gmtime(e['published']))}</updated>"
+                f"<summary>{e['summary']}</summary></entry>"
+                for e in self._entries(n, version, traits)
+            )
+            body = (f'<?xml version="1.0" encoding="utf-8"?><feed xmlns="http://www.w3.org/2005/Atom">'
+                    f'<title>Synthetic feed {n}</title><id>urn:synthetic:{n}</id>{items}</feed>')
+        else:
+            items = ''.join(
+                f"<item><title>{e['title']}</title><link>{_xml(e['link'])}</link><guid>{e['id']}</guid>"
+                f"<pubDate>{formatdate(e['published'])}</pubDate><description>{e['summary']}</description></item>"
+                for e in self._entries(n, version, traits)
+            )
+            body = (f'<?xml version="1.0" encoding="utf-8"?><rss version="2.0"><channel>'
+                    f'<title>Synthetic feed {n}</title><ttl>30</ttl>{items}</channel></rss>')
+        body = body.encode('utf-8')
+        if traits['oversized'] and len(body) < self.oversized_bytes:
+            body += b'<!--' + b' ' * (self.oversized_bytes - len(body)) + b'-->'
+        return body
+
+def _xml(text):
+    return text.replace('&', '&amp;')
+
+class FeedHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+
+    def log_message(self, format, *args):
+        pass
+
+    def _send(self, status, body=b'', headers=()):
+        self.server.synthetic.count(status)
+        self.send_response(status)
+        for name, value in headers:
+            self.send_header(name, value)
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        try:
+            self.wfile.write(body)
+        except (BrokenPipeError, ConnectionResetError):
+            pass  # Client gave up (e.g. on an oversized body)
+
+    def do_GET(self):
+        feeds = self.server.synthetic
+        match = FEED_PATH.match(self.path)
+        if not match or int(match.group(1)) >= feeds.feeds:
+            return self._send(404)
+        n = int(match.group(1))
+        traits = feeds.traits(n)
+
+        time.sleep(feeds.delay())
+        if traits['failing'] and not match.group(2):
+            return self._send(503)
+
+        # Unchanged feeds keep their ETag, so conditional requests get a 304
+        etag = f'"{n}-{feeds.current_version(n)}"'
+        if not traits['changing'] and self.headers.get('If-None-Match') == etag:
+            return self._send(304, headers=[('ETag', etag)])
+
+        version = feeds.next_version(n, traits['changing'])
+        content_type = 'application/atom+xml' if traits['atom'] else 'application/rss+xml'
+        self._send(200, feeds.render(n, version), [
+            ('Content-Type', content_type),
+            ('ETag', f'"{n}-{version}"'),
+        ])
+
+def serve(synthetic, hosts=1, port=0):
+    """Start the server on 127.0.0.1 .. 127.0.0.<hosts> in daemon threads.
+
+    Several loopback hosts (Linux only) keep the scraper's per-host
+    connection limit from serialising every fetch. Returns the servers.
+    """
+    servers = []
+    for host in range(1, hosts + 1):
+        server = ThreadingHTTPServer((f"127.0.0.{host}", port), FeedHandler)
+        server.daemon_threads = True
+        server.synthetic = synthetic
+        port = server.server_address[1]  # Same port on every host
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        servers.append(server)
+    return servers
+
+def feed_list(synthetic, servers):
+    """RSS_FEEDS-style {source: [urls]}; failing feeds also get a working mirror"""
+    feeds = {}
+    for n in range(synthetic.feeds):
+        host, port = servers[n % len(servers)].server_address
+        url = f"http://{host}:{port}/feeds/{n}.xml"
+        urls = [url]
+        if synthetic.traits(n)['failing']:
+            urls.append(url + '?mirror=1')
+        feeds[f"Synthetic {n}"] = urls
+    return feeds
+
+def add_arguments(parser):
+    """Command-line options shared with run_benchmarks.py"""
+    parser.add_argument('--feeds', type=int, default=13, help='number of feeds (sources)')
+    parser.add_argument('--entries', type=int, default=200, help='entries per feed')
+    parser.add_argument('--latency', type=float, default=0.05, help='seconds added to every response')
+    parser.add_argument('--jitter', type=float, default=0.05, help='up to this many extra seconds, random')
+    parser.add_argument('--failure-rate', type=float, default=0.1, help='share of feeds answering 503 (their mirror works)')
+    parser.add_argument('--oversized-rate', type=float, default=0.0, help='share of feeds with bodies over the size limit')
+    parser.add_argument('--change-rate', type=float, default=0.2, help='share of feeds with a new entry on every fetch (the rest 304)')
+    parser.add_argument('--atom-share', type=float, default=0.3, help='share of feeds served as Atom')
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--hosts', type=int, default=1, help='loopback addresses to spread feeds over (Linux)')
+
+def from_arguments(args):
+    return SyntheticFeeds(
+        feeds=args.feeds, entries=args.entries, latency=args.latency, jitter=args.jitter,
+        failure_rate=args.failure_rate, oversized_rate=args.oversized_rate,
+        change_rate=args.change_rate, atom_share=args.atom_share, seed=args.seed,
+    )
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    add_arguments(parser)
+    parser.add_argument('--port', type=int, default=8765)
+    parser.add_argument('--feeds-file', default='synthetic_feeds.json', help='where to write the feed list for RSS_FEEDS_FILE')
+    args = parser.parse_args()
+
+    synthetic = from_arguments(args)
+    servers = serve(synthetic, args.hosts, args.port)
+    with open(args.feeds_file, 'w', encoding='utf-8') as f:
+        json.dump(feed_list(synthetic, servers), f, indent=2)
+
+    host, port = servers[0].server_address
+    print(f"📡 Serving {args.feeds} synthetic feeds on port {port} ({args.hosts} host(s))")
+    print(f"📁 Feed list: {os.path.abspath(args.feeds_file)} (set RSS_FEEDS_FILE to it)")
+    try:
+        while True:
+            time.sleep(60)
+    except KeyboardInterrupt:
+        print("\n👋 Stopped")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,213 @@
+"""Repeatable benchmarks of scraping, classification, snapshot building and the API.
+
+Runs against the synthetic feeds of benchmarks/feed_server.py from a
+temporary working directory, so no publisher is contacted and no state
+file of the checkout is touched. Results are written as JSON so runs can
+be compared between releases.
+
+Usage: python benchmarks/run_benchmarks.py [--feeds 13] [--entries 200] [--requests 500] [--output results.json]
+"""
+import argparse
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+from datetime import datetime
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+import feed_server
+
+def git_commit():
+    try:
+        return subprocess.run(['git', 'rev-parse', 'HEAD'], cwd=ROOT, capture_output=True, text=True).stdout.strip() or None
+    except OSError:
+        return None
+
+def timings(samples):
+    """Summary of a list of durations in seconds"""
+    ordered = sorted(samples)
+    return {
+        'runs': len(ordered),
+        'min': round(ordered[0], 6),
+        'median': round(statistics.median(ordered), 6),
+        'p95': round(ordered[min(len(ordered) - 1, int(len(ordered) * 0.95))], 6),
+        'max': round(ordered[-1], 6),
+    }
+
+def timed(func, repeat):
+    samples = []
+    result = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = func()
+        samples.append(time.perf_counter() - start)
+    return result, timings(samples)
+
+def report(name, result):
+    rate = ''
+    if 'per_second' in result:
+        rate = f"  {result['per_second']:,.0f}/s"
+    print(f"{name:<28} median {result['median'] * 1000:9.2f} ms{rate}")
+
+def bench_scrape(deadline, synthetic):
+    """Cold scrape (every feed new), then a warm one (304s, incremental)"""
+    from fix_all_feeds import scrape_all_sources
+    results = {}
+    for name in ('scrape_cold', 'scrape_warm'):
+        before = dict(synthetic.responses)
+        articles, result = timed(lambda: scrape_all_sources(deadline=deadline, report_path=None, incremental=True), 1)
+        result['articles'] = len(articles)
+        result['responses'] = {str(status): count - before.get(status, 0) for status, count in synthetic.responses.items()}
+        results[name] = result
+    return results
+
+def bench_classify(articles, repeat):
+    from fix_all_feeds import classify_batch, classify_chemical_news
+    pairs = [(a.get('title', ''), a.get('summary', '')) for a in articles]
+    _, single = timed(lambda: [classify_chemical_news(t, s) for t, s in pairs], repeat)
+    _, batch = timed(lambda: classify_batch(pairs), repeat)
+    for result in (single, batch):
+        result['articles'] = len(pairs)
+        result['per_second'] = len(pairs) / result['median'] if result['median'] else None
+    return {'classify': single, 'classify_batch': batch}
+
+def bench_snapshot(articles, repeat):
+    from dedup import Deduplicator, dedupe_articles
+    from snapshot import build_snapshot
+    deduped, dedup = timed(lambda: dedupe_articles([dict(a) for a in articles], Deduplicator()), repeat)
+    snapshot, build = timed(lambda: build_snapshot(deduped), repeat)
+    dedup['articles'] = len(articles)
+    build['articles'] = len(deduped)
+    return snapshot, {'dedup': dedup, 'build_snapshot': build}
+
+def bench_memory(articles):
+    """Bytes per article held by the article dicts, by a snapshot built from them and by a search index over it.
+
+    Only the snapshot is compact: the search index every serving process
+    keeps (postings plus its own article dicts) and, in the scraping
+    process, feed_state still hold article dicts of their own.
+    """
+    from search_index import SearchIndex
+    from snapshot import build_snapshot
+    encoded = json.dumps(articles)
+    tracemalloc.start()
+    try:
+        start = tracemalloc.get_traced_memory()[0]
+        dicts = json.loads(encoded)
+        dict_bytes = tracemalloc.get_traced_memory()[0] - start
+        snapshot = build_snapshot(dicts)
+        del dicts
+        snapshot_bytes = tracemalloc.get_traced_memory()[0] - start
+        index = SearchIndex()
+        index.add_many(snapshot['articles'])
+        index_bytes = tracemalloc.get_traced_memory()[0] - start - snapshot_bytes
+    finally:
+        tracemalloc.stop()
+    count = max(1, len(snapshot['articles']))
+    return {
+        'articles': len(snapshot['articles']),
+        'dict_bytes_per_article': round(dict_bytes / count),
+        'snapshot_bytes_per_article': round(snapshot_bytes / count),
+        'search_index_bytes_per_article': round(index_bytes / count),
+    }
+
+def bench_api(snapshot, requests, repeat):
+    """Throughput of /api/news and /api/summary through the Flask test client.
+
+    Cached: the response cache answers. Uncached: it is cleared before
+    every request, so each one filters and encodes the snapshot.
+    """
+    import api_server
+    from response_cache import response_cache
+    api_server.latest_data = snapshot
+    client = api_server.app.test_client()
+    headers = {'Accept-Encoding': 'gzip'}
+
+    results = {}
+    for path in ('/api/news', '/api/news?category=Chemical Pricing', '/api/news?limit=50', '/api/summary'):
+        for mode in ('cached', 'uncached'):
+            def run():
+                for _ in range(requests):
+                    if mode == 'uncached':
+                        response_cache.clear()
+                    response = client.get(path, headers=headers)
+                    assert response.status_code == 200, response.status_code
+            _, result = timed(run, repeat)
+            result['requests'] = requests
+            result['per_second'] = requests / result['median'] if result['median'] else None
+            results[f"GET {path} ({mode})"] = result
+    return results
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    feed_server.add_arguments(parser)
+    parser.add_argument('--requests', type=int, default=500, help='API requests per measurement')
+    parser.add_argument('--repeat', type=int, default=5, help='runs of each in-process benchmark')
+    parser.add_argument('--deadline', type=float, default=None, help='scrape deadline in seconds (default: none)')
+    parser.add_argument('--output', help='results file (default benchmarks/results/<timestamp>.json)')
+    args = parser.parse_args()
+    started = datetime.now()
+
+    output = args.output or os.path.join(ROOT, 'benchmarks', 'results', started.strftime('%Y%m%d-%H%M%S') + '.json')
+    output = os.path.abspath(output)
+
+    synthetic = feed_server.from_arguments(args)
+    servers = feed_server.serve(synthetic, args.hosts)
+
+    # Feed list, state files, article store and snapshot all live in a scratch directory
+    workdir = tempfile.mkdtemp(prefix='rss-bench-')
+    os.chdir(workdir)
+    with open('feeds.json', 'w', encoding='utf-8') as f:
+        json.dump(feed_server.feed_list(synthetic, servers), f)
+    os.environ['RSS_FEEDS_FILE'] = os.path.join(workdir, 'feeds.json')
+
+    print(f"🏁 Benchmarking {args.feeds} feeds x {args.entries} entries in {workdir}")
+    results = bench_scrape(args.deadline, synthetic)
+    for name in ('scrape_cold', 'scrape_warm'):
+        report(name, results[name])
+
+    from fix_all_feeds import current_articles
+    articles = current_articles()
+    for name, result in bench_classify(articles, args.repeat).items():
+        results[name] = result
+        report(name, result)
+
+    snapshot, snapshot_results = bench_snapshot(articles, args.repeat)
+    for name, result in snapshot_results.items():
+        results[name] = result
+        report(name, result)
+
+    results['memory'] = bench_memory(articles)
+    print(f"{'memory':<28} {results['memory']['dict_bytes_per_article']:,} bytes/article as dicts, "
+          f"{results['memory']['snapshot_bytes_per_article']:,} in a snapshot, "
+          f"{results['memory']['search_index_bytes_per_article']:,} in the search index")
+
+    for name, result in bench_api(snapshot, args.requests, args.repeat).items():
+        results[name] = result
+        report(name, result)
+
+    for server in servers:
+        server.shutdown()
+
+    document = {
+        'started': started.isoformat(),
+        'commit': git_commit(),
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'config': dict(synthetic.config(), hosts=args.hosts, requests=args.requests, repeat=args.repeat, deadline=args.deadline),
+        'results': results,
+    }
+    os.makedirs(os.path.dirname(output), exist_ok=True)
+    with open(output, 'w', encoding='utf-8') as f:
+        json.dump(document, f, indent=2)
+    print(f"📁 Results saved to {output}")
+
+if __name__ == '__main__':
+    main()
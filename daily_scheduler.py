@@ -1,58 +1,53 @@
-import schedule
-import time
 import json
-from datetime import datetime, timedelta
+from datetime import datetime
 import pytz
-from fix_all_feeds import scrape_all_sources, CHEMICAL_KEYWORDS
-import os
+from fix_all_feeds import scrape_all_sources, current_articles, taxonomy, CHEMICAL_KEYWORDS, RSS_FEEDS, REPORT_FILE
+import article_store
+import article_archive
+import reclassify
+from dedup import dedupe_articles, touched_by
+from event_broker import broker
+from snapshot import build_snapshot
+from snapshot_file import SNAPSHOT_FILE, write_snapshot
+from atomic_file import write_atomic
+import scrape_lock
+import feed_state
+import metrics
+from poll_scheduler import PollScheduler, is_due, poll_interval, RATE_BUDGET
 
-def daily_rss_job():
-    """Daily job to scrape RSS feeds and save data"""
+MAINTENANCE_HOUR = 2  # IST hour after which the day's history maintenance runs (with the first poll)
+
+_published_links = None  # Links of the last published snapshot, in order
+
+def daily_rss_job(sources=None):
+    """Scrape RSS feeds (all, or only the given sources) and save data; returns True on success.
+    
+    Articles of sources not scraped this time come from their last scrape.
+    latest.json and the snapshot are only rewritten when the articles
+    changed. Call it through scrape_lock.run_exclusive so only one process
+    scrapes.
+    """
     ist = pytz.timezone('Asia/Kolkata')
     now = datetime.now(ist)
     
-    print(f"🕐 [{now.strftime('%Y-%m-%d %H:%M:%S')}] Starting daily RSS scrape...")
+    print(f"🕐 [{now.strftime('%Y-%m-%d %H:%M:%S')}] Starting RSS scrape of {', '.join(sources) if sources else 'all sources'}...")
+    global _published_links
     
     try:
-        # Run the RSS scrape
-        scrape_all_sources()
-        
-        # Read the scraped data and convert to JSON
-        with open('all_sources_data.txt', 'r', encoding='utf-8') as f:
-            content = f.read()
-        
-        # Parse articles
-        articles = []
-        lines = content.split('\n')
-        current_article = {}
-        current_source = "Unknown"
+        # Run the RSS scrape; only new or changed entries are classified (state in feed_state.json)
+        # Partial polls don't overwrite the all-sources report
+        delta = scrape_all_sources(incremental=True, sources=sources, report_path=REPORT_FILE if sources is None else None)
+        with metrics.span('dedup'):
+            articles = dedupe_articles([dict(article) for article in current_articles()])
         
-        for line in lines:
-            if line.startswith('SOURCE: '):
-                current_source = line.replace('SOURCE: ', '')
-            elif line.startswith('ARTICLE '):
-                if current_article and 'title' in current_article:
-                    current_article['source'] = current_source
-                    articles.append(current_article)
-                current_article = {}
-            elif line.startswith('Title: '):
-                current_article['title'] = line.replace('Title: ', '')
-            elif line.startswith('Link: '):
-                current_article['link'] = line.replace('Link: ', '')
-            elif line.startswith('Published: '):
-                current_article['published'] = line.replace('Published: ', '')
-            elif line.startswith('🏷️ Categories: '):
-                current_article['categories'] = line.replace('🏷️ Categories: ', '').split(', ')
-            elif line.startswith('Summary: '):
-                current_article['summary'] = line.replace('Summary: ', '')
-        
-        # Add the last article
-        if current_article and 'title' in current_article:
-            current_article['source'] = current_source
-            articles.append(current_article)
-        
-        # Filter out articles without titles
-        articles = [a for a in articles if 'title' in a and a['title'] != 'No title']
+        links = [article.get('link') for article in articles]
+        # Unchanged articles still in the feeds are seen too: retention counts from last_seen
+        article_store.touch_articles(links)
+        if not delta and links == _published_links:
+            # Nothing new: readers keep the published snapshot (see scrape_lock.last_scrape)
+            metrics.save_ingest()
+            print(f"✅ [{now.strftime('%H:%M:%S')}] Scrape completed, no new or updated articles")
+            return True
         
         # Create daily data structure
         daily_data = {
@@ -66,72 +61,117 @@ def daily_rss_job():
             }
         }
         
-        # Save to daily JSON file
-        filename = f"daily_data_{now.strftime('%Y-%m-%d')}.json"
-        with open(filename, 'w', encoding='utf-8') as f:
-            json.dump(daily_data, f, indent=2, ensure_ascii=False)
+        # Upsert the new and changed articles into the article store (keyed by link)
+        touched = touched_by(articles, delta)
+        with metrics.span('store', articles=len(touched)):
+            article_store.upsert_articles(touched, taxonomy=taxonomy())
         
-        # Save to latest.json (always updated)
-        with open('latest.json', 'w', encoding='utf-8') as f:
-            json.dump(daily_data, f, indent=2, ensure_ascii=False)
+        with metrics.span('snapshot', articles=len(articles)):
+            # Save to latest.json (always updated)
+            write_atomic('latest.json', json.dumps(daily_data, indent=2, ensure_ascii=False))
+            
+            # Publish the snapshot served by API workers (SNAPSHOT_MODE=mapped)
+            write_snapshot(build_snapshot(articles))
+        _published_links = links
         
-        print(f"✅ [{now.strftime('%H:%M:%S')}] Daily scrape completed!")
-        print(f"📊 Articles found: {len(articles)}")
-        print(f"📁 Saved to: {filename} and latest.json")
+        # Push the new and changed articles to /api/stream clients
+        broker.publish(touched)
+        metrics.save_ingest()
         
-        # Clean up old files (keep last 30 days)
-        cleanup_old_files()
+        print(f"✅ [{now.strftime('%H:%M:%S')}] Daily scrape completed!")
+        print(f"📊 Articles found: {len(articles)} ({len(delta)} new or updated)")
+        print(f"📁 Saved to: {article_store.DB_FILE}, latest.json and {SNAPSHOT_FILE}")
+        return True
         
     except Exception as e:
         print(f"❌ [{now.strftime('%H:%M:%S')}] Error in daily job: {e}")
+        return False
+
+def poll_sources(sources):
+    """Scheduled poll of some sources; skips those another instance polled meanwhile"""
+    def job():
+        feed_state.reload()
+        due = [source for source in sources if is_due(source)]
+        if not due:
+            return False  # Nothing fetched, so no scrape is recorded as confirming the data
+        return daily_rss_job(due)
+    scrape_lock.run_exclusive(job)
+    run_daily_maintenance()
+
+def daily_maintenance():
+    """Relabel history classified with older keywords, then archive old articles"""
+    reclassify_history()
+    cleanup_old_files()
+
+def run_daily_maintenance():
+    """Run daily_maintenance once per IST day after MAINTENANCE_HOUR, on whichever instance gets there first"""
+    now = datetime.now(pytz.timezone('Asia/Kolkata'))
+    day = now.strftime('%Y-%m-%d')
+    if now.hour < MAINTENANCE_HOUR or scrape_lock.last_scrape(scrape_lock.MAINTENANCE_SLOT_FILE).get('slot') == day:
+        return False
+    return scrape_lock.run_exclusive(daily_maintenance, slot=day, slot_file=scrape_lock.MAINTENANCE_SLOT_FILE)
+
+def reclassify_history():
+    """Relabel stored and archived articles if CHEMICAL_KEYWORDS changed since they were classified"""
+    try:
+        with metrics.span('reclassify'):
+            stored, rewritten = reclassify.reclassify(CHEMICAL_KEYWORDS)
+        if stored or rewritten:
+            print(f"🏷️ Reclassified {stored} stored articles and {rewritten} archive partitions")
+    except Exception as e:
+        print(f"⚠️ Error reclassifying history: {e}")
 
 def cleanup_old_files():
-    """Clean up old daily files (keep last 30 days)"""
+    """Move articles not seen in the last 30 days to the compressed archive and keep it within budget"""
     try:
-        files = [f for f in os.listdir('.') if f.startswith('daily_data_') and f.endswith('.json')]
-        files.sort()
-        
-        # Keep only last 30 files
-        if len(files) > 30:
-            files_to_delete = files[:-30]
-            for file in files_to_delete:
-                os.remove(file)
-                print(f"🗑️ Deleted old file: {file}")
+        archived = article_store.delete_older_than(article_store.RETENTION_DAYS, archive=article_archive.append)
+        if archived:
+            print(f"📦 Archived {archived} old articles")
+        removed = article_archive.enforce_budget()
+        if removed:
+            print(f"🗑️ Deleted {removed} archive partitions (retention or disk budget)")
+        article_store.delete_rollups_older_than()
+    except Exception as e:
+        print(f"⚠️ Error cleaning up old articles: {e}")
+
+def import_legacy_files():
+    """Move history from daily_data_*.json files into the article store"""
+    try:
+        imported = article_store.import_daily_files()
+        if imported:
+            print(f"📥 Imported {imported} articles from daily_data_*.json files")
     except Exception as e:
-        print(f"⚠️ Error cleaning up files: {e}")
+        print(f"⚠️ Error importing daily files: {e}")
 
 def run_manual_scrape():
     """Manual function to run scrape immediately"""
     print("🔄 Running manual scrape...")
-    daily_rss_job()
+    import_legacy_files()
+    scrape_lock.run_exclusive(daily_rss_job)
+    scrape_lock.run_exclusive(daily_maintenance, slot_file=scrape_lock.MAINTENANCE_SLOT_FILE)
 
 def start_scheduler():
-    """Start the daily scheduler"""
+    """Start the polling scheduler: each source is polled on its own adaptive interval"""
     ist = pytz.timezone('Asia/Kolkata')
     now = datetime.now(ist)
     
     print("🚀 Starting Chemical Industry RSS Monitor Scheduler...")
     print(f"📅 Current time (IST): {now.strftime('%Y-%m-%d %H:%M:%S')}")
-    print("⏰ Scheduled jobs:")
-    print("   - Daily scrape at 09:00 IST")
-    print("   - Daily scrape at 18:00 IST")
+    print(f"⏰ Polling each source from its publish rate and feed ttl (budget {RATE_BUDGET} polls/hour):")
+    for source in RSS_FEEDS:
+        print(f"   - {source}: every {poll_interval(source) / 60:.0f} min")
     print("   - Manual refresh available")
     
-    # Schedule daily jobs
-    schedule.every().day.at("09:00").do(daily_rss_job)  # Morning scrape
-    schedule.every().day.at("18:00").do(daily_rss_job)  # Evening scrape
+    import_legacy_files()
     
-    # Run initial scrape
-    print("🔄 Running initial scrape...")
-    daily_rss_job()
+    # Sources never polled (or overdue) are due right away
+    scheduler = PollScheduler(RSS_FEEDS, poll_sources)
     
-    print("⏳ Waiting for scheduled jobs...")
+    print("⏳ Waiting for scheduled polls...")
     print("💡 Press Ctrl+C to stop")
     
     try:
-        while True:
-            schedule.run_pending()
-            time.sleep(60)  # Check every minute
+        scheduler.run_forever()
     except KeyboardInterrupt:
         print("\n🛑 Scheduler stopped by user")
 
@@ -0,0 +1,193 @@
+import hashlib
+import threading
+import time
+from collections import deque
+from urllib.parse import parse_qsl, urlencode, urlsplit, urlunsplit
+from keyword_matcher import tokenize
+from search_index import terms_of
+
+# Query parameters that only track the click, never select the story
+# (generic names like 'ref' or 'from' are left alone: some sites select the story with them)
+TRACKING_PARAMS = {'fbclid', 'gclid', 'dclid', 'mc_cid', 'mc_eid', 'ref_src', 'cmpid', 'amp', 'outputtype', 'ncid', 'ito'}
+TRACKING_PREFIXES = ('utm_',)
+
+# Near-duplicate title detection (64-bit SimHash split into LSH bands)
+SIMHASH_BITS = 64
+BANDS = 8                  # Pairs within MAX_DISTANCE bits always share a band when BANDS > MAX_DISTANCE
+MAX_DISTANCE = 6           # Hamming distance at which two titles count as the same story
+MIN_TITLE_TOKENS = 4       # Shorter titles are too generic to compare by SimHash
+WINDOW_SIZE = 5000         # Recent articles kept for comparison
+WINDOW_SECONDS = 48 * 3600 # Articles first seen longer ago drop out of the window
+
+BAND_BITS = SIMHASH_BITS // BANDS
+BAND_MASK = (1 << BAND_BITS) - 1
+
+def _clean_query(query):
+    params = [
+        (key, value) for key, value in parse_qsl(query, keep_blank_values=True)
+        if key.lower() not in TRACKING_PARAMS and not key.lower().startswith(TRACKING_PREFIXES)
+    ]
+    return urlencode(sorted(params))
+
+def _clean_path(path):
+    # AMP variants: /amp/..., .../amp, ....amp, ....amp.html
+    segments = [segment for segment in path.split('/') if segment.lower() != 'amp']
+    path = '/'.join(segments)
+    if path.endswith('.amp'):
+        path = path[:-4]
+    elif path.endswith('.amp.html'):
+        path = path[:-9] + '.html'
+    return path
+
+def clean_url(url):
+    """Link without tracking parameters, AMP variants or fragment"""
+    if not url or '://' not in url:
+        return url
+    parts = urlsplit(url.strip())
+    host = (parts.hostname or '').lower()
+    if host.startswith('amp.'):
+        host = host[4:]
+    netloc = host + (f":{parts.port}" if parts.port else '')
+    return urlunsplit((parts.scheme.lower(), netloc, _clean_path(parts.path), _clean_query(parts.query), ''))
+
+def url_key(url):
+    """Key identifying the story behind a link: scheme, www/m. and trailing slash don't matter"""
+    if not url or '://' not in url:
+        return None
+    parts = urlsplit(clean_url(url))
+    host = parts.netloc
+    for prefix in ('www.', 'm.'):
+        if host.startswith(prefix):
+            host = host[len(prefix):]
+    path = parts.path.rstrip('/')
+    return host + path + ('?' + parts.query if parts.query else '')
+
+def simhash(text):
+    """64-bit SimHash over the words and word pairs of a text (plurals folded)"""
+    tokens = terms_of(text)
+    features = tokens + [a + ' ' + b for a, b in zip(tokens, tokens[1:])]
+    weights = [0] * SIMHASH_BITS
+    for feature in features:
+        value = int.from_bytes(hashlib.blake2b(feature.encode('utf-8'), digest_size=8).digest(), 'big')
+        for bit in range(SIMHASH_BITS):
+            weights[bit] += 1 if value >> bit & 1 else -1
+    return sum(1 << bit for bit, weight in enumerate(weights) if weight > 0)
+
+def _numbers(title):
+    """Numeric tokens of a title; stories that differ in their figures are different stories"""
+    return frozenset(token for token in tokenize(title) if token.isdigit())
+
+class Deduplicator:
+    """Detect articles already seen in a rolling window of recent articles.
+
+    Links are compared by url_key and titles by SimHash (titles must also
+    quote the same figures to match). The SimHash is cut
+    into BANDS bands that index buckets, so each lookup only compares
+    against articles sharing a band instead of the whole window.
+    Articles leave the window after max_age seconds or when it holds
+    more than window_size.
+    """
+
+    def __init__(self, window_size=WINDOW_SIZE, max_age=WINDOW_SECONDS):
+        self.window_size = window_size
+        self.max_age = max_age
+        self._window = deque()     # (first seen, url key, simhash or None, article) in arrival order
+        self._by_url = {}          # url key -> article
+        self._buckets = {}         # (band, band value) -> [(simhash, numbers, article)]
+
+    def _bands(self, fingerprint):
+        return [(band, fingerprint >> (band * BAND_BITS) & BAND_MASK) for band in range(BANDS)]
+
+    def add(self, article, now=None):
+        """Return the primary article this one duplicates, or record it as a new primary and return None"""
+        now = time.time() if now is None else now
+        while self._window and self._window[0][0] < now - self.max_age:
+            self._evict()
+
+        key = url_key(article.get('link'))
+        if key:
+            primary = self._by_url.get(key)
+            if primary is not None:
+                return primary
+
+        title = article.get('title', '')
+        fingerprint = None
+        if len(tokenize(title)) >= MIN_TITLE_TOKENS:
+            fingerprint = simhash(title)
+            numbers = _numbers(title)
+            for band in self._bands(fingerprint):
+                for other, other_numbers, candidate in self._buckets.get(band, ()):
+                    if bin(fingerprint ^ other).count('1') <= MAX_DISTANCE and numbers == other_numbers:
+                        return candidate
+
+        if key:
+            self._by_url[key] = article
+        if fingerprint is not None:
+            for band in self._bands(fingerprint):
+                self._buckets.setdefault(band, []).append((fingerprint, numbers, article))
+        self._window.append((now, key, fingerprint, article))
+
+        while len(self._window) > self.window_size:
+            self._evict()
+        return None
+
+    def _evict(self):
+        _, key, fingerprint, article = self._window.popleft()
+        if key and self._by_url.get(key) is article:
+            del self._by_url[key]
+        if fingerprint is not None:
+            for band in self._bands(fingerprint):
+                bucket = self._buckets[band]
+                bucket[:] = [entry for entry in bucket if entry[2] is not article]
+                if not bucket:
+                    del self._buckets[band]
+
+# Window shared by successive scrapes, so stories match copies seen in earlier scrapes
+_deduplicator = Deduplicator()
+_deduplicator_lock = threading.Lock()
+
+def dedupe_articles(articles, deduplicator=None):
+    """Collapse duplicate stories, keeping the first copy of each.
+
+    Links are cleaned of tracking parameters and AMP variants. Every later
+    copy is recorded on the kept article as
+    alternate_sources: [{'source': ..., 'link': ...}]. Without a
+    deduplicator, the module's rolling window carries over between calls.
+    """
+    if deduplicator is None:
+        with _deduplicator_lock:
+            return dedupe_articles(articles, _deduplicator)
+
+    # This call's own articles must not push each other out of the window
+    deduplicator.window_size = max(deduplicator.window_size, len(articles))
+    unique = []
+    kept = {}     # id(primary in the window) -> (primary, article kept for its story in this call)
+
+    for article in articles:
+        if article.get('link'):
+            article['link'] = clean_url(article['link'])
+        primary = deduplicator.add(article) or article
+        story = kept.get(id(primary))
+        if story is None:
+            # First copy of the story in this call, even if the window matched it to an earlier scrape
+            kept[id(primary)] = (primary, article)
+            unique.append(article)
+            continue
+
+        first = story[1]
+        alternate = {'source': article.get('source'), 'link': article.get('link')}
+        if alternate['link'] != first.get('link'):
+            alternates = first.setdefault('alternate_sources', [])
+            if alternate not in alternates:
+                alternates.append(alternate)
+
+    return unique
+
+def touched_by(articles, delta):
+    """Deduplicated articles that a delta of new or updated records contributed to"""
+    links = {clean_url(article.get('link')) for article in delta}
+    return [
+        article for article in articles
+        if article.get('link') in links
+        or any(alternate['link'] in links for alternate in article.get('alternate_sources', ()))
+    ]
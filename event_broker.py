@@ -0,0 +1,97 @@
+import json
+import threading
+import time
+from collections import deque
+
+REPLAY_SIZE = 1000     # Recent events kept for Last-Event-ID resume
+
+class EventBroker:
+    """Fan newly ingested articles out to stream subscribers.
+
+    Every published article becomes an event with an increasing id. The
+    last replay_size events are kept so a reconnecting client can resume
+    after its Last-Event-ID. Ids start from the boot time in milliseconds,
+    so they keep increasing across restarts.
+    """
+
+    def __init__(self, replay_size=REPLAY_SIZE):
+        self._events = deque(maxlen=replay_size)   # (id, article)
+        self._condition = threading.Condition()
+        self._next_id = int(time.time() * 1000)
+        self._listeners = []
+
+    @property
+    def last_id(self):
+        with self._condition:
+            return self._events[-1][0] if self._events else None
+
+    def publish(self, articles):
+        """Add articles as events and wake up every subscriber; returns the new events"""
+        with self._condition:
+            events = []
+            for article in articles:
+                self._next_id += 1
+                events.append((self._next_id, article))
+            if not events:
+                return events
+            self._events.extend(events)
+            self._condition.notify_all()
+            listeners = list(self._listeners)
+
+        for listener in listeners:
+            try:
+                listener(events)
+            except Exception as e:
+                print(f"⚠️ Stream listener failed: {e}")
+        return events
+
+    def subscribe(self, listener):
+        """Call listener(events) from the publishing thread for every published batch"""
+        with self._condition:
+            self._listeners.append(listener)
+
+    def unsubscribe(self, listener):
+        with self._condition:
+            if listener in self._listeners:
+                self._listeners.remove(listener)
+
+    def replay(self, last_id):
+        """Buffered events after last_id (all of them if last_id is older than the buffer)"""
+        with self._condition:
+            return self._events_after(last_id)
+
+    def wait(self, last_id, timeout):
+        """Block until there are events after last_id or the timeout passes; returns them"""
+        with self._condition:
+            self._condition.wait_for(lambda: self._events_after(last_id), timeout)
+            return self._events_after(last_id)
+
+    def _events_after(self, last_id):
+        if last_id is None:
+            return []
+        return [(event_id, article) for event_id, article in self._events if event_id > last_id]
+
+def parse_event_id(value):
+    """Last-Event-ID header value as an int, None if missing or invalid"""
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        return None
+
+def matches(article, category=None, source=None):
+    """Same filters as /api/news: category exact, source substring (both case-insensitive)"""
+    if category and not any(cat.lower() == category.lower() for cat in article.get('categories', ())):
+        return False
+    if source and source.lower() not in article.get('source', '').lower():
+        return False
+    return True
+
+def format_event(event_id, article):
+    """Server-Sent Events frame for one article"""
+    data = json.dumps(article, ensure_ascii=False)
+    return f"id: {event_id}\nevent: article\ndata: {data}\n\n".encode('utf-8')
+
+KEEPALIVE = b": keepalive\n\n"
+
+# Shared by the API refresh and the daily job
+broker = EventBroker()
@@ -0,0 +1,81 @@
+import json
+import os
+import threading
+from atomic_file import write_atomic
+
+# Persistent HTTP validator cache for feed downloads, keyed by URL
+CACHE_FILE = os.environ.get('FEED_CACHE_FILE', 'feed_cache.json')
+
+# Entry fields kept in the cache (everything the scraper reads from an entry)
+ENTRY_FIELDS = ('id', 'title', 'link', 'published', 'summary')
+
+_lock = threading.Lock()
+_cache = None
+
+def _get_cache():
+    """Load the cache from disk on first use"""
+    global _cache
+    if _cache is None:
+        try:
+            with open(CACHE_FILE, 'r', encoding='utf-8') as f:
+                _cache = json.load(f)
+        except (OSError, ValueError):
+            _cache = {}
+    return _cache
+
+def validator_headers(url):
+    """Conditional request headers (If-None-Match / If-Modified-Since) for a URL"""
+    with _lock:
+        cached = _get_cache().get(url)
+    if not cached or not cached.get('entries'):
+        return {}
+
+    headers = {}
+    if cached.get('etag'):
+        headers['If-None-Match'] = cached['etag']
+    if cached.get('last_modified'):
+        headers['If-Modified-Since'] = cached['last_modified']
+    return headers
+
+def cached_feed(url):
+    """Rebuild the previously parsed feed for a URL, or None if not cached"""
+    import feedparser  # Only needed while scraping
+    with _lock:
+        cached = _get_cache().get(url)
+    if not cached:
+        return None
+    entries = [feedparser.FeedParserDict(entry) for entry in cached.get('entries', [])]
+    return feedparser.FeedParserDict(entries=entries, feed=feedparser.FeedParserDict())
+
+def store(url, response_headers, feed):
+    """Remember the validators and parsed entries of a successful download"""
+    etag = response_headers.get('ETag')
+    last_modified = response_headers.get('Last-Modified')
+    if not etag and not last_modified:
+        return  # Server can't answer conditional requests, nothing to reuse
+
+    entries = []
+    for entry in feed.entries:
+        entries.append({field: entry[field] for field in ENTRY_FIELDS if field in entry})
+
+    with _lock:
+        _get_cache()[url] = {
+            'etag': etag,
+            'last_modified': last_modified,
+            'entries': entries
+        }
+
+def reload():
+    """Drop the in-memory copy so the next use reads the file (another process may have written it)"""
+    global _cache
+    with _lock:
+        _cache = None
+
+def save():
+    """Write the cache to disk"""
+    with _lock:
+        if _cache is None:
+            return
+        data = json.dumps(_cache, ensure_ascii=False)
+
+    write_atomic(CACHE_FILE, data)
@@ -0,0 +1,140 @@
+import json
+import os
+import threading
+import time
+from atomic_file import write_atomic
+
+# Persisted health registry for feed URLs and sources
+HEALTH_FILE = os.environ.get('FEED_HEALTH_FILE', 'feed_health.json')
+
+# Circuit breaker settings
+FAILURE_THRESHOLD = 3         # Consecutive failures before a URL is skipped
+BASE_BACKOFF = 15 * 60        # Seconds the breaker stays open after the threshold
+MAX_BACKOFF = 24 * 60 * 60    # Upper bound for the exponential back-off
+LATENCY_SMOOTHING = 0.3       # Weight of the newest sample in the latency average
+
+_lock = threading.Lock()
+_registry = None
+
+def _get_registry():
+    """Load the registry from disk on first use"""
+    global _registry
+    if _registry is None:
+        try:
+            with open(HEALTH_FILE, 'r', encoding='utf-8') as f:
+                _registry = json.load(f)
+        except (OSError, ValueError):
+            _registry = {}
+        _registry.setdefault('urls', {})
+        _registry.setdefault('sources', {})
+    return _registry
+
+def _url_state(url):
+    return _get_registry()['urls'].setdefault(url, {
+        'failure_streak': 0,
+        'open_until': 0,
+        'header_profile': None,
+        'latency': None,
+        'last_success': None,
+        'last_failure': None
+    })
+
+def _update_latency(state, latency):
+    if state['latency'] is None:
+        state['latency'] = latency
+    else:
+        state['latency'] += LATENCY_SMOOTHING * (latency - state['latency'])
+
+def is_open(url, now=None):
+    """True while the URL's circuit breaker is open (the URL should be skipped)"""
+    now = now or time.time()
+    with _lock:
+        state = _get_registry()['urls'].get(url)
+        return bool(state) and state['open_until'] > now
+
+def open_until(url):
+    """Unix time at which the URL's breaker closes again (0 if it is closed)"""
+    with _lock:
+        state = _get_registry()['urls'].get(url)
+        return state['open_until'] if state else 0
+
+def order_urls(source, urls):
+    """Mirror URLs for a source with the last working one first"""
+    with _lock:
+        best = _get_registry()['sources'].get(source, {}).get('working_url')
+    if best in urls:
+        return [best] + [url for url in urls if url != best]
+    return list(urls)
+
+def order_headers(url, headers_list):
+    """Header profile indexes to try for a URL, best-known profile first"""
+    indexes = list(range(len(headers_list)))
+    with _lock:
+        state = _get_registry()['urls'].get(url)
+        best = state['header_profile'] if state else None
+    if best is not None and best in indexes:
+        indexes.remove(best)
+        indexes.insert(0, best)
+    return indexes
+
+def record_success(url, header_profile, latency):
+    """Close the URL's breaker and remember the header profile that worked"""
+    with _lock:
+        state = _url_state(url)
+        state['failure_streak'] = 0
+        state['open_until'] = 0
+        state['header_profile'] = header_profile
+        state['last_success'] = time.time()
+        _update_latency(state, latency)
+
+def record_failure(url, latency):
+    """Count a failed URL and open its breaker once the streak is long enough"""
+    with _lock:
+        state = _url_state(url)
+        state['failure_streak'] += 1
+        state['last_failure'] = time.time()
+        _update_latency(state, latency)
+
+        excess = state['failure_streak'] - FAILURE_THRESHOLD
+        if excess >= 0:
+            backoff = min(BASE_BACKOFF * (2 ** excess), MAX_BACKOFF)
+            state['open_until'] = time.time() + backoff
+
+def record_refresh_hint(url, seconds):
+    """Remember how long the publisher asks clients to wait between fetches (feed ttl / cache headers)"""
+    with _lock:
+        _url_state(url)['refresh_hint'] = seconds
+
+def refresh_hint(url):
+    """Seconds between fetches requested by the URL's publisher, None if it never said"""
+    with _lock:
+        state = _get_registry()['urls'].get(url)
+        return state.get('refresh_hint') if state else None
+
+def working_url(source):
+    """Mirror that last served a source, None if none has"""
+    with _lock:
+        return _get_registry()['sources'].get(source, {}).get('working_url')
+
+def record_working_url(source, url):
+    """Remember which mirror served a source"""
+    with _lock:
+        _get_registry()['sources'][source] = {
+            'working_url': url,
+            'updated': time.time()
+        }
+
+def reload():
+    """Drop the in-memory copy so the next use reads the file (another process may have written it)"""
+    global _registry
+    with _lock:
+        _registry = None
+
+def save():
+    """Write the registry to disk"""
+    with _lock:
+        if _registry is None:
+            return
+        data = json.dumps(_registry, indent=2)
+
+    write_atomic(HEALTH_FILE, data)
@@ -0,0 +1,159 @@
+import hashlib
+import json
+import os
+import threading
+import time
+from article_store import parse_published
+from atomic_file import write_atomic
+
+# Persisted ingest state: which entries of each source's feed were already processed
+STATE_FILE = os.environ.get('FEED_STATE_FILE', 'feed_state.json')
+
+SEEN_RETENTION = 7 * 24 * 60 * 60    # Entries gone from the feed are remembered this long
+SOURCE_MAX_AGE = 24 * 60 * 60        # Sources not fetched for this long drop out of current_articles
+GAP_SAMPLE = 20                      # Newest entries used to estimate a feed's publish interval
+
+# Entry fields that end up in an article record; a change in any of them re-emits the entry
+FINGERPRINT_FIELDS = ('title', 'link', 'published', 'summary')
+
+_lock = threading.Lock()
+_state = None
+
+def _get_state():
+    """Load the state from disk on first use"""
+    global _state
+    if _state is None:
+        try:
+            with open(STATE_FILE, 'r', encoding='utf-8') as f:
+                _state = json.load(f)
+        except (OSError, ValueError):
+            _state = {}
+        _state.setdefault('sources', {})
+    return _state
+
+def entry_key(entry):
+    """Stable identity of a feed entry: its GUID, else its link, else its title"""
+    return entry.get('id') or entry.get('link') or entry.get('title', '')
+
+def fingerprint(entry):
+    """Hash of the entry fields that make up its article record"""
+    text = '\x1f'.join(str(entry.get(field, '')) for field in FINGERPRINT_FIELDS)
+    return hashlib.blake2b(text.encode('utf-8'), digest_size=8).hexdigest()
+
+def is_changed(source, entry, taxonomy=None):
+    """True if the entry is new or changed since the source was last recorded.
+    
+    Every entry counts as changed when the source was recorded under
+    another taxonomy version (its categories came from other keywords).
+    """
+    with _lock:
+        state = _get_state()['sources'].get(source, {})
+        if taxonomy is not None and state.get('taxonomy') != taxonomy:
+            return True
+        seen = state.get('entries', {}).get(entry_key(entry))
+        return seen is None or seen['fingerprint'] != fingerprint(entry)
+
+def changed_keys(source, entries, taxonomy=None):
+    """Keys of the entries that are new or changed since the source was last recorded (see is_changed)"""
+    return {entry_key(entry) for entry in entries if is_changed(source, entry, taxonomy)}
+
+def record(source, url, entries, records, taxonomy=None):
+    """Remember a successful fetch of a source.
+
+    entries is the whole feed, in feed order; records maps the key of every
+    new or changed entry to its article record (None if it has none), as
+    classified under the given taxonomy version.
+    Entries no longer in the feed are forgotten after SEEN_RETENTION.
+    """
+    now = time.time()
+    with _lock:
+        state = _get_state()['sources'].setdefault(source, {'entries': {}, 'newest': None})
+        known = state['entries']
+        order = []
+        published_times = []
+        for entry in entries:
+            key = entry_key(entry)
+            if key in records:
+                known[key] = {'fingerprint': fingerprint(entry), 'record': records[key]}
+            if key in known:
+                known[key]['seen'] = now
+                order.append(key)
+
+            published = parse_published(entry.get('published'))
+            if published is not None:
+                published_times.append(published)
+                if state['newest'] is None or published > state['newest']:
+                    state['newest'] = published
+
+        for key in [key for key, seen in known.items() if seen['seen'] < now - SEEN_RETENTION]:
+            del known[key]
+
+        state['url'] = url
+        state['taxonomy'] = taxonomy
+        state['order'] = list(dict.fromkeys(order))
+        state['updated'] = now
+        state['publish_gap'] = _median_gap(published_times)
+
+def _median_gap(published_times):
+    """Median seconds between consecutive entries among the newest GAP_SAMPLE (None if unknown)"""
+    times = sorted(set(published_times), reverse=True)[:GAP_SAMPLE]
+    gaps = sorted(newer - older for newer, older in zip(times, times[1:]))
+    if not gaps:
+        return None
+    return gaps[len(gaps) // 2]
+
+def record_poll(source, success):
+    """Remember that a source was polled and whether it answered"""
+    with _lock:
+        state = _get_state()['sources'].setdefault(source, {'entries': {}, 'newest': None})
+        state['polled'] = time.time()
+        state['poll_failures'] = 0 if success else state.get('poll_failures', 0) + 1
+
+def poll_info(source):
+    """(last poll time, consecutive failed polls, median publish gap) of a source"""
+    with _lock:
+        state = _get_state()['sources'].get(source, {})
+        return state.get('polled'), state.get('poll_failures', 0), state.get('publish_gap')
+
+def current_articles(sources):
+    """Article records currently in the feeds of the given sources, in source then feed order"""
+    cutoff = time.time() - SOURCE_MAX_AGE
+    articles = []
+    with _lock:
+        recorded = _get_state()['sources']
+        for source in sources:
+            state = recorded.get(source)
+            if not state or state.get('updated', 0) < cutoff:
+                continue
+            for key in state.get('order', ()):
+                article = state['entries'][key]['record']
+                if article:
+                    articles.append(article)
+    return articles
+
+def newest_published(source):
+    """Unix time of the newest entry ever seen from a source (None if unknown)"""
+    with _lock:
+        return _get_state()['sources'].get(source, {}).get('newest')
+
+def clear():
+    """Forget every entry so the next scrape processes all of them again"""
+    with _lock:
+        for state in _get_state()['sources'].values():
+            state['entries'] = {}
+            state['order'] = []
+
+def reload():
+    """Drop the in-memory copy so the next use reads the file (another process may have written it)"""
+    global _state
+    with _lock:
+        _state = None
+
+def save():
+    """Write the state to disk"""
+    with _lock:
+        if _state is None:
+            return
+        data = json.dumps(_state, ensure_ascii=False)
+
+    write_atomic(STATE_FILE, data)
@@ -0,0 +1,202 @@
+import os
+import re
+import tempfile
+import time
+from xml.etree.ElementTree import ParseError, XMLPullParser
+
+# Incremental parsing of RSS 2.0 and Atom feeds straight from the download.
+# Entries are produced as each <item>/<entry> closes and their elements are
+# dropped, instead of buffering the body and building feedparser's full
+# result. Anything outside the plain subset handled here (RSS 1.0, HTML
+# in summaries, XML errors) is parsed by feedparser instead.
+STREAM_PARSE = os.environ.get('FEED_STREAM_PARSE', '1') != '0'   # 0: always use feedparser
+FALLBACK_BUFFER_BYTES = 1024 * 1024   # Streamed body kept in memory in case feedparser has to take over; the rest spills to disk
+
+ATOM = '{http://www.w3.org/2005/Atom}'
+CONTENT_ENCODED = '{http://purl.org/rss/1.0/modules/content/}encoded'
+HTML = re.compile(r'<[A-Za-z/!?]')   # A tag or comment: feedparser sanitizes such summaries as HTML
+
+class Unsupported(Exception):
+    """The feed needs feedparser (HTML summaries, another feed format, xhtml content...)"""
+
+_feedparser_urls = set()   # Feeds found to need feedparser: their bodies go to it directly
+
+class ParsedFeed:
+    """What the scraper reads from a feedparser result: entries (dicts) and feed (channel fields)"""
+    __slots__ = ('entries', 'feed')
+
+    def __init__(self, entries, feed):
+        self.entries = entries
+        self.feed = feed
+
+def _text(element, html_allowed=True):
+    """Stripped text of a simple element, as feedparser gives it (entities such as &amp; already decoded)"""
+    if element is None:
+        return None
+    if len(element):
+        raise Unsupported(f"<{element.tag}> has child elements")
+    text = (element.text or '').strip()
+    if not html_allowed and HTML.search(text):
+        raise Unsupported(f"<{element.tag}> holds HTML")
+    return text
+
+def _rss_entry(item):
+    entry = {}
+    guid = item.find('guid')
+    if guid is not None:
+        entry['id'] = _text(guid)
+    title = _text(item.find('title'))
+    if title is not None:
+        entry['title'] = title
+    link = _text(item.find('link'))
+    if link is None and guid is not None and guid.get('isPermaLink', 'true').lower() != 'false':
+        link = entry['id']   # feedparser uses a permalink GUID as the link
+    if link is not None:
+        entry['link'] = link
+    published = _text(item.find('pubDate'))
+    if published is not None:
+        entry['published'] = published
+    summary = item.find('description')
+    if summary is None:
+        summary = item.find(CONTENT_ENCODED)
+    summary = _text(summary, html_allowed=False)
+    if summary is not None:
+        entry['summary'] = summary
+    return entry
+
+def _atom_entry(element):
+    entry = {}
+    id_ = _text(element.find(ATOM + 'id'))
+    if id_ is not None:
+        entry['id'] = id_
+    title = _text(element.find(ATOM + 'title'))
+    if title is not None:
+        entry['title'] = title
+    for link in element.findall(ATOM + 'link'):
+        if link.get('rel', 'alternate') == 'alternate' and link.get('href') is not None:
+            entry['link'] = link.get('href').strip()
+            break
+    else:
+        if id_ is not None:
+            entry['link'] = id_   # As feedparser does without an alternate link
+    published = _text(element.find(ATOM + 'published'))
+    if published is not None:
+        entry['published'] = published
+    summary = element.find(ATOM + 'summary')
+    if summary is None:
+        summary = element.find(ATOM + 'content')
+    summary = _text(summary, html_allowed=False)
+    if summary is not None:
+        entry['summary'] = summary
+    return entry
+
+def iter_entries(chunks, channel):
+    """Yield the entries of an RSS 2.0 or Atom feed while its chunks arrive.
+
+    Entries are dicts of the fields feedparser would give them (id, title,
+    link, published, summary); channel fields (ttl) are stored in channel.
+    Raises Unsupported or ParseError for feeds feedparser has to handle.
+    """
+    parser = XMLPullParser(events=('start', 'end'))
+    path = []   # Open elements, root first
+    for chunk in chunks:
+        parser.feed(chunk)
+        yield from _entries(parser, path, channel)
+    parser.close()
+    yield from _entries(parser, path, channel)
+
+def _entries(parser, path, channel):
+    for event, element in parser.read_events():
+        if event == 'start':
+            if not path and element.tag not in ('rss', ATOM + 'feed'):
+                raise Unsupported(f"<{element.tag}> feed")
+            path.append(element)
+            continue
+
+        path.pop()
+        parent = path[-1] if path else None
+        if element.tag == 'item' and parent is not None and parent.tag == 'channel':
+            yield _rss_entry(element)
+        elif element.tag == ATOM + 'entry' and parent is not None and parent.tag == ATOM + 'feed':
+            yield _atom_entry(element)
+        elif element.tag == 'ttl' and parent is not None and parent.tag == 'channel':
+            channel['ttl'] = _text(element)
+        else:
+            continue
+        parent.remove(element)   # Parsed, so keep memory flat however long the feed is
+
+def parse(chunks, on_entry=None, url=None):
+    """Parse a feed from an iterable of body chunks as they are downloaded.
+
+    on_entry(entry) is called with each entry as soon as it is parsed (and
+    with every entry again if feedparser takes over). Returns (feed, body
+    size, seconds spent parsing, not counting on_entry). feed is a
+    ParsedFeed, or feedparser's result when the feed needs it: the body
+    read so far (kept in memory up to FALLBACK_BUFFER_BYTES, on disk past
+    that) is handed to feedparser with the rest, so the feed is never
+    downloaded twice. The url is then parsed by feedparser from its next
+    download.
+    """
+    parse_time = 0.0
+    if STREAM_PARSE and url not in _feedparser_urls:
+        with _Download(chunks) as download:
+            channel = {}
+            entries = []
+            started = time.perf_counter()
+            try:
+                for entry in iter_entries(download, channel):
+                    entries.append(entry)
+                    if on_entry is not None:
+                        handle_started = time.perf_counter()
+                        on_entry(entry)
+                        download.waited += time.perf_counter() - handle_started
+                return ParsedFeed(entries, channel), download.size, time.perf_counter() - started - download.waited
+            except (Unsupported, ParseError):
+                parse_time = time.perf_counter() - started - download.waited
+                if url is not None:
+                    _feedparser_urls.add(url)
+            body = download.body()
+    else:
+        body = b''.join(chunks)
+
+    import feedparser  # Only needed while scraping
+    started = time.perf_counter()
+    feed = feedparser.parse(body)
+    parse_time += time.perf_counter() - started
+    if on_entry is not None:
+        for entry in feed.entries:
+            on_entry(entry)
+    return feed, len(body), parse_time
+
+class _Download:
+    """Iterates over body chunks, keeping them (in memory up to FALLBACK_BUFFER_BYTES) and the time spent waiting for them"""
+
+    def __init__(self, chunks):
+        self.chunks = iter(chunks)
+        self.received = tempfile.SpooledTemporaryFile(max_size=FALLBACK_BUFFER_BYTES)
+        self.size = 0
+        self.waited = 0.0      # Seconds not spent parsing
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.received.close()
+
+    def body(self):
+        """The whole body: what was read so far plus the rest of the download"""
+        for chunk in self.chunks:
+            self.received.write(chunk)
+        self.received.seek(0)
+        return self.received.read()
+
+    def __iter__(self):
+        while True:
+            started = time.perf_counter()
+            chunk = next(self.chunks, None)
+            self.waited += time.perf_counter() - started
+            if chunk is None:
+                return
+            self.size += len(chunk)
+            self.received.write(chunk)
+            yield chunk
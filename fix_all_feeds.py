@@ -1,8 +1,42 @@
-import feedparser
-import requests
 from datetime import datetime
 import pytz
 import time
+import io
+import json
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor, wait
+from urllib.parse import urlparse
+import feed_cache
+import feed_health
+import feed_state
+import feed_stream
+import http_client
+import metrics
+from atomic_file import write_atomic
+from keyword_matcher import KeywordMatcher, taxonomy_version
+from article_store import parse_published
+
+# Concurrent scrape settings
+MAX_WORKERS = 8          # Sources fetched in parallel
+PER_HOST_LIMIT = http_client.PER_HOST_CONNECTIONS   # Simultaneous requests allowed against one host
+SCRAPE_DEADLINE = 120    # Seconds for the whole scrape before giving up on slow sources
+
+# Scrape outputs
+REPORT_FILE = 'all_sources_data.txt'    # Human-readable report
+JSONL_FILE = 'all_sources_data.jsonl'   # One article record per line
+
+# Header profiles tried for each feed URL (feed_health puts the last one that worked first)
+HEADER_PROFILES = [
+    {'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36'},
+    {'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36'},
+    {'User-Agent': 'Mozilla/5.0 (compatible; RSSReader/1.0)'},
+    {'User-Agent': 'FeedParser/6.0.10'},
+    {}  # No headers
+]
+
+# Status recorded for mirrors skipped because their circuit breaker is open
+STATUS_CIRCUIT_OPEN = 'Circuit open'
 
 # Multiple RSS feed URLs to try for each source
 RSS_FEEDS = {
@@ -76,6 +110,13 @@ RSS_FEEDS = {
     ]
 }
 
+# Replace the feed list with a JSON file of {source: [urls]} (e.g. the
+# synthetic feeds of benchmarks/feed_server.py)
+RSS_FEEDS_FILE = os.environ.get('RSS_FEEDS_FILE')
+if RSS_FEEDS_FILE:
+    with open(RSS_FEEDS_FILE, 'r', encoding='utf-8') as feeds_file:
+        RSS_FEEDS = json.load(feeds_file)
+
 # Enhanced keywords for chemical industry news including pricing
 CHEMICAL_KEYWORDS = {
     'Chemical Pricing': [
@@ -118,77 +159,310 @@ CHEMICAL_KEYWORDS = {
     ]
 }
 
-def try_feed_with_headers(url, source_name):
-    """Try different headers and approaches to access RSS feeds"""
-    headers_list = [
-        {'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36'},
-        {'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36'},
-        {'User-Agent': 'Mozilla/5.0 (compatible; RSSReader/1.0)'},
-        {'User-Agent': 'FeedParser/6.0.10'},
-        {}  # No headers
-    ]
+_host_semaphores = {}
+_host_semaphores_lock = threading.Lock()
+
+def _host_semaphore(url):
+    """Return the semaphore limiting concurrent requests to the URL's host"""
+    host = urlparse(url).hostname or ''
+    with _host_semaphores_lock:
+        semaphore = _host_semaphores.get(host)
+        if semaphore is None:
+            semaphore = threading.BoundedSemaphore(PER_HOST_LIMIT)
+            _host_semaphores[host] = semaphore
+    return semaphore
+
+def _time_left(deadline):
+    """Seconds remaining before the deadline (None means no deadline)"""
+    if deadline is None:
+        return None
+    return deadline - time.monotonic()
+
+def _refresh_hint(response, feed):
+    """Seconds the publisher asks us to wait before refetching: the feed's <ttl> or cache headers"""
+    hints = [http_client.cache_lifetime(response.headers)]
+    ttl = str(feed.feed.get('ttl', '')).strip()
+    if ttl.isdigit():
+        hints.append(int(ttl) * 60)  # ttl is in minutes
+    hints = [hint for hint in hints if hint is not None]
+    return max(hints) if hints else None
+
+def _download(url, headers, timeout, on_entry=None):
+    """GET a feed, parsing a 200 body while it downloads: (response, feed, body size, parse seconds).
+    
+    feed is None for other statuses.
+    """
+    with http_client.stream(url, headers=headers, timeout=timeout) as (response, chunks):
+        if response.status_code != 200:
+            return response, None, 0, 0.0
+        return (response,) + feed_stream.parse(chunks, on_entry, url)
+
+def _entry_classifier(source, incremental):
+    """(on_entry, classified): on_entry classifies each entry as it is parsed into classified.
+    
+    classified maps entry keys to (categories, seconds taken); with
+    incremental, entries unchanged since the last scrape are skipped.
+    """
+    classified = {}
     
-    for headers in headers_list:
+    def on_entry(entry):
+        if incremental and not feed_state.is_changed(source, entry, _taxonomy):
+            return
+        started = time.perf_counter()
+        categories = classify_chemical_news(entry.get('title', 'No title'), entry.get('summary', ''))
+        classified[feed_state.entry_key(entry)] = (categories, time.perf_counter() - started)
+    
+    return on_entry, classified
+
+def _stopped(stop):
+    return stop is not None and stop.is_set()
+
+def try_feed_with_headers(url, source_name, deadline=None, incremental=False, stop=None):
+    """Try different headers and approaches to access RSS feeds.
+    
+    Returns (success, feed, status, classified), classified being the
+    categories of its entries (see _entry_classifier), worked out while
+    the feed downloaded. Once stop is set (the scrape gave up on this
+    fetch) the feed cache and health records are left alone.
+    """
+    # Imported on first scrape so processes that only serve start fast
+    import requests
+    
+    started = time.monotonic()
+    attempted = False
+    
+    for profile in feed_health.order_headers(url, HEADER_PROFILES):
+        headers = HEADER_PROFILES[profile]
+        timeout = _time_left(deadline)
+        if timeout is not None and timeout <= 0:
+            break  # Out of time for this scrape
+        
+        # Ask the server to skip the body if the feed hasn't changed
+        request_headers = dict(headers)
+        request_headers.update(feed_cache.validator_headers(url))
+        
+        attempted = True
+        fetch_started = time.perf_counter()
+        recorded = False
+        parse_time = 0.0
+        on_entry, classified = _entry_classifier(source_name, incremental)
         try:
-            response = requests.get(url, headers=headers, timeout=10)
-            if response.status_code == 200:
-                feed = feedparser.parse(response.content)
+            with _host_semaphore(url):
+                # Parsed and classified while it downloads
+                response, feed, size, parse_time = _download(url, request_headers, timeout, on_entry)
+            classify_time = sum(seconds for _, seconds in classified.values())
+            metrics.fetch_seconds.observe(time.perf_counter() - fetch_started - parse_time - classify_time, url=url)
+            metrics.fetch_responses.inc(url=url, status=response.status_code)
+            recorded = True
+            if _stopped(stop):
+                break  # Finished after the deadline: the scrape has moved on without it
+            if response.status_code == 304:
+                feed = feed_cache.cached_feed(url)
+                if feed is not None and feed.entries:
+                    for entry in feed.entries:
+                        on_entry(entry)
+                    feed_health.record_success(url, profile, time.monotonic() - started)
+                    hint = _refresh_hint(response, feed)
+                    if hint is not None:
+                        feed_health.record_refresh_hint(url, hint)
+                    return True, feed, response.status_code, classified
+            elif response.status_code == 200:
+                metrics.fetch_bytes.observe(size, url=url)
+                metrics.parse_seconds.observe(parse_time, url=url)
                 if feed.entries:
-                    return True, feed, response.status_code
+                    feed_cache.store(url, response.headers, feed)
+                    feed_health.record_success(url, profile, time.monotonic() - started)
+                    feed_health.record_refresh_hint(url, _refresh_hint(response, feed))
+                    return True, feed, response.status_code, classified
+        except (requests.ConnectionError, requests.Timeout) as e:
+            metrics.fetch_seconds.observe(time.perf_counter() - fetch_started, url=url)
+            metrics.fetch_responses.inc(url=url, status='timeout' if isinstance(e, requests.Timeout) else 'connection_error')
+            break  # Host unreachable, other headers won't help
         except Exception as e:
+            if not recorded:
+                metrics.fetch_responses.inc(url=url, status=type(e).__name__)
             continue
     
-    return False, None, None
+    # Cut off by the deadline is not the feed's fault: don't count it against its circuit breaker
+    cut_off = _stopped(stop) or (deadline is not None and _time_left(deadline) <= 0)
+    if attempted and not cut_off:
+        feed_health.record_failure(url, time.monotonic() - started)
+    return False, None, None, None
+
+def fetch_source(source, urls, deadline=None, incremental=False, stop=None):
+    """Try each mirror URL of a source until one works.
+    
+    Mirrors are tried best-known first and skipped while their circuit
+    breaker is open. Returns the list of attempts as (url, success, feed,
+    status, classified) tuples, ending with the working URL if one was found.
+    """
+    attempts = []
+    for url in feed_health.order_urls(source, urls):
+        if (deadline is not None and _time_left(deadline) <= 0) or _stopped(stop):
+            break
+        if feed_health.is_open(url):
+            attempts.append((url, False, None, STATUS_CIRCUIT_OPEN, None))
+            continue
+        success, feed, status, classified = try_feed_with_headers(url, source, deadline, incremental, stop)
+        attempts.append((url, success, feed, status, classified))
+        if success and feed and feed.entries and not _stopped(stop):
+            feed_health.record_working_url(source, url)
+            break  # Found working URL, stop trying others
+    return attempts
+
+def fetch_all_sources(concurrent=True, deadline=SCRAPE_DEADLINE, sources=None, incremental=False):
+    """Fetch every source in RSS_FEEDS (or only the given sources), in parallel unless concurrent is False.
+    
+    Returns a dict of source -> attempts (see fetch_source). Sources that did
+    not finish before the deadline map to None.
+    """
+    deadline_at = time.monotonic() + deadline if deadline else None
+    feeds = {source: urls for source, urls in RSS_FEEDS.items() if sources is None or source in sources}
+    results = {source: None for source in feeds}
+    
+    if not concurrent:
+        for source, urls in feeds.items():
+            if deadline_at is not None and _time_left(deadline_at) <= 0:
+                break
+            results[source] = fetch_source(source, urls, deadline_at, incremental)
+        return results
+    
+    pool = ThreadPoolExecutor(max_workers=MAX_WORKERS)
+    stop = threading.Event()  # Set at the deadline so stragglers stop writing shared state
+    try:
+        futures = {
+            pool.submit(fetch_source, source, urls, deadline_at, incremental, stop): source
+            for source, urls in feeds.items()
+        }
+        done, _ = wait(futures, timeout=_time_left(deadline_at))
+        stop.set()
+        for future in done:
+            try:
+                results[futures[future]] = future.result()
+            except Exception:
+                results[futures[future]] = []
+    finally:
+        # Don't wait on stragglers: they stop on their own at the deadline
+        stop.set()
+        pool.shutdown(wait=False, cancel_futures=True)
+    
+    return results
+
+# Compiled once; rebuild with rebuild_classifier() after editing CHEMICAL_KEYWORDS
+_classifier = KeywordMatcher(CHEMICAL_KEYWORDS)
+_taxonomy = taxonomy_version(CHEMICAL_KEYWORDS)
+
+def rebuild_classifier():
+    """Recompile the keyword matcher from CHEMICAL_KEYWORDS.
+    
+    The next scrape reclassifies every feed entry; reclassify.py updates
+    the stored history.
+    """
+    global _classifier, _taxonomy
+    _classifier = KeywordMatcher(CHEMICAL_KEYWORDS)
+    _taxonomy = taxonomy_version(CHEMICAL_KEYWORDS)
+
+def taxonomy():
+    """Version hash of the keywords the classifier was built from"""
+    return _taxonomy
 
 def classify_chemical_news(title, summary):
     """Classify news articles using enhanced chemical industry keywords"""
-    txt = (title + ' ' + summary).lower()
-    classifications = []
-    
-    for category, keywords in CHEMICAL_KEYWORDS.items():
-        for keyword in keywords:
-            if keyword.lower() in txt:
-                classifications.append(category)
-                break  # Found one keyword for this category
+    return _classifier.classify(title + ' ' + summary)
+
+def classify_batch(articles):
+    """Classify a list of (title, summary) pairs in one call"""
+    return _classifier.classify_batch(title + ' ' + summary for title, summary in articles)
+
+def article_record(source, entry, classifications):
+    """Structured article record for a feed entry (None for untitled entries)"""
+    title = entry.get('title', 'No title')
+    if title == 'No title':
+        return None
     
-    return classifications
+    article = {
+        'title': title,
+        'link': entry.get('link', 'No link'),
+        'published': entry.get('published', 'No date'),
+        'published_ts': parse_published(entry.get('published'))  # Epoch seconds, None if unparseable
+    }
+    if classifications:
+        article['categories'] = classifications
+    summary = entry.get('summary', '')
+    if summary:
+        article['summary'] = f"{summary[:200]}..."
+    article['source'] = source
+    return article
 
-def scrape_all_sources():
+def scrape_all_sources(concurrent=True, deadline=SCRAPE_DEADLINE, report_path=REPORT_FILE, jsonl_path=None, incremental=False, sources=None):
+    """Scrape every source and return the articles as a list of dicts.
+    
+    Sources are fetched in parallel by default; articles and the text report
+    always follow RSS_FEEDS order so the output does not depend on fetch
+    timing. The report is written to report_path (skipped if None) and the
+    records are also saved as JSON lines to jsonl_path when given.
+    
+    With incremental=True only entries that are new or changed since the
+    last scrape (see feed_state) are classified and returned; the full
+    current article list is then current_articles(). sources restricts the
+    scrape to some sources (used by the polling scheduler).
+    """
     ist = pytz.timezone('Asia/Kolkata')
     now = datetime.now(ist)
+    articles = []
+    scrape_started = time.perf_counter()
+    
+    # Another process may have scraped since these were loaded (see scrape_lock)
+    feed_cache.reload()
+    feed_health.reload()
+    feed_state.reload()
     
-    with open('all_sources_data.txt', 'w', encoding='utf-8') as f:
+    with io.StringIO() as f:
         f.write(f"COMPREHENSIVE RSS SCRAPE - {now}\n")
         f.write("=" * 80 + "\n\n")
         
         total_articles = 0
         classified_articles = 0
         
-        for source, urls in RSS_FEEDS.items():
+        with metrics.span('fetch', incremental=incremental):
+            results = fetch_all_sources(concurrent, deadline, sources, incremental)
+        
+        for source, attempts in results.items():
             f.write(f"SOURCE: {source}\n")
             f.write("=" * 50 + "\n")
             
             source_articles = 0
             working_url = None
             
-            for url in urls:
+            if attempts is None:
+                f.write(f"⏰ Deadline exceeded before {source} finished\n")
+                attempts = []
+            
+            for url, success, feed, status, classified in attempts:
                 f.write(f"Trying: {url}\n")
                 
-                success, feed, status = try_feed_with_headers(url, source)
-                
                 if success and feed and feed.entries:
                     f.write(f"✅ SUCCESS! Status: {status}\n")
-                    f.write(f"📰 Total Entries: {len(feed.entries)}\n\n")
+                    f.write(f"📰 Total Entries: {len(feed.entries)}\n")
                     
                     working_url = url
+                    records = {}
+                    classify_time = sum(seconds for _, seconds in classified.values())
                     
-                    # Get ALL articles (no limit)
+                    if incremental:
+                        f.write(f"🆕 New or updated: {len(classified)}\n")
+                    f.write("\n")
+                    
+                    # Get ALL articles (no limit), or only the new ones when incremental;
+                    # they were classified while the feed downloaded
                     for i, entry in enumerate(feed.entries, 1):
+                        key = feed_state.entry_key(entry)
+                        if key not in classified:
+                            continue
+                        
                         title = entry.get('title', 'No title')
                         summary = entry.get('summary', '')
-                        
-                        # Classify the article
-                        classifications = classify_chemical_news(title, summary)
+                        classifications = classified[key][0]
                         
                         f.write(f"ARTICLE {i}:\n")
                         f.write(f"Title: {title}\n")
@@ -205,12 +479,27 @@ def scrape_all_sources():
                         
                         f.write("\n")
                         source_articles += 1
+                        
+                        article = article_record(source, entry, classifications)
+                        records[key] = article
+                        if article:
+                            articles.append(article)
+                    
+                    feed_state.record(source, url, feed.entries, records, _taxonomy)
+                    metrics.classify_seconds.observe(classify_time, source=source)
+                    metrics.classified_entries.inc(len(records), source=source)
                     
-                    break  # Found working URL, stop trying others
+                elif status == STATUS_CIRCUIT_OPEN:
+                    retry_at = datetime.fromtimestamp(feed_health.open_until(url), ist)
+                    f.write(f"⏭️ Skipped (circuit open until {retry_at.strftime('%Y-%m-%d %H:%M')})\n")
                 else:
                     f.write(f"❌ Failed (Status: {status if status else 'Error'})\n")
             
+            feed_state.record_poll(source, working_url is not None)
+            
             if working_url:
+                metrics.scrape_articles.set(source_articles, source=source)
+                metrics.scrape_last_success.set(time.time(), source=source)
                 f.write(f"✅ {source}: Working URL found - {working_url}\n")
                 f.write(f"📊 Articles collected: {source_articles}\n")
                 total_articles += source_articles
@@ -223,8 +512,28 @@ def scrape_all_sources():
         f.write(f"Total articles collected: {total_articles}\n")
         f.write(f"Chemical industry relevant articles: {classified_articles}\n")
         f.write(f"Timestamp: {now}\n")
+        report = f.getvalue()
     
-    print(f"✅ Comprehensive scrape completed! Found {total_articles} articles in all_sources_data.txt")
+    if report_path:
+        write_atomic(report_path, report)
+    if jsonl_path:
+        write_atomic(jsonl_path, ''.join(json.dumps(a, ensure_ascii=False) + '\n' for a in articles))
+    
+    metrics.scrape_seconds.observe(time.perf_counter() - scrape_started)
+    try:
+        feed_cache.save()
+        feed_health.save()
+        feed_state.save()
+        metrics.save_ingest()
+    except OSError as e:
+        print(f"⚠️ Could not save feed cache/health/state/metrics: {e}")
+    
+    print(f"✅ Comprehensive scrape completed! Found {total_articles} {'new or updated ' if incremental else ''}articles")
+    return articles
+
+def current_articles():
+    """Article records of every entry currently in the feeds (as of the last scrape)"""
+    return feed_state.current_articles(RSS_FEEDS)
 
 if __name__ == '__main__':
-    scrape_all_sources() 
\ No newline at end of file
+    scrape_all_sources(jsonl_path=JSONL_FILE) 
\ No newline at end of file
@@ -0,0 +1,84 @@
+import os
+import re
+import threading
+import time
+from contextlib import contextmanager
+from email.utils import parsedate_to_datetime
+
+# Shared HTTP session settings for feed downloads
+CONNECT_TIMEOUT = float(os.environ.get('FEED_CONNECT_TIMEOUT', 5))    # Seconds to open a connection
+READ_TIMEOUT = float(os.environ.get('FEED_READ_TIMEOUT', 10))         # Seconds between bytes received
+MAX_BODY_BYTES = int(os.environ.get('FEED_MAX_BODY_BYTES', 5 * 1024 * 1024))
+POOL_HOSTS = 32              # Hosts kept in the connection pool
+PER_HOST_CONNECTIONS = 2     # Keep-alive connections kept per host
+CHUNK_SIZE = 64 * 1024
+
+class BodyTooLarge(Exception):
+    """Raised when a response body exceeds MAX_BODY_BYTES"""
+
+_session = None
+_session_lock = threading.Lock()
+
+def get_session():
+    """Return the shared keep-alive session, creating it on first use"""
+    global _session
+    with _session_lock:
+        if _session is None:
+            # Imported on first use so processes that never fetch start fast
+            import requests
+            from requests.adapters import HTTPAdapter
+            session = requests.Session()
+            adapter = HTTPAdapter(pool_connections=POOL_HOSTS, pool_maxsize=PER_HOST_CONNECTIONS)
+            session.mount('http://', adapter)
+            session.mount('https://', adapter)
+            session.headers['Accept-Encoding'] = 'gzip, deflate'
+            _session = session
+    return _session
+
+@contextmanager
+def stream(url, headers=None, timeout=None, max_bytes=MAX_BODY_BYTES):
+    """GET a URL through the shared session, giving (response, chunks) while the connection is open.
+
+    chunks iterates over the body as it is received, decompressed chunk by
+    chunk; it raises BodyTooLarge as soon as the body grows past max_bytes.
+    timeout caps both the connect and read timeouts (used to honour an
+    overall deadline).
+    """
+    connect_timeout, read_timeout = CONNECT_TIMEOUT, READ_TIMEOUT
+    if timeout is not None:
+        connect_timeout = min(connect_timeout, timeout)
+        read_timeout = min(read_timeout, timeout)
+
+    with get_session().get(url, headers=headers, timeout=(connect_timeout, read_timeout), stream=True) as response:
+        declared = response.headers.get('Content-Length')
+        if declared and declared.isdigit() and int(declared) > max_bytes:
+            raise BodyTooLarge(f"{url} declares {declared} bytes")
+        yield response, _chunks(response, url, max_bytes)
+
+def _chunks(response, url, max_bytes):
+    size = 0
+    for chunk in response.iter_content(CHUNK_SIZE):
+        size += len(chunk)
+        if size > max_bytes:
+            raise BodyTooLarge(f"{url} exceeded {max_bytes} bytes")
+        yield chunk
+
+MAX_AGE_RE = re.compile(r'(?:^|,)\s*(?:s-)?max-age\s*=\s*"?(\d+)', re.IGNORECASE)
+
+def cache_lifetime(headers):
+    """Seconds a response may be reused according to Cache-Control or Expires (None if not stated)"""
+    cache_control = headers.get('Cache-Control', '')
+    ages = [int(age) for age in MAX_AGE_RE.findall(cache_control)]
+    if ages:
+        return max(ages)
+    if re.search(r'no-cache|no-store', cache_control, re.IGNORECASE):
+        return 0
+    expires = headers.get('Expires')
+    if expires:
+        try:
+            expires_at = parsedate_to_datetime(expires).timestamp()
+            now = parsedate_to_datetime(headers['Date']).timestamp() if headers.get('Date') else time.time()
+        except (TypeError, ValueError, IndexError):
+            return 0  # Invalid Expires means already expired
+        return max(0, int(expires_at - now))
+    return None
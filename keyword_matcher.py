@@ -0,0 +1,96 @@
+import hashlib
+import json
+import re
+
+# Words are runs of letters/digits; '&' joins tokens like "R&D", hyphens split "bio-based"
+TOKEN_RE = re.compile(r"\w+(?:&\w+)*")
+
+def tokenize(text):
+    """Lower-case word tokens of a text"""
+    return TOKEN_RE.findall(text.lower())
+
+def taxonomy_version(taxonomy):
+    """Short hash identifying a {category: [keywords]} taxonomy (changes with any edit)"""
+    text = json.dumps(taxonomy, ensure_ascii=False, sort_keys=True)
+    return hashlib.sha256(text.encode('utf-8')).hexdigest()[:12]
+
+def _inflections(token):
+    """The token plus its simple plural forms ("price" -> "prices", "policy" -> "policies")"""
+    forms = {token, token + 's', token + 'es'}
+    if token.endswith('y') and len(token) > 1:
+        forms.add(token[:-1] + 'ies')
+    return forms
+
+class KeywordMatcher:
+    """Classify text against a {category: [keywords]} taxonomy in one pass.
+
+    Text is tokenized once, so matching is word-boundary aware ("rate" does
+    not match "corporate", "stock" does not match "livestock") while simple
+    plurals of a keyword's last word still match. Keywords are stored as
+    word n-gram tables; the text's n-grams are intersected with each table,
+    and longer n-grams are only built when the text holds a matching prefix.
+    The cost grows with the text length, not with the number of keywords.
+    """
+
+    def __init__(self, taxonomy):
+        self.categories = list(taxonomy)
+        self.full_mask = (1 << len(self.categories)) - 1
+        self._labels = {}
+        phrases = {}  # n -> {n-gram tuple: category bitmask}
+
+        for bit, category in enumerate(self.categories):
+            for keyword in taxonomy[category]:
+                tokens = tokenize(keyword)
+                if not tokens:
+                    continue
+                table = phrases.setdefault(len(tokens), {})
+                for form in _inflections(tokens[-1]):
+                    gram = tuple(tokens[:-1]) + (form,)
+                    table[gram] = table.get(gram, 0) | (1 << bit)
+
+        self._words = {gram[0]: mask for gram, mask in phrases.pop(1, {}).items()}
+        # (n, table, prefixes): prefixes are the (n-1)-grams that can start an n-gram keyword
+        self._phrases = []
+        for size, table in sorted(phrases.items()):
+            prefixes = frozenset(gram[:-1] for gram in table)
+            if size == 2:
+                prefixes = frozenset(prefix[0] for prefix in prefixes)
+            self._phrases.append((size, table, prefixes))
+
+    def match_mask(self, text):
+        """Bitmask of the categories found in text (bit i = self.categories[i])"""
+        tokens = tokenize(text)
+        present = set(tokens)
+        words = self._words
+        mask = 0
+
+        for token in words.keys() & present:
+            mask |= words[token]
+
+        for size, table, prefixes in self._phrases:
+            if size == 2:
+                if prefixes.isdisjoint(present):
+                    continue
+            elif prefixes.isdisjoint(zip(*[tokens[i:] for i in range(size - 1)])):
+                continue
+            grams = set(zip(*[tokens[i:] for i in range(size)]))
+            for gram in table.keys() & grams:
+                mask |= table[gram]
+
+        return mask
+
+    def labels(self, mask):
+        """Category names for a bitmask, in taxonomy order"""
+        labels = self._labels.get(mask)
+        if labels is None:
+            labels = [category for bit, category in enumerate(self.categories) if mask & (1 << bit)]
+            self._labels[mask] = labels
+        return list(labels)
+
+    def classify(self, text):
+        """Categories found in text, in taxonomy order"""
+        return self.labels(self.match_mask(text))
+
+    def classify_batch(self, texts):
+        """classify() for every text of an iterable"""
+        return [self.labels(self.match_mask(text)) for text in texts]
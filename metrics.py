@@ -0,0 +1,178 @@
+import json
+import os
+import threading
+import time
+from contextlib import contextmanager
+from atomic_file import write_atomic
+
+# In-process metrics rendered in the Prometheus text format at /api/metrics
+SPAN_LOG = os.environ.get('METRICS_SPAN_LOG')   # Append one JSON line per timed stage when set
+INGEST_FILE = os.environ.get('METRICS_INGEST_FILE', 'metrics_ingest.prom')
+
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120)
+SIZE_BUCKETS = (1024, 4096, 16384, 65536, 262144, 1048576, 4194304)
+
+_lock = threading.Lock()
+_metrics = []
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+def _labels(names, values, extra=()):
+    pairs = list(zip(names, values)) + list(extra)
+    if not pairs:
+        return ''
+    return '{' + ','.join(f'{name}="{_escape(value)}"' for name, value in pairs) + '}'
+
+def _number(value):
+    if value == float('inf'):
+        return '+Inf'
+    if isinstance(value, float) and value.is_integer():
+        return str(int(value))
+    return repr(value) if isinstance(value, float) else str(value)
+
+class _Metric:
+    kind = None
+
+    def __init__(self, name, help_text, labels=(), ingest=False):
+        self.name = name
+        self.help = help_text
+        self.label_names = tuple(labels)
+        self.ingest = ingest   # Recorded by scrapes (shared with API workers via INGEST_FILE)
+        self._values = {}
+        with _lock:
+            _metrics.append(self)
+
+    def _key(self, labels):
+        return tuple(str(labels.get(name, '')) for name in self.label_names)
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} {self.kind}"]
+        with _lock:
+            items = sorted(self._values.items())
+        for key, value in items:
+            lines.extend(self._samples(key, value))
+        return lines
+
+    def _samples(self, key, value):
+        return [f"{self.name}{_labels(self.label_names, key)} {_number(value)}"]
+
+class Counter(_Metric):
+    kind = 'counter'
+
+    def inc(self, amount=1, **labels):
+        key = self._key(labels)
+        with _lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+class Gauge(_Metric):
+    kind = 'gauge'
+
+    def __init__(self, name, help_text, labels=(), function=None, ingest=False):
+        super().__init__(name, help_text, labels, ingest)
+        self.function = function   # Computes an unlabelled value at render time
+
+    def set(self, value, **labels):
+        with _lock:
+            self._values[self._key(labels)] = value
+
+    def render(self):
+        if self.function is not None:
+            value = self.function()
+            if value is not None:
+                self.set(value)
+        return super().render()
+
+class Histogram(_Metric):
+    kind = 'histogram'
+
+    def __init__(self, name, help_text, labels=(), buckets=DEFAULT_BUCKETS, ingest=False):
+        super().__init__(name, help_text, labels, ingest)
+        self.buckets = tuple(buckets) + (float('inf'),)
+
+    def observe(self, value, **labels):
+        key = self._key(labels)
+        with _lock:
+            counts, total = self._values.get(key, ([0] * len(self.buckets), 0.0))
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    counts[i] += 1
+            self._values[key] = (counts, total + value)
+
+    def _samples(self, key, value):
+        counts, total = value
+        lines = [
+            f"{self.name}_bucket{_labels(self.label_names, key, [('le', _number(bound))])} {count}"
+            for bound, count in zip(self.buckets, counts)
+        ]
+        lines.append(f"{self.name}_sum{_labels(self.label_names, key)} {_number(round(total, 6))}")
+        lines.append(f"{self.name}_count{_labels(self.label_names, key)} {counts[-1]}")
+        return lines
+
+def render(ingest=True, serving=True):
+    """Metrics in the Prometheus text exposition format.
+
+    ingest and serving select the scrape-side and the API-side metrics.
+    """
+    with _lock:
+        metrics = [m for m in _metrics if (ingest if m.ingest else serving)]
+    lines = []
+    for metric in metrics:
+        lines.extend(metric.render())
+    return '\n'.join(lines) + '\n'
+
+def save_ingest():
+    """Write the scrape-side metrics for processes that don't scrape themselves"""
+    write_atomic(INGEST_FILE, render(serving=False))
+
+def load_ingest():
+    """Metrics last saved by the ingest process ('' if there are none)"""
+    try:
+        with open(INGEST_FILE, 'r', encoding='utf-8') as f:
+            return f.read()
+    except OSError:
+        return ''
+
+def exposition():
+    """This process's metrics, with the scrape-side ones from INGEST_FILE if it hasn't scraped itself"""
+    with _lock:
+        scraped = bool(scrape_seconds._values)
+    if scraped:
+        return render()
+    return render(ingest=False) + load_ingest()
+
+# Feed fetching (fix_all_feeds)
+fetch_seconds = Histogram('rss_fetch_seconds', 'Feed download time per attempt', ['url'], ingest=True)
+fetch_bytes = Histogram('rss_fetch_bytes', 'Feed body size of successful downloads', ['url'], SIZE_BUCKETS, ingest=True)
+fetch_responses = Counter('rss_fetch_responses_total', 'Feed download attempts by result (HTTP status or error)', ['url', 'status'], ingest=True)
+parse_seconds = Histogram('rss_parse_seconds', 'Feed parse time (streaming parser or feedparser)', ['url'], ingest=True)
+classify_seconds = Histogram('rss_classify_seconds', 'Keyword classification time per source batch', ['source'], ingest=True)
+classified_entries = Counter('rss_classified_entries_total', 'Feed entries classified', ['source'], ingest=True)
+
+# Scrapes
+scrape_seconds = Histogram('rss_scrape_seconds', 'Wall-clock time of a scrape', ingest=True)
+scrape_articles = Gauge('rss_scrape_articles', 'Articles emitted for a source by its last scrape', ['source'], ingest=True)
+scrape_last_success = Gauge('rss_scrape_last_success_timestamp_seconds', 'Unix time a source last answered', ['source'], ingest=True)
+stage_seconds = Histogram('rss_stage_seconds', 'Time spent per ingest stage', ['stage'], ingest=True)
+
+# API
+request_seconds = Histogram('http_request_seconds', 'API request latency until the response is ready', ['route', 'method', 'status'])
+
+@contextmanager
+def span(stage, **fields):
+    """Time a stage into rss_stage_seconds, logging it to SPAN_LOG when configured"""
+    started = time.time()
+    timer = time.perf_counter()
+    try:
+        yield
+    finally:
+        duration = time.perf_counter() - timer
+        stage_seconds.observe(duration, stage=stage)
+        if SPAN_LOG:
+            record = dict(fields, stage=stage, start=round(started, 3), duration=round(duration, 6))
+            line = json.dumps(record, ensure_ascii=False) + '\n'
+            try:
+                with _lock, open(SPAN_LOG, 'a', encoding='utf-8') as f:
+                    f.write(line)
+            except OSError:
+                pass
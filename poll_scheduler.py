@@ -0,0 +1,128 @@
+import heapq
+import random
+import threading
+import time
+import feed_health
+import feed_state
+
+# Per-source polling intervals
+MIN_INTERVAL = 5 * 60          # Never poll a source more often than this
+MAX_INTERVAL = 6 * 60 * 60     # Never leave a source unpolled for longer than this
+DEFAULT_INTERVAL = 60 * 60     # Sources whose publish rate is unknown
+GAP_FACTOR = 0.5               # Poll twice per typical gap between new entries
+JITTER = 0.1                   # +/- fraction added to every interval so polls don't line up
+
+# Global budget across all sources
+RATE_BUDGET = 60               # Polls per hour
+BURST = 10                     # Polls that may run back to back
+
+def poll_interval(source):
+    """Seconds until a source should be polled again.
+
+    Half its median publish gap, but never sooner than the feed's ttl or
+    cache headers ask, clamped to MIN/MAX_INTERVAL and doubled for every
+    consecutive failed poll.
+    """
+    _, failures, gap = feed_state.poll_info(source)
+    interval = gap * GAP_FACTOR if gap else DEFAULT_INTERVAL
+
+    url = feed_health.working_url(source)
+    hint = feed_health.refresh_hint(url) if url else None
+    if hint:
+        interval = max(interval, hint)
+
+    interval = min(max(interval, MIN_INTERVAL), MAX_INTERVAL)
+    return min(interval * 2 ** min(failures, 8), MAX_INTERVAL)
+
+def due_at(source):
+    """Unix time of the source's next poll (0 if it was never polled)"""
+    polled, _, _ = feed_state.poll_info(source)
+    if polled is None:
+        return 0
+    return polled + poll_interval(source)
+
+def is_due(source, now=None):
+    """True if the source's next poll is due, allowing for jitter"""
+    now = now or time.time()
+    polled, _, _ = feed_state.poll_info(source)
+    return polled is None or now >= polled + poll_interval(source) * (1 - JITTER)
+
+class TokenBucket:
+    """Allow rate events per second on average with bursts of up to capacity"""
+
+    def __init__(self, rate, capacity):
+        self.rate = rate
+        self.capacity = capacity
+        self._tokens = capacity
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def _refill(self):
+        now = time.monotonic()
+        self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    def take(self):
+        """Spend a token; False if none is available"""
+        with self._lock:
+            self._refill()
+            if self._tokens >= 1:
+                self._tokens -= 1
+                return True
+            return False
+
+    def wait_time(self):
+        """Seconds until a token is available"""
+        with self._lock:
+            self._refill()
+            return max(0.0, (1 - self._tokens) / self.rate)
+
+class PollScheduler:
+    """Poll each source on its own schedule from a priority queue of due times.
+
+    poll(sources) is called with every source that is due at the same time
+    (one batch, fetched concurrently). Each poll spends a token from the
+    global budget; sources without a token wait for the next one.
+    """
+
+    def __init__(self, sources, poll, budget=RATE_BUDGET, burst=BURST):
+        self.poll = poll
+        self.bucket = TokenBucket(budget / 3600.0, burst)
+        self._queue = []
+        for source in sources:
+            self.schedule(source, due_at(source))
+
+    def schedule(self, source, when):
+        heapq.heappush(self._queue, (when, source))
+
+    def _next_due(self, source):
+        jitter = random.uniform(-JITTER, JITTER)
+        return time.time() + poll_interval(source) * (1 + jitter)
+
+    def run_pending(self):
+        """Poll the sources that are due; returns seconds until the next one is"""
+        now = time.time()
+        batch = []
+        while self._queue and self._queue[0][0] <= now:
+            _, source = heapq.heappop(self._queue)
+            if self.bucket.take():
+                batch.append(source)
+            else:
+                self.schedule(source, now + self.bucket.wait_time())
+
+        if batch:
+            try:
+                self.poll(batch)
+            except Exception as e:
+                print(f"❌ Poll of {', '.join(batch)} failed: {e}")
+            for source in batch:
+                self.schedule(source, self._next_due(source))
+
+        if not self._queue:
+            return MAX_INTERVAL
+        return max(0.0, self._queue[0][0] - time.time())
+
+    def run_forever(self, max_sleep=60):
+        """Poll until interrupted, sleeping until the next source is due"""
+        while True:
+            time.sleep(min(self.run_pending(), max_sleep))
@@ -1,16 +1,42 @@
 from api_server import app
+import importlib.util
 import os
+import subprocess
+import sys
 import threading
 from daily_scheduler import start_scheduler
+from stream_server import start_stream_server
 
 def run_scheduler():
     """Run the daily scheduler in background"""
     start_scheduler()
 
+def gunicorn_available():
+    return importlib.util.find_spec('gunicorn') is not None
+
+def run_workers(port, workers):
+    """Serve the API from gunicorn worker processes sharing the mapped snapshot.
+    
+    This process stays the single ingest side: it runs the scheduler (which
+    publishes the snapshot file) and the stream server, while the workers
+    only read the snapshot.
+    """
+    env = dict(os.environ, SNAPSHOT_MODE='mapped')
+    command = [
+        sys.executable, '-m', 'gunicorn',
+        '--workers', str(workers),
+        '--worker-class', 'gthread',
+        '--threads', os.environ.get('WORKER_THREADS', '4'),
+        '--bind', f'0.0.0.0:{port}',
+        'api_server:app'
+    ]
+    return subprocess.call(command, env=env)
+
 if __name__ == '__main__':
     # Production settings
     port = int(os.environ.get('PORT', 5000))
     debug = os.environ.get('DEBUG', 'False').lower() == 'true'
+    workers = int(os.environ.get('WEB_CONCURRENCY', 1))
     
     print(f"🚀 Starting Production Chemical Industry RSS Monitor API...")
     print(f"📡 Port: {port}")
@@ -20,6 +46,15 @@ if __name__ == '__main__':
     scheduler_thread = threading.Thread(target=run_scheduler, daemon=True)
     scheduler_thread.start()
     
+    # Server-Sent Events for many idle clients (the API's /api/stream takes a few)
+    start_stream_server()
+    
+    if workers > 1 and not debug and gunicorn_available():
+        print(f"👷 Workers: {workers} (gunicorn, mapped snapshot)")
+        sys.exit(run_workers(port, workers))
+    elif workers > 1:
+        print("⚠️ WEB_CONCURRENCY needs gunicorn (and DEBUG off), serving from a single process")
+    
     # Start API server
     app.run(
         host='0.0.0.0',
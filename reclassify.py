@@ -0,0 +1,133 @@
+import os
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+import article_archive
+import article_store
+from keyword_matcher import KeywordMatcher, taxonomy_version
+
+# Bulk relabelling of the stored history after CHEMICAL_KEYWORDS changes.
+# Every stored and archived article carries the taxonomy version it was
+# classified under; only those with another version are redone.
+PROCESSES = int(os.environ.get('RECLASSIFY_PROCESSES', os.cpu_count() or 1))
+BATCH_SIZE = 1000              # Articles per task and per store transaction
+POOL_THRESHOLD = 5000          # Less work than this is classified in-process (a pool costs ~0.1 s to start)
+PARTITION_ESTIMATE = 100       # Articles assumed per archive partition when sizing the work
+
+_matcher = None
+
+def _init_worker(keywords):
+    global _matcher
+    _matcher = KeywordMatcher(keywords)
+
+def _classify(batch):
+    """{key: categories} for a batch of (key, title, summary), as classify_chemical_news would label them"""
+    return {key: _matcher.classify(title + ' ' + summary) for key, title, summary in batch}
+
+def _results(tasks, pool, in_flight):
+    """Classify the batch of each (context, batch) task in order, yielding (context, labels).
+
+    At most in_flight batches are queued in the pool, so the history is
+    streamed rather than loaded at once.
+    """
+    if pool is None:
+        for context, batch in tasks:
+            yield context, _classify(batch)
+        return
+    pending = deque()
+    for context, batch in tasks:
+        pending.append((context, pool.submit(_classify, batch)))
+        if len(pending) >= in_flight:
+            context, future = pending.popleft()
+            yield context, future.result()
+    while pending:
+        context, future = pending.popleft()
+        yield context, future.result()
+
+def _reclassify_store(taxonomy, pool, in_flight, path):
+    tasks = ((None, batch) for batch in article_store.stale_articles(taxonomy, BATCH_SIZE, path))
+    relabelled = 0
+    for _, labels in _results(tasks, pool, in_flight):
+        relabelled += article_store.replace_categories(labels, taxonomy, path)
+    return relabelled
+
+def _partition_tasks(partitions, taxonomy):
+    """((day, articles), stale (index, title, summary) tuples) for each partition"""
+    for day, path in partitions:
+        articles = article_archive.read_partition(path)
+        stale = [
+            (i, article.get('title', ''), article.get('summary', ''))
+            for i, article in enumerate(articles) if article.get('taxonomy') != taxonomy
+        ]
+        yield (day, articles), stale
+
+def _reclassify_archive(partitions, taxonomy, pool, in_flight, root, path):
+    rewritten = 0
+    for (day, articles), labels in _results(_partition_tasks(partitions, taxonomy), pool, in_flight):
+        deltas = {}
+        relabelled = {}
+        for i, categories in labels.items():
+            article = articles[i]
+            old = set(article.get('categories', []))
+            if old != set(categories):
+                relabelled[article['link']] = categories
+                published = article.get('published_ts')
+                key = (article_store.day_of(published if published is not None else article.get('first_seen', 0)), article.get('source') or 'Unknown')
+                for category in old - set(categories):
+                    deltas[key + (category,)] = deltas.get(key + (category,), 0) - 1
+                for category in set(categories) - old:
+                    deltas[key + (category,)] = deltas.get(key + (category,), 0) + 1
+            if categories:
+                article['categories'] = categories
+            else:
+                article.pop('categories', None)
+            article['taxonomy'] = taxonomy
+
+        article_archive.rewrite_partition(day, articles, taxonomy, root)
+        if deltas:
+            article_store.adjust_rollups(deltas, path, relabelled)
+        rewritten += 1
+    return rewritten
+
+def reclassify(keywords, processes=None, path=None, root=None):
+    """Relabel stored and archived articles classified under other keywords.
+
+    Store articles are relabelled in transactions of BATCH_SIZE; archive
+    partitions are rewritten atomically one by one, and the daily rollups
+    follow every label change. Returns (articles relabelled in the store,
+    archive partitions rewritten).
+    """
+    taxonomy = taxonomy_version(keywords)
+    stale_count = article_store.count_stale(taxonomy, path)
+    partitions = article_archive.stale_partitions(taxonomy, root)
+    if not stale_count and not partitions:
+        return 0, 0
+
+    processes = processes or PROCESSES
+    work = stale_count + len(partitions) * PARTITION_ESTIMATE
+    if processes <= 1 or work < POOL_THRESHOLD:
+        _init_worker(keywords)
+        return (
+            _reclassify_store(taxonomy, None, 0, path),
+            _reclassify_archive(partitions, taxonomy, None, 0, root, path)
+        )
+
+    with ProcessPoolExecutor(max_workers=processes, initializer=_init_worker, initargs=(keywords,)) as pool:
+        return (
+            _reclassify_store(taxonomy, pool, processes * 2, path),
+            _reclassify_archive(partitions, taxonomy, pool, processes * 2, root, path)
+        )
+
+def main():
+    """Reclassify the history with the current CHEMICAL_KEYWORDS, as the single writer"""
+    import scrape_lock
+    from fix_all_feeds import CHEMICAL_KEYWORDS
+
+    with scrape_lock.lease(wait=300) as held:
+        if not held:
+            print(f"⏭️ Reclassification skipped: {scrape_lock.holder() or 'another process'} is writing")
+            return
+        stored, rewritten = reclassify(CHEMICAL_KEYWORDS)
+    print(f"🏷️ Reclassified {stored} stored articles and {rewritten} archive partitions (taxonomy {taxonomy_version(CHEMICAL_KEYWORDS)})")
+
+if __name__ == '__main__':
+    main()
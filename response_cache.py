@@ -0,0 +1,174 @@
+import gzip
+import hashlib
+import threading
+from collections import OrderedDict
+from functools import wraps
+from flask import current_app, request
+
+try:
+    import brotli
+except ImportError:  # Optional, gzip only without it
+    brotli = None
+
+MAX_ENTRIES = 512          # Encoded responses kept (least recently used are evicted)
+MIN_COMPRESS_BYTES = 512   # Smaller bodies are sent as-is
+GZIP_LEVEL = 6             # Compressed on the request thread of a miss: near-best ratio for a few ms
+BROTLI_QUALITY = 5         # Quality 11 costs ~50x the time for a few percent smaller bodies
+ENCODINGS = ('br', 'gzip') if brotli is not None else ('gzip',)   # In order of preference
+
+class EncodedResponse:
+    """A JSON response body encoded once, with its ETag and the compressed variants requested so far"""
+    __slots__ = ('body', 'etag', 'variants')
+
+    def __init__(self, body):
+        self.body = body
+        self.etag = hashlib.sha256(body).hexdigest()[:32]
+        self.variants = {}
+
+    @property
+    def compressible(self):
+        return len(self.body) >= MIN_COMPRESS_BYTES
+
+    def variant(self, encoding):
+        """Body compressed with encoding, compressed on first use and kept"""
+        compressed = self.variants.get(encoding)
+        if compressed is None:
+            if encoding == 'br':
+                compressed = brotli.compress(self.body, quality=BROTLI_QUALITY)
+            else:
+                compressed = gzip.compress(self.body, GZIP_LEVEL, mtime=0)
+            self.variants[encoding] = compressed   # A concurrent miss may compress it too; either copy is kept
+        return compressed
+
+    def etag_for(self, encoding):
+        # Strong ETags must differ between byte-different representations
+        return f'"{self.etag}-{encoding}"' if encoding else f'"{self.etag}"'
+
+    def matches(self, if_none_match):
+        """True if an If-None-Match header names any representation of this body"""
+        if not if_none_match:
+            return False
+        for tag in if_none_match.split(','):
+            tag = tag.strip()
+            if tag == '*':
+                return True
+            if tag.startswith('W/'):
+                tag = tag[2:]
+            if tag.strip('"').split('-')[0] == self.etag:
+                return True
+        return False
+
+def _accepted_encodings(header):
+    """Encodings the client accepts (q=0 means refused)"""
+    accepted = set()
+    for part in (header or '').split(','):
+        name, _, params = part.partition(';')
+        name = name.strip().lower()
+        if not name:
+            continue
+        q = params.strip()
+        if q.startswith('q='):
+            try:
+                if float(q[2:]) == 0:
+                    continue
+            except ValueError:
+                continue
+        accepted.add(name)
+    return accepted
+
+def choose_encoding(encoded, accept_encoding):
+    if not encoded.compressible:
+        return None
+    accepted = _accepted_encodings(accept_encoding)
+    for encoding in ENCODINGS:
+        if encoding in accepted or '*' in accepted:
+            return encoding
+    return None
+
+class ResponseCache:
+    """LRU of encoded responses keyed by (path, version, normalized query)"""
+
+    def __init__(self, max_entries=MAX_ENTRIES):
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def __len__(self):
+        return len(self._entries)
+
+    def get(self, key):
+        with self._lock:
+            encoded = self._entries.get(key)
+            if encoded is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return encoded
+
+    def put(self, key, body):
+        encoded = EncodedResponse(body)  # Hash outside the lock
+        with self._lock:
+            self._entries[key] = encoded
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+        return encoded
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+response_cache = ResponseCache()
+
+def cache_key(version):
+    """Path, version and query args; blank args are dropped and the rest sorted"""
+    args = tuple(sorted((name, value) for name, value in request.args.items(multi=True) if value != ''))
+    return (request.path, version, args)
+
+def respond(encoded):
+    """Serve an encoded response, honouring If-None-Match and Accept-Encoding"""
+    encoding = choose_encoding(encoded, request.headers.get('Accept-Encoding'))
+    headers = {
+        'ETag': encoded.etag_for(encoding),
+        'Vary': 'Accept-Encoding',
+        'Cache-Control': 'no-cache'  # Clients may keep it but must revalidate with the ETag
+    }
+
+    if encoded.matches(request.headers.get('If-None-Match')):
+        return current_app.response_class(status=304, headers=headers)
+
+    body = encoded.body
+    if encoding:
+        body = encoded.variant(encoding)
+        headers['Content-Encoding'] = encoding
+    return current_app.response_class(body, status=200, headers=headers, mimetype='application/json')
+
+def cached(version, uncached_args=()):
+    """Cache a JSON view's encoded body per version() and query.
+
+    version is called on every request; when it returns None (e.g. no data
+    loaded yet) the view runs uncached. Only 200 JSON responses are stored,
+    and not those of requests with any of uncached_args (e.g. per-client
+    cursors, which would only evict shared entries); they still get an ETag.
+    """
+    def decorator(view):
+        @wraps(view)
+        def wrapper(*args, **kwargs):
+            current = version()
+            if current is None:
+                return view(*args, **kwargs)
+
+            store = not any(request.args.get(name) for name in uncached_args)
+            key = cache_key(current)
+            encoded = response_cache.get(key) if store else None
+            if encoded is None:
+                response = current_app.make_response(view(*args, **kwargs))
+                if response.status_code != 200 or response.mimetype != 'application/json':
+                    return response
+                encoded = response_cache.put(key, response.get_data()) if store else EncodedResponse(response.get_data())
+            return respond(encoded)
+        return wrapper
+    return decorator
@@ -0,0 +1,198 @@
+import json
+import os
+import socket
+import threading
+import time
+import uuid
+from contextlib import contextmanager
+from atomic_file import write_atomic
+
+try:
+    import fcntl
+except ImportError:  # Windows: breaking an expired lease is only best effort
+    fcntl = None
+
+# Scrape coordination between processes and instances sharing a data directory:
+# a lease file names the single writer, a slot file records the last scrape.
+LEASE_FILE = os.environ.get('SCRAPE_LEASE_FILE', 'scrape.lease')
+SLOT_FILE = os.environ.get('SCRAPE_SLOT_FILE', 'scrape_slot.json')
+MAINTENANCE_SLOT_FILE = os.environ.get('MAINTENANCE_SLOT_FILE', 'maintenance_slot.json')   # Last daily maintenance
+
+LEASE_TTL = 15 * 60     # Seconds a lease is valid; a crashed holder blocks others at most this long
+POLL_INTERVAL = 1.0     # Seconds between attempts while waiting for the lease
+RENEW_INTERVAL = LEASE_TTL / 3   # Seconds between renewals of a held lease, so long scrapes keep it
+
+HOST = socket.gethostname()
+
+def _read(path):
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+def _expired(path, lease, now):
+    if lease is not None:
+        return lease.get('expires', 0) < now
+    try:
+        # Unreadable: being written right now, or left half-written by a crash
+        return os.path.getmtime(path) + LEASE_TTL < now
+    except OSError:
+        return False
+
+@contextmanager
+def _guarded(path):
+    """Hold the guard serializing changes to an existing lease file (break, renew, release)"""
+    if fcntl is None:
+        yield
+        return
+    with open(f"{path}.guard", 'a') as guard:
+        fcntl.flock(guard, fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            fcntl.flock(guard, fcntl.LOCK_UN)
+
+def _identity(path):
+    try:
+        stat = os.stat(path)
+    except OSError:
+        return None
+    return stat.st_ino, stat.st_mtime_ns
+
+def _break_if_expired(path):
+    """Remove the lease file if its lease has expired; True if it was removed"""
+    with _guarded(path):
+        identity = _identity(path)
+        lease = _read(path)
+        if identity is None or not _expired(path, lease, time.time()):
+            return False
+        if fcntl is not None:
+            # Nobody can renew, release or replace it while we hold the guard
+            if _identity(path) != identity:
+                return False
+            os.remove(path)
+            return True
+
+        # Without the guard: move it aside first so only one process can take it over
+        stale_path = f"{path}.{uuid.uuid4().hex}.stale"
+        try:
+            os.rename(path, stale_path)
+        except OSError:
+            return False
+        broken = _identity(stale_path) == identity and _read(stale_path) == lease
+        if not broken:
+            # A fresh lease was taken in between: put it back
+            try:
+                os.link(stale_path, path)
+            except OSError:
+                pass
+        os.remove(stale_path)
+        return broken
+
+def acquire(wait=0, ttl=LEASE_TTL, path=None):
+    """Take the scrape lease, waiting up to wait seconds.
+
+    Returns a token for release(), or None if another holder kept it.
+    """
+    path = path or LEASE_FILE
+    token = f"{HOST}:{os.getpid()}:{threading.get_ident()}:{uuid.uuid4().hex[:8]}"
+    give_up = time.monotonic() + wait
+    while True:
+        try:
+            fd = os.open(path, os.O_CREAT | os.O_EXCL | os.O_WRONLY, 0o644)
+        except FileExistsError:
+            if _break_if_expired(path):
+                continue  # Try again right away, even without waiting
+            if time.monotonic() >= give_up:
+                return None
+            time.sleep(POLL_INTERVAL)
+            continue
+        with os.fdopen(fd, 'w', encoding='utf-8') as f:
+            json.dump({'owner': token, 'expires': time.time() + ttl}, f)
+        return token
+
+def release(token, path=None):
+    """Give up a lease taken with acquire()"""
+    path = path or LEASE_FILE
+    with _guarded(path):
+        lease = _read(path)
+        if lease and lease.get('owner') == token:
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+
+def renew(token, ttl=LEASE_TTL, path=None):
+    """Extend a lease taken with acquire(); False if it is no longer held by token"""
+    path = path or LEASE_FILE
+    with _guarded(path):
+        lease = _read(path)
+        if not lease or lease.get('owner') != token:
+            return False
+        write_atomic(path, json.dumps({'owner': token, 'expires': time.time() + ttl}))
+        return True
+
+def _keep_renewed(token, stop):
+    while not stop.wait(RENEW_INTERVAL):
+        if not renew(token):
+            print("⚠️ Scrape lease lost: it expired or was broken while held")
+            return
+
+def holder(path=None):
+    """Owner of the current lease, None if it is free"""
+    lease = _read(path or LEASE_FILE)
+    if lease and lease.get('expires', 0) >= time.time():
+        return lease.get('owner')
+    return None
+
+@contextmanager
+def lease(wait=0):
+    """with lease(wait) as held: held is True if this process is the writer.
+
+    The lease is renewed every RENEW_INTERVAL until the block exits, so
+    scrapes longer than LEASE_TTL keep it.
+    """
+    token = acquire(wait)
+    stop = threading.Event()
+    if token:
+        threading.Thread(target=_keep_renewed, args=(token, stop), daemon=True).start()
+    try:
+        yield token is not None
+    finally:
+        stop.set()
+        if token:
+            release(token)
+
+def last_scrape(slot_file=None):
+    """{'slot': ..., 'finished': unix time} of the last completed scrape ({} if none)"""
+    return _read(slot_file or SLOT_FILE) or {}
+
+def record_scrape(slot=None, slot_file=None):
+    write_atomic(slot_file or SLOT_FILE, json.dumps({'slot': slot, 'finished': time.time(), 'owner': HOST}))
+
+def run_exclusive(job, slot=None, min_interval=None, slot_file=None):
+    """Run job as the single writer, at most once per slot.
+
+    Skipped when another process holds the lease, when the slot was already
+    scraped (by any instance), or when the last scrape finished less than
+    min_interval seconds ago. slot_file keeps the slots of another kind of
+    job (default: scrapes). A job returning False (failed, or found
+    nothing to do) leaves the slot unrecorded. Returns True if job ran and
+    did not return False.
+    """
+    with lease() as held:
+        if not held:
+            print(f"⏭️ Scrape skipped: {holder() or 'another process'} is scraping")
+            return False
+        last = last_scrape(slot_file)
+        if slot is not None and last.get('slot') == slot:
+            print(f"⏭️ Scrape skipped: slot {slot} already done")
+            return False
+        if min_interval and time.time() - last.get('finished', 0) < min_interval:
+            print("⏭️ Scrape skipped: data was scraped recently")
+            return False
+        if job() is False:
+            return False  # Failed: leave the slot open for a retry
+        record_scrape(slot, slot_file)
+        return True
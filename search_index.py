@@ -0,0 +1,179 @@
+import heapq
+import math
+import re
+import threading
+import time
+from keyword_matcher import tokenize
+
+# BM25 parameters
+K1 = 1.2
+B = 0.75
+TITLE_WEIGHT = 2          # A title occurrence counts as this many summary occurrences
+
+PHRASE_RE = re.compile(r'"([^"]+)"')
+
+def normalize(token):
+    """Fold simple plurals so "prices" finds "price" and "policies" finds "policy"."""
+    if len(token) > 4 and token.endswith('ies'):
+        return token[:-3] + 'y'
+    if len(token) > 3 and token.endswith('s') and not token.endswith(('ss', 'us', 'is')):
+        return token[:-1]
+    return token
+
+def terms_of(text):
+    """Normalized index terms of a text, in order"""
+    return [normalize(token) for token in tokenize(text)]
+
+def parse_query(query):
+    """Split a query into (terms, phrases); phrases are "quoted" token lists"""
+    phrases = [terms_of(phrase) for phrase in PHRASE_RE.findall(query)]
+    phrases = [phrase for phrase in phrases if phrase]
+    terms = terms_of(PHRASE_RE.sub(' ', query))
+    for phrase in phrases:
+        terms.extend(phrase)
+    return list(dict.fromkeys(terms)), phrases
+
+class SearchIndex:
+    """In-memory inverted index over article titles and summaries.
+
+    Articles are keyed by link, so adding a snapshot only indexes articles
+    that are new or whose text changed. Postings keep token positions for
+    phrase queries; title and summary positions are separated by a gap so a
+    phrase never spans both. Results are ranked with BM25.
+    """
+
+    def __init__(self):
+        self._lock = threading.RLock()
+        self._docs = {}          # doc id -> article
+        self._next_id = 0        # Ids are never reused, so postings of a removed doc can't match a new one
+        self._doc_ids = {}       # link -> doc id
+        self._doc_terms = {}     # doc id -> {term: weighted frequency}
+        self._doc_lengths = {}   # doc id -> weighted length
+        self._seen = {}          # doc id -> unix time the article was last ingested
+        self._postings = {}      # term -> {doc id: [positions]}
+        self._total_length = 0
+
+    def __len__(self):
+        return len(self._doc_ids)
+
+    def add(self, article, seen=None):
+        """Index one article; returns True if its text was (re)indexed"""
+        link = article.get('link')
+        if not link:
+            return False
+        title = article.get('title', '')
+        summary = article.get('summary', '')
+
+        with self._lock:
+            doc_id = self._doc_ids.get(link)
+            if doc_id is not None:
+                old = self._docs[doc_id]
+                if old.get('title', '') == title and old.get('summary', '') == summary:
+                    # Same text: keep the postings, refresh labels and age
+                    self._docs[doc_id] = article
+                    self._seen[doc_id] = seen or time.time()
+                    return False
+                self._remove(doc_id)
+
+            doc_id = self._next_id
+            self._next_id += 1
+            self._docs[doc_id] = article
+            self._doc_ids[link] = doc_id
+            self._seen[doc_id] = seen or time.time()
+
+            title_tokens = terms_of(title)
+            summary_tokens = terms_of(summary)
+            frequencies = {}
+            positions = {}
+            for position, token in enumerate(title_tokens):
+                frequencies[token] = frequencies.get(token, 0) + TITLE_WEIGHT
+                positions.setdefault(token, []).append(position)
+            offset = len(title_tokens) + 1  # Gap so phrases can't span title and summary
+            for position, token in enumerate(summary_tokens, offset):
+                frequencies[token] = frequencies.get(token, 0) + 1
+                positions.setdefault(token, []).append(position)
+
+            for token, token_positions in positions.items():
+                self._postings.setdefault(token, {})[doc_id] = token_positions
+            length = TITLE_WEIGHT * len(title_tokens) + len(summary_tokens)
+            self._doc_terms[doc_id] = frequencies
+            self._doc_lengths[doc_id] = length
+            self._total_length += length
+            return True
+
+    def add_many(self, articles, seen=None):
+        """Index a batch of articles; returns how many were (re)indexed"""
+        with self._lock:
+            return sum(1 for article in articles if self.add(article, seen))
+
+    def _remove(self, doc_id):
+        article = self._docs.pop(doc_id)
+        for token in self._doc_terms.pop(doc_id):
+            postings = self._postings[token]
+            del postings[doc_id]
+            if not postings:
+                del self._postings[token]
+        self._total_length -= self._doc_lengths.pop(doc_id)
+        del self._seen[doc_id]
+        del self._doc_ids[article['link']]
+
+    def prune(self, max_age_days):
+        """Drop articles not ingested for max_age_days; returns how many were dropped"""
+        cutoff = time.time() - max_age_days * 86400
+        with self._lock:
+            stale = [doc_id for doc_id, seen in self._seen.items() if seen < cutoff]
+            for doc_id in stale:
+                self._remove(doc_id)
+            return len(stale)
+
+    def _phrase_docs(self, phrase, candidates):
+        """Candidate doc ids containing the phrase (consecutive positions)"""
+        postings = [self._postings.get(token, {}) for token in phrase]
+        matched = set()
+        for doc_id in candidates:
+            if not all(doc_id in p for p in postings):
+                continue
+            following = [set(p[doc_id]) for p in postings[1:]]
+            for start in postings[0][doc_id]:
+                if all(start + i in positions for i, positions in enumerate(following, 1)):
+                    matched.add(doc_id)
+                    break
+        return matched
+
+    def search(self, query, limit=50, accept=None):
+        """Rank articles for a query; returns (total_matches, [(score, article)]).
+
+        Free terms are OR-ed and ranked by BM25; "quoted phrases" must all be
+        present. accept is an optional article predicate (for filters).
+        """
+        terms, phrases = parse_query(query)
+        if not terms:
+            return 0, []
+
+        with self._lock:
+            doc_count = len(self._doc_ids)
+            if not doc_count:
+                return 0, []
+            average_length = self._total_length / doc_count
+
+            scores = {}
+            for term in terms:
+                postings = self._postings.get(term)
+                if not postings:
+                    continue
+                idf = math.log(1 + (doc_count - len(postings) + 0.5) / (len(postings) + 0.5))
+                for doc_id in postings:
+                    frequency = self._doc_terms[doc_id][term]
+                    norm = K1 * (1 - B + B * self._doc_lengths[doc_id] / average_length)
+                    scores[doc_id] = scores.get(doc_id, 0) + idf * frequency * (K1 + 1) / (frequency + norm)
+
+            candidates = scores.keys()
+            for phrase in phrases:
+                candidates = self._phrase_docs(phrase, candidates)
+
+            matches = [
+                (score, doc_id) for doc_id, score in scores.items()
+                if doc_id in candidates and (accept is None or accept(self._docs[doc_id]))
+            ]
+            top = heapq.nlargest(limit, matches) if limit is not None and limit >= 0 else sorted(matches, reverse=True)
+            return len(matches), [(score, self._docs[doc_id]) for score, doc_id in top]
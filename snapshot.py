@@ -0,0 +1,156 @@
+from array import array
+from bisect import bisect_left, bisect_right
+from datetime import datetime
+from article_store import parse_published
+from article_table import ArticleTable
+
+def build_snapshot(articles, updated=None):
+    """Build the API snapshot for a list of articles.
+
+    The articles are stored as an ArticleTable. Besides them the snapshot
+    carries, computed once at ingest time:
+    - category_index / source_index: name -> sorted article positions
+    - category_counts / source_counts: breakdowns for /api/summary
+    - category_lookup / source_lookup: lower-cased name -> name
+    - version: identifies this snapshot (response cache key)
+    - time_ts / time_positions: the article positions in ascending
+      (published_ts, link) order and the published_ts of each (undated
+      articles are left out)
+    Positions are kept in arrays rather than lists of ints.
+    """
+    updated = updated or datetime.now()
+    category_index = {}
+    source_index = {}
+    timeline = []
+
+    for position, article in enumerate(articles):
+        published_ts = article['published_ts'] if 'published_ts' in article else parse_published(article.get('published'))
+        if published_ts is not None:
+            timeline.append(((published_ts, article.get('link', '')), position))
+        for category in article.get('categories', ()):
+            category_index.setdefault(category, []).append(position)
+        if 'source' in article:
+            source_index.setdefault(article['source'], []).append(position)
+
+    timeline.sort()
+
+    return {
+        'articles': ArticleTable(articles),
+        'summary': {
+            'total_articles': len(articles),
+            'sources': list(source_index),
+            'last_updated': updated.isoformat()
+        },
+        'last_updated': updated,
+        'version': updated.strftime('%Y%m%d%H%M%S%f'),
+        'category_index': {category: array('I', positions) for category, positions in category_index.items()},
+        'source_index': {source: array('I', positions) for source, positions in source_index.items()},
+        'category_counts': {category: len(positions) for category, positions in category_index.items()},
+        'source_counts': {source: len(positions) for source, positions in source_index.items()},
+        'category_lookup': {category.lower(): category for category in category_index},
+        'source_lookup': {source.lower(): source for source in source_index},
+        'time_ts': array('d', (key[0] for key, position in timeline)),
+        'time_positions': array('I', (position for key, position in timeline))
+    }
+
+def _intersect(positions, other):
+    """Sorted positions present in both sorted lists"""
+    if len(positions) > len(other):
+        positions, other = other, positions
+    other = set(other)
+    return [position for position in positions if position in other]
+
+def filter_positions(snapshot, category=None, source=None):
+    """Sorted positions of the articles matching the filters.
+
+    category must match a category name exactly (case-insensitive); source
+    matches any source whose name contains it (case-insensitive). Returns
+    None when no filter is given, meaning every article.
+    """
+    positions = None
+
+    if category:
+        name = snapshot['category_lookup'].get(category.lower())
+        positions = snapshot['category_index'][name] if name else []
+
+    if source:
+        needle = source.lower()
+        matches = [
+            snapshot['source_index'][name]
+            for name_lower, name in snapshot['source_lookup'].items()
+            if needle in name_lower
+        ]
+        if len(matches) == 1:
+            source_positions = matches[0]
+        else:
+            source_positions = sorted(position for match in matches for position in match)
+        positions = source_positions if positions is None else _intersect(positions, source_positions)
+
+    return positions
+
+def select_positions(positions, count, limit=None):
+    """The first limit of the given positions (of all count articles if positions is None)"""
+    if positions is None:
+        return range(count)[:limit]
+    return positions[:limit]
+
+def time_key(snapshot, index):
+    """(published_ts, link) key of an entry of the time index"""
+    return snapshot['time_ts'][index], snapshot['articles'].link(snapshot['time_positions'][index])
+
+def _after(snapshot, key):
+    """Index of the first time index entry after a (published_ts, link) key"""
+    published_ts, link = key
+    times = snapshot['time_ts']
+    lo = bisect_left(times, published_ts)
+    hi = bisect_right(times, published_ts, lo)
+    # Entries with the same timestamp are ordered by link; only those links are read
+    articles = snapshot['articles']
+    positions = snapshot['time_positions']
+    while lo < hi:
+        middle = (lo + hi) // 2
+        if articles.link(positions[middle]) <= link:
+            lo = middle + 1
+        else:
+            hi = middle
+    return lo
+
+def time_range(snapshot, after=None, since=None, until=None):
+    """Slice (lo, hi) of the time index by binary search.
+
+    after is a (published_ts, link) key to start strictly after (a cursor),
+    since is an inclusive and until an exclusive epoch bound.
+    """
+    times = snapshot['time_ts']
+    lo, hi = 0, len(times)
+    if after is not None:
+        lo = _after(snapshot, after)
+    if since is not None:
+        lo = max(lo, bisect_left(times, since))
+    if until is not None:
+        hi = bisect_left(times, until)
+    return lo, max(lo, hi)
+
+def select_by_time(snapshot, positions, after=None, since=None, until=None, limit=None):
+    """Positions of the articles in the time range, oldest first, restricted to positions (None means all).
+
+    Returns (positions, key of the last article selected or None).
+    """
+    lo, hi = time_range(snapshot, after, since, until)
+    allowed = None if positions is None else set(positions)
+    selected = []
+    last = None
+    for index in range(lo, hi):
+        if limit is not None and len(selected) >= limit:
+            break
+        position = snapshot['time_positions'][index]
+        if allowed is not None and position not in allowed:
+            continue
+        selected.append(position)
+        last = index
+    return selected, None if last is None else time_key(snapshot, last)
+
+def encode_articles(snapshot, positions):
+    """JSON array of the articles at the given positions, encoded from the snapshot without building dicts"""
+    articles = snapshot['articles']
+    return b'[' + b','.join(articles.encoded(position) for position in positions) + b']'
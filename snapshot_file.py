@@ -0,0 +1,124 @@
+from array import array
+import json
+import mmap
+import os
+import struct
+import threading
+import time
+from datetime import datetime
+from atomic_file import write_atomic
+
+# Snapshot published by the ingest side and memory-mapped by every API worker
+SNAPSHOT_FILE = os.environ.get('SNAPSHOT_FILE', 'snapshot.bin')
+
+# Layout: MAGIC, header length (uint64 LE), header JSON, article JSON blobs.
+# The header holds everything in the snapshot except the articles, plus the
+# (offset, length) of each article blob relative to the end of the header.
+MAGIC = b'RSSSNAP\x02'
+LENGTH = struct.Struct('<Q')
+
+CHECK_INTERVAL = 1.0   # Seconds between checks for a newer snapshot file
+
+def write_snapshot(snapshot, path=None):
+    """Write a snapshot (see snapshot.build_snapshot) and atomically replace the file"""
+    path = path or SNAPSHOT_FILE
+    blobs = []
+    offsets = []
+    offset = 0
+    articles = snapshot['articles']
+    for index in range(len(articles)):
+        blob = articles.encoded(index)
+        offsets.append((offset, len(blob)))
+        blobs.append(blob)
+        offset += len(blob)
+
+    header = {key: value for key, value in snapshot.items() if key not in ('articles', 'last_updated')}
+    header['last_updated'] = snapshot['last_updated'].isoformat()
+    header['offsets'] = offsets
+    header = json.dumps(header, ensure_ascii=False, default=list).encode('utf-8')   # Position arrays as lists
+
+    # Readers see the old file or the new one, never a mix
+    write_atomic(path, b''.join([MAGIC, LENGTH.pack(len(header)), header] + blobs))
+
+class MappedArticles:
+    """Read-only article list decoded on access from a memory-mapped snapshot"""
+
+    def __init__(self, buffer, base, offsets):
+        self._buffer = buffer
+        self._base = base
+        self._offsets = array('Q', (value for pair in offsets for value in pair))   # offset, length, offset, ...
+
+    def __len__(self):
+        return len(self._offsets) // 2
+
+    def encoded(self, index):
+        """The article's JSON as stored, without decoding it"""
+        start = self._base + self._offsets[2 * index]
+        return self._buffer[start:start + self._offsets[2 * index + 1]]
+
+    def _load(self, index):
+        return json.loads(self.encoded(index))
+
+    def link(self, index):
+        return self._load(index).get('link')
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return [self._load(i) for i in range(*index.indices(len(self)))]
+        return self._load(index)
+
+    def __iter__(self):
+        for index in range(len(self)):
+            yield self._load(index)
+
+def load_snapshot(path=None):
+    """Memory-map a snapshot file; returns a snapshot dict whose articles are a MappedArticles"""
+    path = path or SNAPSHOT_FILE
+    with open(path, 'rb') as f:
+        buffer = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)  # Stays valid after the file is replaced
+
+    if buffer[:len(MAGIC)] != MAGIC:
+        raise ValueError(f"{path} is not a snapshot file")
+    header_start = len(MAGIC) + LENGTH.size
+    header_length, = LENGTH.unpack(buffer[len(MAGIC):header_start])
+    snapshot = json.loads(buffer[header_start:header_start + header_length])
+
+    offsets = snapshot.pop('offsets')
+    snapshot['articles'] = MappedArticles(buffer, header_start + header_length, offsets)
+    snapshot['last_updated'] = datetime.fromisoformat(snapshot['last_updated'])
+    for name in ('category_index', 'source_index'):
+        snapshot[name] = {key: array('I', positions) for key, positions in snapshot[name].items()}
+    snapshot['time_ts'] = array('d', snapshot['time_ts'])
+    snapshot['time_positions'] = array('I', snapshot['time_positions'])
+    return snapshot
+
+class SnapshotReader:
+    """Follow the snapshot file, mapping the newest version when it is replaced"""
+
+    def __init__(self, path=None, check_interval=CHECK_INTERVAL):
+        self.path = path or SNAPSHOT_FILE
+        self.check_interval = check_interval
+        self._lock = threading.Lock()
+        self._snapshot = None
+        self._identity = None
+        self._checked_at = 0
+
+    def get(self, force=False):
+        """Current snapshot, or None if none has been published yet"""
+        if not force and time.monotonic() - self._checked_at < self.check_interval:
+            return self._snapshot
+
+        with self._lock:
+            self._checked_at = time.monotonic()
+            try:
+                stat = os.stat(self.path)
+            except OSError:
+                return self._snapshot
+            identity = (stat.st_ino, stat.st_mtime_ns, stat.st_size)
+            if identity != self._identity:
+                try:
+                    self._snapshot = load_snapshot(self.path)
+                    self._identity = identity
+                except (OSError, ValueError) as e:
+                    print(f"⚠️ Could not load snapshot file {self.path}: {e}")
+            return self._snapshot
@@ -0,0 +1,60 @@
+import threading
+import time
+
+class SnapshotRefresher:
+    """Run a refresh function in the background, at most one at a time.
+
+    Callers that trigger a refresh while one is already running join the
+    in-flight run instead of starting another (single-flight). The refresh
+    function is called with force=True for runs triggered with force, and is
+    responsible for swapping in the new snapshot, so readers keep using the
+    previous one until it is complete (stale-while-revalidate).
+    """
+
+    def __init__(self, refresh, retry_delay=60):
+        self._refresh = refresh
+        self.retry_delay = retry_delay    # Seconds to wait after a failed run before retrying
+        self.last_error = None
+        self._lock = threading.Lock()
+        self._inflight = None
+        self._retry_at = 0
+
+    @property
+    def running(self):
+        return self._inflight is not None
+
+    def trigger(self, force=False):
+        """Start a refresh unless one is running; return its completion event.
+
+        Returns None when the last run failed less than retry_delay seconds
+        ago (unless force is set).
+        """
+        with self._lock:
+            if self._inflight is not None:
+                return self._inflight
+            if not force and time.monotonic() < self._retry_at:
+                return None
+            done = self._inflight = threading.Event()
+
+        threading.Thread(target=self._run, args=(done, force), daemon=True).start()
+        return done
+
+    def refresh(self, wait=True, force=False):
+        """Trigger a refresh and optionally block until it has finished"""
+        done = self.trigger(force)
+        if wait and done is not None:
+            done.wait()
+        return self.last_error
+
+    def _run(self, done, force):
+        try:
+            self._refresh(force=force)
+            self.last_error = None
+        except Exception as e:
+            self.last_error = e
+            self._retry_at = time.monotonic() + self.retry_delay
+            print(f"❌ Background refresh failed: {e}")
+        finally:
+            with self._lock:
+                self._inflight = None
+            done.set()
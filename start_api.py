@@ -1,5 +1,4 @@
 import threading
-import time
 from api_server import app
 from daily_scheduler import start_scheduler
 
@@ -18,18 +17,14 @@ def main():
     print("🚀 Starting Chemical Industry RSS Monitor System...")
     print("=" * 60)
     print("📡 API Server: http://localhost:5000")
-    print("⏰ Scheduler: Daily scrapes at 09:00 and 18:00 IST")
+    print("⏰ Scheduler: Adaptive per-source polling")
     print("=" * 60)
     
     # Start scheduler in a separate thread
     scheduler_thread = threading.Thread(target=run_scheduler, daemon=True)
     scheduler_thread.start()
     
-    # Wait a bit for initial scrape
-    print("⏳ Waiting for initial data scrape...")
-    time.sleep(10)
-    
-    # Start API server
+    # Start API server right away: it serves the last saved snapshot until the first scrape finishes
     run_api_server()
 
 if __name__ == '__main__':
@@ -0,0 +1,144 @@
+import asyncio
+import os
+import threading
+from urllib.parse import parse_qs, urlsplit
+from event_broker import broker, format_event, matches, parse_event_id, KEEPALIVE
+
+# Standalone Server-Sent Events server: one asyncio task per client instead of one thread
+STREAM_PORT = int(os.environ.get('STREAM_PORT', 5001))
+KEEPALIVE_INTERVAL = 15      # Seconds between keepalive comments on an idle stream
+CLIENT_QUEUE_SIZE = 1000     # Pending events per client before it is dropped as too slow
+RETRY_MS = 5000              # Reconnect delay suggested to EventSource clients
+
+RESPONSE_HEADERS = (
+    "HTTP/1.1 200 OK\r\n"
+    "Content-Type: text/event-stream; charset=utf-8\r\n"
+    "Cache-Control: no-cache\r\n"
+    "Connection: keep-alive\r\n"
+    "Access-Control-Allow-Origin: *\r\n"
+    "X-Accel-Buffering: no\r\n"
+    "\r\n"
+).encode('ascii')
+
+class StreamServer:
+    """asyncio HTTP server that only speaks GET /api/stream"""
+
+    def __init__(self, broker=broker):
+        self.broker = broker
+        self.loop = None
+        self._clients = set()
+
+    @property
+    def client_count(self):
+        return len(self._clients)
+
+    def _on_publish(self, events):
+        # Called from the scraping thread
+        self.loop.call_soon_threadsafe(self._dispatch, events)
+
+    def _dispatch(self, events):
+        for queue in list(self._clients):
+            try:
+                queue.put_nowait(events)
+            except asyncio.QueueFull:
+                self._clients.discard(queue)  # Too slow: _stream sends what it queued, then ends
+
+    async def _read_request(self, reader):
+        """(method, path, query, headers) of the request, None if it is malformed"""
+        try:
+            head = await asyncio.wait_for(reader.readuntil(b"\r\n\r\n"), KEEPALIVE_INTERVAL)
+        except (asyncio.IncompleteReadError, asyncio.LimitOverrunError, asyncio.TimeoutError):
+            return None
+        lines = head.decode('latin-1').split("\r\n")
+        try:
+            method, target, _ = lines[0].split(' ', 2)
+        except ValueError:
+            return None
+        headers = {}
+        for line in lines[1:]:
+            name, _, value = line.partition(':')
+            if name:
+                headers[name.strip().lower()] = value.strip()
+        parts = urlsplit(target)
+        query = {name: values[0] for name, values in parse_qs(parts.query).items()}
+        return method, parts.path, query, headers
+
+    async def _reply(self, writer, status, message):
+        body = message.encode('utf-8')
+        writer.write(
+            f"HTTP/1.1 {status}\r\nContent-Type: text/plain; charset=utf-8\r\n"
+            f"Content-Length: {len(body)}\r\nConnection: close\r\n\r\n".encode('ascii') + body
+        )
+        await writer.drain()
+
+    async def handle(self, reader, writer):
+        try:
+            request = await self._read_request(reader)
+            if request is None:
+                return
+            method, path, query, headers = request
+            if method != 'GET':
+                await self._reply(writer, '405 Method Not Allowed', 'Only GET is supported\n')
+                return
+            if path.rstrip('/') != '/api/stream':
+                await self._reply(writer, '404 Not Found', 'Use /api/stream\n')
+                return
+            await self._stream(writer, query, headers)
+        except (ConnectionError, asyncio.CancelledError):
+            pass
+        finally:
+            writer.close()
+
+    async def _stream(self, writer, query, headers):
+        category = query.get('category')
+        source = query.get('source')
+        last_id = parse_event_id(headers.get('last-event-id') or query.get('last_event_id'))
+
+        queue = asyncio.Queue(CLIENT_QUEUE_SIZE)
+        self._clients.add(queue)
+        try:
+            writer.write(RESPONSE_HEADERS + f"retry: {RETRY_MS}\n\n".encode('ascii'))
+            pending = self.broker.replay(last_id)
+            dropped = False
+            while True:
+                for event_id, article in pending:
+                    if event_id > (last_id or 0):
+                        last_id = event_id
+                        if matches(article, category, source):
+                            writer.write(format_event(event_id, article))
+                await writer.drain()
+                if dropped:
+                    return  # The client resumes after the last event sent, with Last-Event-ID
+
+                try:
+                    pending = await asyncio.wait_for(queue.get(), KEEPALIVE_INTERVAL)
+                except asyncio.TimeoutError:
+                    writer.write(KEEPALIVE)
+                    pending = []
+                    continue
+                if queue not in self._clients:
+                    # Dropped for falling behind: send everything already queued, then end
+                    dropped = True
+                    pending = list(pending)
+                    while not queue.empty():
+                        pending.extend(queue.get_nowait())
+        finally:
+            self._clients.discard(queue)
+
+    async def serve(self, host='0.0.0.0', port=STREAM_PORT):
+        self.loop = asyncio.get_running_loop()
+        self.broker.subscribe(self._on_publish)
+        try:
+            server = await asyncio.start_server(self.handle, host, port)
+            async with server:
+                await server.serve_forever()
+        finally:
+            self.broker.unsubscribe(self._on_publish)
+
+def start_stream_server(host='0.0.0.0', port=STREAM_PORT):
+    """Run the stream server on its own event loop in a daemon thread"""
+    server = StreamServer()
+    thread = threading.Thread(target=asyncio.run, args=(server.serve(host, port),), daemon=True)
+    thread.start()
+    print(f"📡 Stream server listening on port {port} (/api/stream)")
+    return server
@@ -0,0 +1,63 @@
+import copy
+
+import pytest
+
+import dedup
+
+ORIGINAL = {
+    'title': 'Reliance Industries posts record quarterly profit of 19000 crore in June quarter',
+    'link': 'https://economictimes.com/a?utm_source=rss',
+    'source': 'Economic Times'
+}
+REWORDED = {
+    'title': 'Reliance Industries posts record quarterly profit of 19000 crore in June quarter.',
+    'link': 'https://www.livemint.com/b',
+    'source': 'Livemint'
+}
+OTHER = {
+    'title': 'Sensex climbs as banking stocks rally on rate cut hopes',
+    'link': 'https://moneycontrol.com/c',
+    'source': 'Money Control'
+}
+
+@pytest.fixture(autouse=True)
+def fresh_window(monkeypatch):
+    monkeypatch.setattr(dedup, '_deduplicator', dedup.Deduplicator())
+
+def scrape(*articles):
+    return dedup.dedupe_articles(copy.deepcopy(list(articles)))
+
+def test_clean_url_keeps_story_selecting_params():
+    assert dedup.clean_url('https://amp.example.com/a/amp?utm_source=x&ref=rss&from=home&fbclid=1#top') == \
+        'https://example.com/a?from=home&ref=rss'
+
+def test_copies_collapse_into_alternates():
+    unique = scrape(ORIGINAL, REWORDED, OTHER)
+    assert [article['source'] for article in unique] == ['Economic Times', 'Money Control']
+    assert unique[0]['alternate_sources'] == [{'source': 'Livemint', 'link': 'https://www.livemint.com/b'}]
+
+def test_repeated_scrapes_give_the_same_articles():
+    first = scrape(ORIGINAL, REWORDED, OTHER)
+    assert scrape(ORIGINAL, REWORDED, OTHER) == first
+
+def test_window_rolls_across_scrapes():
+    scrape(ORIGINAL)
+    # The story is still kept once per scrape, whichever copy comes first
+    unique = scrape(REWORDED, ORIGINAL)
+    assert len(unique) == 1
+    assert unique[0]['source'] == 'Livemint'
+    assert unique[0]['alternate_sources'][0]['source'] == 'Economic Times'
+    # A copy alone in a later scrape is not dropped as a duplicate of an earlier one
+    assert [article['source'] for article in scrape(REWORDED)] == ['Livemint']
+
+def test_window_forgets_old_articles():
+    deduplicator = dedup.Deduplicator(max_age=60)
+    assert deduplicator.add(dict(ORIGINAL), now=0) is None
+    assert deduplicator.add(dict(REWORDED), now=30) is not None
+    assert deduplicator.add(dict(REWORDED), now=120) is None
+
+def test_window_size_cap():
+    deduplicator = dedup.Deduplicator(window_size=1)
+    deduplicator.add(dict(ORIGINAL), now=0)
+    deduplicator.add(dict(OTHER), now=1)
+    assert deduplicator.add(dict(REWORDED), now=2) is None
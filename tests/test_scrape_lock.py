@@ -0,0 +1,100 @@
+import json
+import threading
+import time
+
+import pytest
+
+import scrape_lock
+
+@pytest.fixture
+def files(tmp_path, monkeypatch):
+    """Lease and slot files in a temporary directory"""
+    lease_file = str(tmp_path / 'scrape.lease')
+    slot_file = str(tmp_path / 'scrape_slot.json')
+    monkeypatch.setattr(scrape_lock, 'LEASE_FILE', lease_file)
+    monkeypatch.setattr(scrape_lock, 'SLOT_FILE', slot_file)
+    return lease_file, slot_file
+
+def _expired_lease(path):
+    with open(path, 'w') as f:
+        json.dump({'owner': 'crashed-host:1:1:dead', 'expires': time.time() - 5}, f)
+
+def test_held_lease_blocks_others(files):
+    token = scrape_lock.acquire()
+    assert token
+    assert scrape_lock.acquire() is None
+    scrape_lock.release('someone-else')
+    assert scrape_lock.holder() == token
+    scrape_lock.release(token)
+    assert scrape_lock.holder() is None
+
+def test_expired_lease_is_broken(files):
+    lease_file, _ = files
+    _expired_lease(lease_file)
+    token = scrape_lock.acquire()
+    assert token and scrape_lock.holder() == token
+    scrape_lock.release(token)
+
+@pytest.mark.parametrize('guard', [True, False], ids=['flock', 'rename'])
+def test_expired_lease_broken_by_exactly_one(files, monkeypatch, guard):
+    """Racing breakers must never delete the fresh lease one of them took"""
+    lease_file, _ = files
+    if not guard:
+        monkeypatch.setattr(scrape_lock, 'fcntl', None)   # As on Windows
+    for _ in range(20):
+        _expired_lease(lease_file)
+        barrier = threading.Barrier(8)
+        results = []
+
+        def contend():
+            barrier.wait()
+            token = scrape_lock.acquire()
+            if token:
+                time.sleep(0.05)   # Others are still trying to break it
+                results.append(scrape_lock.holder() == token)
+                scrape_lock.release(token)
+
+        threads = [threading.Thread(target=contend) for _ in range(8)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        assert results == [True]
+
+def test_renew_extends_only_own_lease(files):
+    lease_file, _ = files
+    token = scrape_lock.acquire(ttl=10)
+    expires = scrape_lock._read(lease_file)['expires']
+    time.sleep(0.01)
+    assert scrape_lock.renew(token, ttl=10)
+    assert scrape_lock._read(lease_file)['expires'] > expires
+    assert not scrape_lock.renew('someone-else')
+    scrape_lock.release(token)
+    assert not scrape_lock.renew(token)
+
+def test_lease_is_renewed_while_held(files, monkeypatch):
+    lease_file, _ = files
+    monkeypatch.setattr(scrape_lock, 'RENEW_INTERVAL', 0.05)
+    with scrape_lock.lease() as held:
+        assert held
+        expires = scrape_lock._read(lease_file)['expires']
+        time.sleep(0.2)
+        assert scrape_lock._read(lease_file)['expires'] > expires
+    assert scrape_lock.holder() is None
+
+def test_run_exclusive_records_slot_once(files):
+    runs = []
+    assert scrape_lock.run_exclusive(lambda: runs.append(1), slot='08:00')
+    assert not scrape_lock.run_exclusive(lambda: runs.append(1), slot='08:00')
+    assert runs == [1]
+    assert scrape_lock.last_scrape()['slot'] == '08:00'
+
+def test_run_exclusive_leaves_slot_open_when_job_returns_false(files):
+    assert not scrape_lock.run_exclusive(lambda: False, slot='08:00')
+    assert scrape_lock.last_scrape() == {}
+
+def test_run_exclusive_skips_while_leased(files):
+    token = scrape_lock.acquire()
+    assert not scrape_lock.run_exclusive(lambda: True)
+    scrape_lock.release(token)
+    assert scrape_lock.last_scrape() == {}